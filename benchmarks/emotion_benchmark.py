@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+情感分析器基准
+比较逐关键词 re.findall 扫描（旧实现）、预编译多关键词匹配器（逐条）和批量接口的吞吐，
+并校验三者结果一致
+示例消息由含情感词的句子拼接而成，关键词密度远高于普通聊天，属于匹配器的不利情况
+
+用法：python -m benchmarks.emotion_benchmark --lengths 50,2000
+"""
+import argparse
+import re
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from core.logger import logger
+from emotion.analyzer import EmotionAnalyzer, EmotionType
+
+SAMPLE_SENTENCES = [
+    "今天真的好开心，和朋友一起去看了电影",
+    "工作上的事情让我很难过，有点失望",
+    "他又迟到了，真让人生气",
+    "明天就要考试了，我好紧张，有点担心",
+    "没想到你会来，真是太意外了",
+    "我很喜欢你做的蛋糕，谢谢你",
+    "天气一般，没什么特别的",
+    "不要这样，这样不好",
+]
+
+
+def build_messages(count: int, length: int) -> List[str]:
+    """用示例句子拼接出指定长度的消息"""
+    rng = np.random.default_rng(42)
+    messages = []
+    for _ in range(count):
+        parts, size = [], 0
+        while size < length:
+            sentence = SAMPLE_SENTENCES[rng.integers(len(SAMPLE_SENTENCES))]
+            parts.append(sentence)
+            size += len(sentence) + 1
+        messages.append("。".join(parts)[:length])
+    return messages
+
+
+def legacy_scores(analyzer: EmotionAnalyzer, text: str):
+    """旧实现：每个关键词单独执行一次 re.findall，再用 in 扫描正负面指示词"""
+    text = text.lower()
+    emotion_scores = {}
+    for emotion_type, keywords in analyzer.emotion_keywords.items():
+        score = sum(len(re.findall(keyword, text)) for keyword in keywords)
+        if score > 0:
+            emotion_scores[emotion_type] = score
+    if emotion_scores:
+        emotion_type = max(emotion_scores, key=emotion_scores.get)
+        return emotion_type, min(0.9, emotion_scores[emotion_type] * 0.2 + 0.3)
+
+    positive = sum(1 for indicator in analyzer.positive_indicators if indicator in text)
+    negative = sum(1 for indicator in analyzer.negative_indicators if indicator in text)
+    if positive > negative:
+        return EmotionType.POSITIVE, min(0.8, positive * 0.3)
+    if negative > positive:
+        return EmotionType.NEGATIVE, min(0.8, negative * 0.3)
+    return EmotionType.NEUTRAL, 0.5
+
+
+def throughput(fn: Callable[[str], object], messages: List[str], rounds: int) -> float:
+    """返回每秒处理的消息数"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            fn(message)
+    return len(messages) * rounds / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="情感分析器吞吐基准")
+    parser.add_argument("--count", type=int, default=200, help="消息数量")
+    parser.add_argument("--lengths", default="50,500,2000", help="消息长度（字符），逗号分隔")
+    parser.add_argument("--rounds", type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    logger.remove()
+    analyzer = EmotionAnalyzer()
+
+    for length in (int(value) for value in args.lengths.split(",")):
+        messages = build_messages(args.count, length)
+
+        mismatches = 0
+        for message, batch_result in zip(messages, analyzer.analyze_emotions(messages)):
+            result = analyzer.analyze_emotion(message)
+            expected = legacy_scores(analyzer, message)
+            if (result.emotion, result.confidence) != expected or (batch_result.emotion, batch_result.confidence) != expected:
+                mismatches += 1
+
+        legacy = throughput(lambda text: legacy_scores(analyzer, text), messages, args.rounds)
+        current = throughput(analyzer.analyze_emotion, messages, args.rounds)
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            analyzer.analyze_emotions(messages)
+        batch = len(messages) * args.rounds / (time.perf_counter() - started)
+        print(
+            f"长度 {length:>5}: 旧实现 {legacy:9.0f} 条/秒  匹配器 {current:9.0f} 条/秒  "
+            f"批量 {batch:9.0f} 条/秒  加速 {current / legacy:5.2f}x  结果不一致 {mismatches} 条"
+        )
+
+
+if __name__ == "__main__":
+    main()
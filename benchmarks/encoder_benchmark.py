@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+编码器对比基准
+比较 ONNX（量化）编码器与 sentence-transformers 编码器：
+1. 一致性：逐条向量余弦相似度，以及近邻检索 recall@k
+2. 吞吐：不同批大小下每秒编码的文本数
+
+用法：python -m benchmarks.encoder_benchmark --corpus texts.txt
+"""
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from core.config import settings
+from rag.encoders import Encoder, OnnxEncoder, SentenceTransformerEncoder
+
+SAMPLE_TEXTS = [
+    "今天天气真好，我们去公园散步吧",
+    "我有点难过，工作上遇到了很多麻烦",
+    "你还记得我们上次聊过的那本书吗",
+    "魔法学院的入学考试是什么时候",
+    "谢谢你一直陪着我，真的很开心",
+    "我最近在学习Python编程",
+    "晚饭吃什么好呢，有点想吃火锅",
+    "能给我讲讲星辰帝国的历史吗",
+    "I feel really tired after the long trip",
+    "What is your favourite kind of tea?",
+    "明天要考试了，好紧张啊",
+    "猫咪今天又把花瓶打翻了",
+]
+
+
+def load_corpus(path: str = None, size: int = 512) -> List[str]:
+    """读取语料文件（每行一条），未提供时用示例文本组合生成"""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    rng = np.random.default_rng(42)
+    corpus = []
+    for i in range(size):
+        a, b = rng.choice(len(SAMPLE_TEXTS), size=2, replace=False)
+        corpus.append(f"{SAMPLE_TEXTS[a]}，{SAMPLE_TEXTS[b]}（{i}）")
+    return corpus
+
+
+def recall_at_k(reference: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    """以参考向量的近邻为标准，计算候选向量近邻的 recall@k（排除自身）"""
+    def top_k(vectors: np.ndarray) -> np.ndarray:
+        scores = vectors @ vectors.T
+        np.fill_diagonal(scores, -np.inf)
+        return np.argsort(-scores, axis=1)[:, :k]
+
+    ref, cand = top_k(reference), top_k(candidate)
+    hits = sum(len(set(r) & set(c)) for r, c in zip(ref, cand))
+    return hits / (len(reference) * k)
+
+
+def throughput(encoder: Encoder, texts: List[str], batch_size: int, rounds: int) -> float:
+    """返回每秒编码的文本数"""
+    encoder.encode(texts[:batch_size])  # 预热
+    started = time.perf_counter()
+    count = 0
+    for _ in range(rounds):
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            encoder.encode(batch)
+            count += len(batch)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX 与 sentence-transformers 编码器对比")
+    parser.add_argument("--corpus", help="语料文件，每行一条文本")
+    parser.add_argument("--onnx-model", default=settings.onnx_model_path, help="ONNX 模型路径")
+    parser.add_argument("--model", default=settings.encoder_model_name, help="sentence-transformers 模型名")
+    parser.add_argument("--k", type=int, default=10, help="recall@k 的 k")
+    parser.add_argument("--batch-sizes", default="1,8,32", help="吞吐测试的批大小，逗号分隔")
+    parser.add_argument("--rounds", type=int, default=1, help="吞吐测试轮数")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"📚 语料: {len(corpus)} 条")
+
+    torch_encoder = SentenceTransformerEncoder(args.model)
+    onnx_encoder = OnnxEncoder(
+        args.onnx_model,
+        tokenizer_path=settings.onnx_tokenizer_path or None,
+        max_length=settings.encoder_max_length,
+        num_threads=settings.onnx_num_threads
+    )
+
+    reference = torch_encoder.encode(corpus)
+    candidate = onnx_encoder.encode(corpus)
+
+    # 两个编码器均输出归一化向量，点积即余弦相似度
+    cosine = np.sum(reference * candidate, axis=1)
+    print("\n🎯 一致性")
+    print(f"  余弦相似度: 平均 {cosine.mean():.4f}, 最小 {cosine.min():.4f}")
+    print(f"  recall@{args.k}: {recall_at_k(reference, candidate, args.k):.4f}")
+
+    print("\n⚡ 吞吐（条/秒）")
+    print(f"  {'批大小':>6} {'torch':>10} {'onnx':>10} {'加速比':>8}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        torch_tps = throughput(torch_encoder, corpus, batch_size, args.rounds)
+        onnx_tps = throughput(onnx_encoder, corpus, batch_size, args.rounds)
+        print(f"  {batch_size:>6} {torch_tps:>10.1f} {onnx_tps:>10.1f} {onnx_tps / torch_tps:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
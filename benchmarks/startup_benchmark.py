@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+启动时间基准
+每种方式在独立的子进程中执行（避免模块和模型文件缓存影响结果），测量：
+1. import main 的耗时（uvicorn reload 每次都要付出的代价）
+2. 知识库初始化耗时：串行加载编码器和打开向量存储 vs 并行加载
+3. 初始化后首次编码的耗时：不预热 vs 预热
+
+用法：python -m benchmarks.startup_benchmark --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+MODES = ("import", "serial", "parallel", "parallel_prewarm")
+
+
+def run_worker(mode: str) -> Dict[str, float]:
+    """在当前进程中执行一种启动方式，返回各阶段耗时（秒）"""
+    started = time.perf_counter()
+    if mode == "import":
+        import main  # noqa: F401
+        return {"import": time.perf_counter() - started}
+
+    from rag.knowledge_base import KnowledgeBase
+    imported = time.perf_counter()
+
+    knowledge_base = KnowledgeBase("startup_benchmark")
+    constructed = time.perf_counter()
+
+    if mode == "serial":
+        knowledge_base.encoder
+        knowledge_base.vector_store
+    else:
+        asyncio.run(knowledge_base.ainitialize(prewarm=mode == "parallel_prewarm"))
+    initialized = time.perf_counter()
+
+    knowledge_base.encoder.encode(["你好，今天过得怎么样？"])
+    first_encode = time.perf_counter()
+    knowledge_base.close()
+
+    return {
+        "import": imported - started,
+        "construct": constructed - imported,
+        "initialize": initialized - constructed,
+        "first_encode": first_encode - initialized
+    }
+
+
+def run_subprocess(mode: str, data_directory: str) -> Dict[str, float]:
+    """在新的子进程中执行一种启动方式"""
+    env = dict(
+        os.environ,
+        CHROMA_PERSIST_DIRECTORY=os.path.join(data_directory, "chroma"),
+        MMAP_STORE_DIRECTORY=os.path.join(data_directory, "mmap"),
+        LOG_LEVEL="WARNING"
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup_benchmark", "--worker", mode],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    # 最后一行是结果，之前可能有模型加载的输出
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动时间基准")
+    parser.add_argument("--rounds", type=int, default=3, help="每种方式执行的次数（取中位数）")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker)))
+        return
+
+    with tempfile.TemporaryDirectory() as data_directory:
+        for mode in MODES:
+            samples: List[Dict[str, float]] = [run_subprocess(mode, data_directory) for _ in range(args.rounds)]
+            print(f"\n{mode}:")
+            for stage in samples[0]:
+                values = sorted(sample[stage] for sample in samples)
+                median = values[len(values) // 2]
+                print(f"  {stage:<14} {median * 1000:9.1f} ms  (min {values[0] * 1000:.1f} / max {values[-1] * 1000:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+微批处理器
+将并发请求中的单条任务合并为批次统一处理，
+批次达到最大大小或等待超过截止时间时立即提交
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.logger import logger
+
+
+class MicroBatcher:
+    """微批处理器：收集并发提交的单条任务，按批大小或截止时间批量处理"""
+
+    def __init__(
+        self,
+        name: str,
+        process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.005
+    ):
+        """
+        Args:
+            name: 批处理器名称（用于日志和统计输出）
+            process_batch: 批处理函数，输入任务列表，返回与之一一对应的结果列表
+            max_batch_size: 单批最大任务数
+            max_wait: 收到首个任务后等待后续任务的最长时间（秒）
+        """
+        self.name = name
+        self._process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+
+        # 运行指标
+        self._submitted = 0
+        self._processed = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._max_observed_batch = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker_task is not None and not self._worker_task.done()
+
+    def _ensure_worker(self):
+        """在当前事件循环中延迟启动后台任务"""
+        if not self.running:
+            self._queue = asyncio.Queue()
+            self._worker_task = asyncio.create_task(self._worker())
+
+    async def submit(self, item: Any) -> Any:
+        """
+        提交单条任务并等待其结果
+
+        Args:
+            item: 任务数据
+
+        Returns:
+            Any: 该任务对应的处理结果
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._submitted += 1
+        await self._queue.put((item, future))
+        return await future
+
+    async def _worker(self):
+        """后台任务：凑满一批或到达截止时间后统一处理"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[Any, asyncio.Future]] = []
+            try:
+                await self._collect_and_process(loop, batch)
+            except asyncio.CancelledError:
+                # 停止时已取出队列的任务（凑批中或处理中）也以取消结束，避免调用方一直等待
+                for _, future in batch:
+                    if not future.done():
+                        future.cancel()
+                raise
+
+    async def _collect_and_process(self, loop: asyncio.AbstractEventLoop, batch: List[Tuple[Any, asyncio.Future]]):
+        """凑一批任务并处理，取出的任务追加到 batch 中"""
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        # 截止时间到后，已在队列中的任务也一并带走
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        self._batches += 1
+        self._processed += len(batch)
+        self._max_observed_batch = max(self._max_observed_batch, len(batch))
+        items = [item for item, _ in batch]
+        try:
+            results = await self._process_batch(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"批处理结果数量 {len(results)} 与任务数量 {len(items)} 不一致")
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            self._failed_batches += 1
+            logger.error(f"批处理器 {self.name} 处理失败: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def stop(self):
+        """停止后台任务，未处理的任务以取消结束"""
+        if not self.running:
+            return
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        self._worker_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取批处理指标
+
+        Returns:
+            Dict[str, Any]: 指标信息
+        """
+        return {
+            "name": self.name,
+            "running": self.running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "pending": self._queue.qsize() if self._queue else 0,
+            "submitted": self._submitted,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "avg_batch_size": round(self._processed / self._batches, 2) if self._batches else 0.0,
+            "max_observed_batch": self._max_observed_batch
+        }
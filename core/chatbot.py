@@ -2,21 +2,37 @@
 聊天机器人核心控制器
 整合所有模块功能，提供统一的聊天接口
 """
+import asyncio
+import time
 import uuid
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator
 from datetime import datetime
 from pydantic import BaseModel
 
+from core.config import settings
 from core.logger import logger
 from core.prompt_manager import prompt_manager
 from core.worldview_manager import worldview_manager
+from core.write_behind import PersistenceJob, WriteBehindQueue
+from core.consolidation import ConsolidationWorker
+from core.ingestion import IngestionJobManager
+from core.retention import RetentionSweeper
 from llm.factory import LLMFactory
 from llm.base import ChatMessage, ChatResponse
+from emotion.analytics import emotion_to_dict, emotion_updates, rescore_messages
 from emotion.analyzer import EmotionAnalyzer, EmotionResult
+from emotion.model_analyzer import ModelEmotionAnalyzer
 from memory.manager import MemoryManager
-from memory.models import ConversationMessage, PersonaState
+from memory.models import (
+    BotProfile,
+    ConversationMessage,
+    ConversationSession,
+    PersonaState,
+    WorldviewKeywords
+)
 from persona.manager import PersonaManager, PersonalityType
 from rag.knowledge_base import KnowledgeBase
+from rag.rerank import RerankOptions
 
 
 class ChatRequest(BaseModel):
@@ -28,6 +44,12 @@ class ChatRequest(BaseModel):
     model: Optional[str] = None  # 指定使用的模型
     enable_thinking: bool = True
     personality_type: Optional[str] = None
+    memory_rerank: Optional[RerankOptions] = None  # 相关记忆的重排参数，不指定时使用配置
+
+
+class EmotionBatchRequest(BaseModel):
+    """批量情感分析请求模型"""
+    texts: List[str]
 
 
 class ChatbotResponse(BaseModel):
@@ -42,18 +64,176 @@ class ChatbotResponse(BaseModel):
     metadata: Dict[str, Any] = {}
 
 
+class ChatTurn:
+    """一轮对话在调用LLM前后共享的上下文"""
+    def __init__(
+        self,
+        session_id: str,
+        emotion_result: EmotionResult,
+        adjusted_persona: PersonaState,
+        relevant_memories: List[Dict[str, Any]],
+        bot_profile: BotProfile,
+        worldview_analysis: Dict[str, Any],
+        messages: List[ChatMessage]
+    ):
+        self.session_id = session_id
+        self.emotion_result = emotion_result
+        self.adjusted_persona = adjusted_persona
+        self.relevant_memories = relevant_memories
+        self.bot_profile = bot_profile
+        self.worldview_analysis = worldview_analysis
+        self.messages = messages
+
+
 class ChatbotCore:
     """聊天机器人核心控制器"""
     
     def __init__(self):
         # 初始化各个模块
         self.emotion_analyzer = EmotionAnalyzer()
+        # 可选的模型情感分析（独立进程池），超时或不可用时回退到关键词分析
+        self.emotion_model = ModelEmotionAnalyzer(self.emotion_analyzer) if settings.emotion_model_enabled else None
+        # 对话主题关键词（按顺序匹配，第一个命中的主题即为结果）
+        self.topic_keywords = {
+            "问候": ["你好", "您好", "hi", "hello", "早上好", "晚上好"],
+            "询问": ["什么", "怎么", "为什么", "如何", "哪里", "谁"],
+            "情感": ["开心", "难过", "生气", "担心", "兴奋", "紧张"],
+            "日常": ["吃饭", "睡觉", "工作", "学习", "休息"],
+            "帮助": ["帮助", "帮忙", "协助", "支持"],
+            "聊天": ["聊天", "说话", "交流", "谈话"]
+        }
+        # 与用户的世界观关键词一起编译进每轮对话共用的匹配器
+        self._turn_keywords = tuple(self.emotion_analyzer.keywords) + tuple(
+            word for words in self.topic_keywords.values() for word in words
+        )
         self.memory_manager = MemoryManager()
         self.persona_manager = PersonaManager()
         self.knowledge_base = KnowledgeBase()
+        self.write_behind = WriteBehindQueue(self.memory_manager, self.knowledge_base)
+        self.consolidation = ConsolidationWorker(self.memory_manager, self.knowledge_base)
+        self.retention = RetentionSweeper(self.knowledge_base, session_user_ids=self.memory_manager.list_user_ids)
+        self.ingestion = IngestionJobManager(self.knowledge_base)
+        
+        # 各子系统的就绪状态（pending / ready / failed），由后台初始化任务更新；
+        # 初始化失败的子系统按指数退避重试，直到成功或服务停止
+        self._readiness: Dict[str, Dict[str, Any]] = {
+            name: {"status": "pending", "seconds": None, "error": None, "attempts": 0}
+            for name in ("memory", "knowledge_base")
+        }
+        # 各子系统是否已完成首次初始化尝试（无论成败）
+        self._init_attempted: Dict[str, asyncio.Event] = {name: asyncio.Event() for name in self._readiness}
+        self._init_stopping = asyncio.Event()
+        self._init_task: Optional[asyncio.Task] = None
+        self._init_started: Optional[float] = None
         
         logger.info("聊天机器人核心控制器初始化完成")
     
+    async def start(self):
+        """
+        启动后台任务，并在后台并行初始化数据库连接、编码器和向量存储
+        
+        服务在初始化完成前即可接受请求（健康检查可用），就绪状态通过 get_readiness 查询；
+        初始化完成前到达的请求会在首次使用时按需加载对应组件。
+        """
+        self._init_started = time.perf_counter()
+        self._init_task = asyncio.create_task(self._initialize())
+        await self.write_behind.start()
+        if self.emotion_model:
+            await self.emotion_model.start()
+        if settings.consolidation_enabled:
+            await self.consolidation.start()
+        if settings.retention_enabled:
+            await self.retention.start()
+    
+    async def _initialize_component(self, name: str, init):
+        """初始化单个子系统，失败后按指数退避重试，直到成功或服务停止"""
+        state = self._readiness[name]
+        delay = settings.startup_retry_initial_delay
+        while True:
+            started = time.perf_counter()
+            state["attempts"] += 1
+            try:
+                await init()
+                state.update(status="ready", seconds=round(time.perf_counter() - started, 3), error=None)
+                if state["attempts"] > 1:
+                    logger.info(f"{name} 第 {state['attempts']} 次初始化成功")
+                return
+            except Exception as e:
+                state.update(status="failed", error=str(e))
+                logger.error(f"{name} 初始化失败（第 {state['attempts']} 次），{delay:.1f} 秒后重试: {e}")
+            finally:
+                self._init_attempted[name].set()
+            
+            try:
+                await asyncio.wait_for(self._init_stopping.wait(), timeout=delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, settings.startup_retry_max_delay)
+    
+    async def _initialize(self):
+        async def init_memory():
+            await self.memory_manager.ping()
+            await self.memory_manager.create_indexes()
+        
+        await asyncio.gather(
+            self._initialize_component("memory", init_memory),
+            self._initialize_component(
+                "knowledge_base",
+                lambda: self.knowledge_base.ainitialize(prewarm=settings.startup_prewarm)
+            )
+        )
+        elapsed = time.perf_counter() - self._init_started
+        if self.ready:
+            logger.info(f"聊天机器人系统就绪，初始化耗时 {elapsed:.2f} 秒")
+    
+    @property
+    def ready(self) -> bool:
+        return all(state["status"] == "ready" for state in self._readiness.values())
+    
+    async def wait_ready(self, timeout: float = None) -> bool:
+        """
+        等待各子系统完成首次初始化尝试（失败的子系统之后仍会在后台重试）
+        
+        Args:
+            timeout: 超时时间（秒），为 None 时一直等待
+            
+        Returns:
+            bool: 是否全部初始化成功
+        """
+        if self._init_task is not None:
+            await asyncio.wait_for(
+                asyncio.gather(*(event.wait() for event in self._init_attempted.values())),
+                timeout
+            )
+        return self.ready
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """
+        获取就绪状态
+        
+        Returns:
+            Dict[str, Any]: 整体是否就绪及各子系统的状态和初始化耗时
+        """
+        return {
+            "ready": self.ready,
+            "components": self._readiness
+        }
+    
+    async def stop(self):
+        """停止后台任务，并写入所有尚未持久化的数据"""
+        if self._init_task is not None and not self._init_task.done():
+            # 停止重试；正在进行的初始化尝试会执行完
+            self._init_stopping.set()
+            await asyncio.gather(self._init_task, return_exceptions=True)
+        await self.ingestion.stop()
+        await self.retention.stop()
+        await self.consolidation.stop()
+        await self.write_behind.stop()
+        await self.knowledge_base.stop()
+        if self.emotion_model:
+            await self.emotion_model.stop()
+    
     async def process_chat(self, request: ChatRequest) -> ChatbotResponse:
         """
         处理聊天请求
@@ -65,192 +245,335 @@ class ChatbotCore:
             ChatbotResponse: 聊天响应
         """
         try:
-            # 1. 情感分析
-            emotion_result = self.emotion_analyzer.analyze_emotion(request.message)
-            logger.info(f"情感分析完成: {emotion_result.emotion.value}")
-            
-            # 2. 获取或创建会话
-            session_id = request.session_id or str(uuid.uuid4())
-            session = await self.memory_manager.get_session(request.user_id, session_id)
-            
-            if not session:
-                # 创建新会话
-                personality_type = PersonalityType.GENTLE
-                if request.personality_type:
-                    try:
-                        personality_type = PersonalityType(request.personality_type)
-                    except ValueError:
-                        logger.warning(f"无效的人格类型: {request.personality_type}")
-                
-                initial_persona = self.persona_manager.create_default_persona(personality_type)
-                session_id = await self.memory_manager.create_session(request.user_id, initial_persona)
-                session = await self.memory_manager.get_session(request.user_id, session_id)
-            
-            # 3. 根据情感调整人格状态
-            current_persona = session.persona_state
-            adjusted_persona = self.persona_manager.adjust_persona_by_emotion(
-                current_persona, 
-                emotion_result.emotion, 
-                emotion_result.confidence
-            )
+            turn = await self._prepare_turn(request)
             
-            # 更新人格状态
-            await self.memory_manager.update_persona_state(
-                request.user_id, 
-                session_id, 
-                adjusted_persona
+            # 7. 调用LLM生成回复
+            llm = LLMFactory.create_llm(request.llm_provider)
+            llm_response = await llm.chat_completion(
+                messages=turn.messages,
+                model=request.model,
+                enable_thinking=request.enable_thinking,
+                temperature=0.7
             )
             
-            # 4. 获取相关记忆
-            relevant_memories = self.knowledge_base.get_relevant_memories(
-                request.message, 
-                request.user_id, 
-                n_results=3
-            )
+            response = await self._complete_turn(request, turn, llm_response)
             
-            # 5. 构建对话上下文
-            conversation_context = await self.memory_manager.get_conversation_context(
-                request.user_id, 
-                session_id, 
-                context_length=5
-            )
+            logger.info(f"聊天处理完成，会话ID: {turn.session_id}")
+            return response
             
-            # 6. 获取机器人档案
-            bot_profile = await self.memory_manager.get_bot_profile(request.user_id)
-            if not bot_profile:
-                bot_profile = await self.memory_manager.create_default_bot_profile(request.user_id)
-            
-            # 7. 获取或创建世界观关键词
-            worldview_keywords = await self.memory_manager.get_worldview_keywords(request.user_id)
-            if not worldview_keywords:
-                # 首次使用，从环境变量创建世界观关键词
-                worldview_keywords = worldview_manager.create_worldview_keywords(request.user_id)
-                if worldview_keywords:
-                    await self.memory_manager.save_worldview_keywords(worldview_keywords)
-            
-            # 8. 分析世界观影响
-            worldview_analysis = worldview_manager.analyze_worldview_influence(
-                request.message, worldview_keywords
-            )
+        except Exception as e:
+            logger.error(f"聊天处理失败: {e}")
+            raise
+    
+    async def process_chat_stream(self, request: ChatRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式处理聊天请求
+        
+        Args:
+            request: 聊天请求
             
-            # 9. 生成个性化系统提示
-            # 构建上下文信息
-            context_info = {
-                "user_mood": emotion_result.description,
-                "conversation_topic": self._extract_topic_from_message(request.message),
-                "recent_memories": [memory['content'][:50] + "..." for memory in relevant_memories[:2]] if relevant_memories else [],
-                "persona_state": {
-                    "mood": adjusted_persona.mood,
-                    "energy_level": adjusted_persona.energy_level,
-                    "main_traits": {
-                        trait: value for trait, value in adjusted_persona.traits.items() 
-                        if value > 0.6
+        Yields:
+            Dict[str, Any]: 事件，包含 event（start/thinking/token/done/error）和 data
+        """
+        try:
+            turn = await self._prepare_turn(request)
+            
+            yield {
+                "event": "start",
+                "data": {
+                    "session_id": turn.session_id,
+                    "emotion_analysis": {
+                        "emotion": turn.emotion_result.emotion.value,
+                        "confidence": turn.emotion_result.confidence,
+                        "emoji": turn.emotion_result.emoji,
+                        "description": turn.emotion_result.description
                     }
-                },
-                "worldview_influence": worldview_analysis
+                }
             }
             
-            # 使用提示词管理器生成完整的系统提示
-            system_prompt = prompt_manager.generate_system_prompt(
-                bot_profile, context_info, worldview_keywords
-            )
-            
-            # 10. 构建消息列表
-            messages = [ChatMessage(role="system", content=system_prompt)]
-            
-            # 添加历史对话上下文
-            for ctx in conversation_context[-3:]:  # 最近3轮对话
-                messages.append(ChatMessage(
-                    role=ctx["role"], 
-                    content=ctx["content"]
-                ))
-            
-            # 添加当前用户消息
-            messages.append(ChatMessage(role="user", content=request.message))
-            
-            # 11. 调用LLM生成回复
+            # 7. 流式调用LLM，思维链步骤和回答片段分别输出
             llm = LLMFactory.create_llm(request.llm_provider)
-            llm_response = await llm.chat_completion(
-                messages=messages,
+            thinking_process = []
+            content_parts = []
+            usage = None
+            model = request.model
+            
+            async for chunk in llm.chat_completion_stream(
+                messages=turn.messages,
                 model=request.model,
                 enable_thinking=request.enable_thinking,
                 temperature=0.7
+            ):
+                if chunk.type == "thinking":
+                    thinking_process.append(chunk.content)
+                    yield {"event": "thinking", "data": {"step": chunk.content}}
+                elif chunk.type == "content":
+                    content_parts.append(chunk.content)
+                    yield {"event": "token", "data": {"content": chunk.content}}
+                elif chunk.type == "done":
+                    usage = chunk.usage
+                    model = chunk.model or model
+            
+            llm_response = ChatResponse(
+                content="".join(content_parts).strip(),
+                thinking_process=thinking_process or None,
+                usage=usage,
+                model=model
             )
             
-            # 12. 保存对话到记忆系统
-            user_message = ConversationMessage(
-                role="user",
-                content=request.message,
-                emotion=emotion_result.emotion.value,
-                emotion_confidence=emotion_result.confidence
-            )
-            
-            assistant_message = ConversationMessage(
-                role="assistant",
-                content=llm_response.content
-            )
+            response = await self._complete_turn(request, turn, llm_response)
             
-            await self.memory_manager.add_message(request.user_id, session_id, user_message)
-            await self.memory_manager.add_message(request.user_id, session_id, assistant_message)
+            logger.info(f"流式聊天处理完成，会话ID: {turn.session_id}")
+            yield {"event": "done", "data": response}
             
-            # 13. 添加到知识库
-            emotion_info = {
-                "emotion": emotion_result.emotion.value,
-                "confidence": emotion_result.confidence
-            }
+        except Exception as e:
+            logger.error(f"流式聊天处理失败: {e}")
+            yield {"event": "error", "data": {"message": str(e)}}
+    
+    async def _prepare_turn(self, request: ChatRequest) -> ChatTurn:
+        """
+        准备一轮对话：情感分析、加载会话与记忆、构建发送给LLM的消息
+        
+        Args:
+            request: 聊天请求
             
-            self.knowledge_base.add_conversation_turn(
-                user_message=request.message,
-                assistant_response=llm_response.content,
-                user_id=request.user_id,
-                session_id=session_id,
-                emotion_info=emotion_info
-            )
+        Returns:
+            ChatTurn: 对话轮次上下文
+        """
+        session_id = request.session_id or str(uuid.uuid4())
+        
+        # 1. 并发执行互不依赖的查询阶段：
+        #    会话、相关记忆、对话上下文、机器人档案、世界观关键词
+        (
+            session,
+            relevant_memories,
+            conversation_context,
+            bot_profile,
+            worldview_keywords
+        ) = await asyncio.gather(
+            self._get_or_create_session(request, session_id),
+            self.knowledge_base.aget_relevant_memories(
+                request.message, 
+                request.user_id, 
+                n_results=3,
+                rerank=request.memory_rerank
+            ),
+            self.memory_manager.get_conversation_context(
+                request.user_id, 
+                session_id, 
+                context_length=5
+            ),
+            self._get_or_create_bot_profile(request.user_id),
+            self._get_or_create_worldview_keywords(request.user_id)
+        )
+        session_id = session.session_id
+        
+        # 2. 一次扫描消息，结果同时用于情感分析、世界观影响分析和主题提取
+        #    （匹配器包含情感、主题和用户的世界观关键词，按世界观关键词版本缓存）
+        matcher = worldview_manager.get_keyword_matcher(worldview_keywords, self._turn_keywords)
+        matches = matcher.scan(request.message)
+        emotion_result = await self._analyze_emotion(request.message, matches)
+        logger.info(f"情感分析完成: {emotion_result.emotion.value}")
+        
+        # 3. 根据情感调整人格状态（依赖情感分析和会话）
+        current_persona = session.persona_state
+        adjusted_persona = self.persona_manager.adjust_persona_by_emotion(
+            current_persona, 
+            emotion_result.emotion, 
+            emotion_result.confidence
+        )
+        
+        # 4. 分析世界观影响（依赖世界观关键词）
+        worldview_analysis = worldview_manager.analyze_worldview_influence(
+            request.message, worldview_keywords, matcher.group_matches(matches)
+        )
+        
+        # 5. 生成个性化系统提示
+        # 构建上下文信息
+        context_info = {
+            "user_mood": emotion_result.description,
+            "conversation_topic": self._extract_topic_from_message(request.message, matches),
+            "recent_memories": [memory['content'][:50] + "..." for memory in relevant_memories[:2]] if relevant_memories else [],
+            "persona_state": {
+                "mood": adjusted_persona.mood,
+                "energy_level": adjusted_persona.energy_level,
+                "main_traits": {
+                    trait: value for trait, value in adjusted_persona.traits.items() 
+                    if value > 0.6
+                }
+            },
+            "worldview_influence": worldview_analysis
+        }
+        
+        # 使用提示词管理器生成完整的系统提示
+        system_prompt = prompt_manager.generate_system_prompt(
+            bot_profile, context_info, worldview_keywords
+        )
+        
+        # 6. 构建消息列表
+        messages = [ChatMessage(role="system", content=system_prompt)]
+        
+        # 添加历史对话上下文
+        for ctx in conversation_context[-3:]:  # 最近3轮对话
+            messages.append(ChatMessage(
+                role=ctx["role"], 
+                content=ctx["content"]
+            ))
+        
+        # 添加当前用户消息
+        messages.append(ChatMessage(role="user", content=request.message))
+        
+        return ChatTurn(
+            session_id=session_id,
+            emotion_result=emotion_result,
+            adjusted_persona=adjusted_persona,
+            relevant_memories=relevant_memories,
+            bot_profile=bot_profile,
+            worldview_analysis=worldview_analysis,
+            messages=messages
+        )
+    
+    async def _complete_turn(
+        self, 
+        request: ChatRequest, 
+        turn: ChatTurn, 
+        llm_response: ChatResponse
+    ) -> ChatbotResponse:
+        """
+        完成一轮对话：提交持久化任务并构建响应
+        
+        Args:
+            request: 聊天请求
+            turn: 对话轮次上下文
+            llm_response: LLM回复
             
-            # 14. 构建响应
-            response = ChatbotResponse(
-                response=f"{llm_response.content} {emotion_result.emoji}",
-                session_id=session_id,
-                thinking_process=llm_response.thinking_process,
-                emotion_analysis={
-                    "emotion": emotion_result.emotion.value,
-                    "confidence": emotion_result.confidence,
-                    "emoji": emotion_result.emoji,
-                    "description": emotion_result.description
-                },
-                persona_state={
-                    "personality_type": adjusted_persona.personality_type,
-                    "mood": adjusted_persona.mood,
-                    "energy_level": adjusted_persona.energy_level,
-                    "main_traits": {
-                        trait: value for trait, value in adjusted_persona.traits.items() 
-                        if value > 0.6
-                    }
-                },
-                relevant_memories=[
-                    {
-                        "content": memory["content"][:100] + "...",
-                        "similarity": memory["similarity"]
-                    }
-                    for memory in relevant_memories
-                ],
-                knowledge_base_action="stored",
-                metadata={
-                    "llm_model": llm_response.model,
-                    "llm_usage": llm_response.usage,
-                    "processing_time": datetime.now().isoformat(),
-                    "bot_name": bot_profile.bot_name,
-                    "bot_personality": bot_profile.personality_type,
-                    "worldview_influence": worldview_analysis
+        Returns:
+            ChatbotResponse: 聊天响应
+        """
+        # 8. 消息、人格状态和知识库写入交给回写队列，回复生成后立即返回
+        user_message = ConversationMessage(
+            role="user",
+            content=request.message,
+            emotion=turn.emotion_result.emotion.value,
+            emotion_confidence=turn.emotion_result.confidence
+        )
+        
+        assistant_message = ConversationMessage(
+            role="assistant",
+            content=llm_response.content
+        )
+        
+        emotion_info = {
+            "emotion": turn.emotion_result.emotion.value,
+            "confidence": turn.emotion_result.confidence
+        }
+        
+        await self.write_behind.submit(PersistenceJob(
+            user_id=request.user_id,
+            session_id=turn.session_id,
+            user_message=user_message,
+            assistant_message=assistant_message,
+            persona_state=turn.adjusted_persona,
+            emotion_info=emotion_info
+        ))
+        
+        # 9. 构建响应
+        return ChatbotResponse(
+            response=f"{llm_response.content} {turn.emotion_result.emoji}",
+            session_id=turn.session_id,
+            thinking_process=llm_response.thinking_process,
+            emotion_analysis={
+                "emotion": turn.emotion_result.emotion.value,
+                "confidence": turn.emotion_result.confidence,
+                "emoji": turn.emotion_result.emoji,
+                "description": turn.emotion_result.description
+            },
+            persona_state={
+                "personality_type": turn.adjusted_persona.personality_type,
+                "mood": turn.adjusted_persona.mood,
+                "energy_level": turn.adjusted_persona.energy_level,
+                "main_traits": {
+                    trait: value for trait, value in turn.adjusted_persona.traits.items() 
+                    if value > 0.6
                 }
-            )
+            },
+            relevant_memories=[
+                {
+                    "content": memory["content"][:100] + "...",
+                    "similarity": memory["similarity"]
+                }
+                for memory in turn.relevant_memories
+            ],
+            knowledge_base_action="queued" if self.write_behind.running else "stored",
+            metadata={
+                "llm_model": llm_response.model,
+                "llm_usage": llm_response.usage,
+                "processing_time": datetime.now().isoformat(),
+                "bot_name": turn.bot_profile.bot_name,
+                "bot_personality": turn.bot_profile.personality_type,
+                "worldview_influence": turn.worldview_analysis
+            }
+        )
+    
+    async def _analyze_emotion(self, text: str, matches: Optional[Dict[str, int]] = None) -> EmotionResult:
+        """
+        分析单条消息的情感：启用模型时使用模型结果，否则使用关键词分析
+        
+        Args:
+            text: 消息内容
+            matches: 已有的关键词扫描结果，提供时关键词分析不再重新扫描
             
-            logger.info(f"聊天处理完成，会话ID: {session_id}")
-            return response
+        Returns:
+            EmotionResult: 情感分析结果
+        """
+        if matches is not None:
+            keyword_result = self.emotion_analyzer.analyze_matches(matches)
+        else:
+            keyword_result = self.emotion_analyzer.analyze_emotion(text)
+        if self.emotion_model:
+            return await self.emotion_model.aanalyze_emotion(text, fallback=keyword_result)
+        return keyword_result
+    
+    async def analyze_emotions(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        批量情感分析
+        
+        Args:
+            texts: 文本列表
             
-        except Exception as e:
-            logger.error(f"聊天处理失败: {e}")
-            raise
+        Returns:
+            List[Dict[str, Any]]: 与输入一一对应的情感分析结果
+        """
+        if len(texts) > settings.emotion_batch_max_texts:
+            raise ValueError(f"单次最多分析 {settings.emotion_batch_max_texts} 条文本")
+        if self.emotion_model:
+            results = await self.emotion_model.aanalyze_emotions(texts)
+        else:
+            results = await self.emotion_analyzer.aanalyze_emotions(texts)
+        return [emotion_to_dict(result) for result in results]
+    
+    async def rescore_emotion_history(self, user_id: str, write_back: bool = False) -> Dict[str, Any]:
+        """
+        用当前的情感分析器对用户全部历史消息重新评分，并汇总情感分布
+        
+        Args:
+            user_id: 用户ID
+            write_back: 是否把新的情感标注写回消息
+            
+        Returns:
+            Dict[str, Any]: 情感分布统计，以及写回的消息数
+        """
+        messages = await self.memory_manager.get_user_messages(user_id)
+        rescored = await asyncio.to_thread(rescore_messages, self.emotion_analyzer, messages)
+        
+        updated = 0
+        if write_back:
+            updated = await self.memory_manager.update_message_emotions(
+                emotion_updates(messages, rescored["results"])
+            )
+        
+        logger.info(f"用户 {user_id} 情感历史重新评分完成: {len(messages)} 条消息，写回 {updated} 条")
+        return {"user_id": user_id, **rescored["summary"], "updated": updated}
     
     async def get_session_summary(self, user_id: str, session_id: str) -> Dict[str, Any]:
         """
@@ -269,17 +592,17 @@ class ChatbotCore:
                 return {"error": "会话不存在"}
             
             # 获取知识库统计
-            kb_stats = self.knowledge_base.get_collection_stats()
+            kb_stats = await self.knowledge_base.aget_collection_stats()
             
             # 生成会话总结
-            session_summary = self.knowledge_base.summarize_session(user_id, session_id)
+            session_summary = await self.knowledge_base.asummarize_session(user_id, session_id)
             
             return {
                 "session_id": session_id,
                 "user_id": user_id,
                 "created_at": session.created_at.isoformat(),
                 "updated_at": session.updated_at.isoformat(),
-                "message_count": len(session.messages),
+                "message_count": session.message_count,
                 "current_persona": {
                     "personality_type": session.persona_state.personality_type,
                     "mood": session.persona_state.mood,
@@ -566,26 +889,82 @@ class ChatbotCore:
             logger.error(f"重置世界观设定失败: {e}")
             return False
     
-    def _extract_topic_from_message(self, message: str) -> str:
-        """从消息中提取对话主题"""
+    async def _get_or_create_session(self, request: ChatRequest, session_id: str) -> ConversationSession:
+        """
+        获取会话，不存在时按请求的人格类型创建（一次数据库往返）
+        
+        Args:
+            request: 聊天请求
+            session_id: 会话ID
+            
+        Returns:
+            ConversationSession: 包含会话ID和人格状态的会话对象
+        """
+        personality_type = PersonalityType.GENTLE
+        if request.personality_type:
+            try:
+                personality_type = PersonalityType(request.personality_type)
+            except ValueError:
+                logger.warning(f"无效的人格类型: {request.personality_type}")
+        
+        initial_persona = self.persona_manager.create_default_persona(personality_type)
+        session = await self.memory_manager.upsert_session_with_persona(
+            request.user_id, session_id, initial_persona
+        )
+        if not session:
+            raise RuntimeError(f"无法获取或创建会话: {session_id}")
+        return session
+    
+    async def _get_or_create_bot_profile(self, user_id: str) -> BotProfile:
+        """获取机器人档案，不存在时创建默认档案"""
+        bot_profile = await self.memory_manager.get_bot_profile(user_id)
+        if not bot_profile:
+            bot_profile = await self.memory_manager.create_default_bot_profile(user_id)
+        return bot_profile
+    
+    async def _get_or_create_worldview_keywords(self, user_id: str) -> List[WorldviewKeywords]:
+        """获取世界观关键词，首次使用时从环境变量创建"""
+        worldview_keywords = await self.memory_manager.get_worldview_keywords(user_id)
+        if not worldview_keywords:
+            worldview_keywords = worldview_manager.create_worldview_keywords(user_id)
+            if worldview_keywords:
+                await self.memory_manager.save_worldview_keywords(worldview_keywords)
+        return worldview_keywords
+    
+    def _extract_topic_from_message(self, message: str, matches: Optional[Dict[str, int]] = None) -> str:
+        """从消息中提取对话主题（提供扫描结果时直接查表，不再扫描消息）"""
         # 简单的主题提取逻辑，可以后续优化
-        keywords = {
-            "问候": ["你好", "您好", "hi", "hello", "早上好", "晚上好"],
-            "询问": ["什么", "怎么", "为什么", "如何", "哪里", "谁"],
-            "情感": ["开心", "难过", "生气", "担心", "兴奋", "紧张"],
-            "日常": ["吃饭", "睡觉", "工作", "学习", "休息"],
-            "帮助": ["帮助", "帮忙", "协助", "支持"],
-            "聊天": ["聊天", "说话", "交流", "谈话"]
-        }
+        if matches is None:
+            message_lower = message.lower()
+            matches = {word: 1 for words in self.topic_keywords.values() for word in words if word in message_lower}
         
-        message_lower = message.lower()
-        for topic, words in keywords.items():
-            if any(word in message_lower for word in words):
+        for topic, words in self.topic_keywords.items():
+            if any(matches.get(word) for word in words):
                 return topic
         
         return "一般对话"
     
+    def get_runtime_stats(self) -> Dict[str, Any]:
+        """
+        获取运行时指标
+        
+        Returns:
+            Dict[str, Any]: 各子系统的运行指标
+        """
+        return {
+            "rag_executor": self.knowledge_base.executor.get_stats(),
+            "embedding_batcher": self.knowledge_base.embedding_service.get_stats(),
+            "write_behind": self.write_behind.get_stats(),
+            "consolidation": self.consolidation.get_stats(),
+            "retention": self.retention.get_stats(),
+            "emotion_model": self.emotion_model.get_stats() if self.emotion_model else None,
+            "keyword_matchers": worldview_manager.get_matcher_stats(),
+            "retrieval_tracker": self.knowledge_base.retrieval_tracker.get_stats(),
+            "hot_state_cache": self.memory_manager.get_cache_stats()
+        }
+    
     def close(self):
         """关闭资源"""
+        self.knowledge_base.close()
         self.memory_manager.close()
         logger.info("聊天机器人核心控制器已关闭") 
\ No newline at end of file
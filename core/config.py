@@ -26,6 +26,12 @@ class Settings(BaseSettings):
     
     default_llm_provider: str = os.getenv("DEFAULT_LLM_PROVIDER", "deepseek")
     
+    # LLM HTTP连接池配置（每个提供商和API地址共享一个长连接客户端）
+    llm_http_max_connections: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+    llm_http_max_keepalive_connections: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    llm_http_keepalive_expiry: float = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+    llm_http2: bool = os.getenv("LLM_HTTP2", "false").lower() in ["true", "1", "yes"]
+    
     # 🌟 露娜·天城 角色档案配置
     # 基础身份信息
     default_bot_name: str = os.getenv("DEFAULT_BOT_NAME", "露娜·天城")
@@ -119,6 +125,12 @@ class Settings(BaseSettings):
     mongodb_url: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     mongodb_database: str = os.getenv("MONGODB_DATABASE", "chatbot_db")
     
+    # 热点数据缓存配置（机器人档案、世界观关键词）
+    hot_state_cache_size: int = int(os.getenv("HOT_STATE_CACHE_SIZE", "10000"))
+    hot_state_cache_ttl: float = float(os.getenv("HOT_STATE_CACHE_TTL", "300"))
+    # 编译好的世界观关键词匹配器缓存条目数（关键词相同的用户共用）
+    keyword_matcher_cache_size: int = int(os.getenv("KEYWORD_MATCHER_CACHE_SIZE", "1024"))
+    
     # 日志配置
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     
@@ -131,6 +143,116 @@ class Settings(BaseSettings):
     # 向量数据库配置
     chroma_persist_directory: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
     
+    # 向量存储后端配置（chroma 或 mmap；mmap 为每个用户单独保存内存映射向量文件）
+    vector_store_backend: str = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+    mmap_store_directory: str = os.getenv("MMAP_STORE_DIRECTORY", "./vector_store")
+    mmap_store_dtype: str = os.getenv("MMAP_STORE_DTYPE", "float32")
+    # 同时保持打开（常驻内存）的用户分区数，超出后关闭最久未使用的分区
+    mmap_store_max_open_partitions: int = int(os.getenv("MMAP_STORE_MAX_OPEN_PARTITIONS", "256"))
+    # 分区中已删除的行占比达到该值时压缩分区（重写文件回收磁盘和内存），0 表示不压缩
+    mmap_store_compact_ratio: float = float(os.getenv("MMAP_STORE_COMPACT_RATIO", "0.3"))
+    
+    # ChromaDB 分区配置（none 为单一集合；user 为每个用户一个集合；hash 为按用户ID哈希分片）
+    vector_store_partitioning: str = os.getenv("VECTOR_STORE_PARTITIONING", "none")
+    vector_store_shards: int = int(os.getenv("VECTOR_STORE_SHARDS", "16"))
+    
+    # 句向量编码器配置（sentence_transformers 使用 PyTorch；onnx 使用 ONNX Runtime，可加载 int8 量化模型）
+    encoder_backend: str = os.getenv("ENCODER_BACKEND", "sentence_transformers")
+    encoder_model_name: str = os.getenv("ENCODER_MODEL_NAME", "all-MiniLM-L6-v2")
+    encoder_max_length: int = int(os.getenv("ENCODER_MAX_LENGTH", "256"))
+    onnx_model_path: str = os.getenv("ONNX_MODEL_PATH", "./models/all-MiniLM-L6-v2-onnx/model_int8.onnx")
+    onnx_tokenizer_path: str = os.getenv("ONNX_TOKENIZER_PATH", "")
+    onnx_num_threads: int = int(os.getenv("ONNX_NUM_THREADS", "0"))
+    
+    # 混合检索配置（向量检索与中文二元组 BM25 词法检索按倒数排名融合）
+    hybrid_retrieval_enabled: bool = os.getenv("HYBRID_RETRIEVAL_ENABLED", "true").lower() in ["true", "1", "yes"]
+    # 词法检索的延迟预算（从检索开始计时），向量检索总会等待完成
+    hybrid_latency_budget_ms: float = float(os.getenv("HYBRID_LATENCY_BUDGET_MS", "150"))
+    hybrid_rrf_k: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    # 向量相似度不足的词法检索条目，命中查询词项（二元组）的比例至少达到该值才作为相关记忆
+    hybrid_min_term_coverage: float = float(os.getenv("HYBRID_MIN_TERM_COVERAGE", "0.5"))
+    lexical_index_max_users: int = int(os.getenv("LEXICAL_INDEX_MAX_USERS", "1000"))
+    
+    # 共享知识配置：检索记忆时是否同时检索共享知识（未指定用户导入的预制知识库），按排名与用户记忆合并；
+    # 每轮对话会多一次向量检索，导入共享知识后再开启
+    shared_knowledge_enabled: bool = os.getenv("SHARED_KNOWLEDGE_ENABLED", "false").lower() in ["true", "1", "yes"]
+    
+    # 相关记忆重排配置（过量召回倍数、MMR相关性权重、近似重复阈值）
+    rerank_enabled: bool = os.getenv("RERANK_ENABLED", "true").lower() in ["true", "1", "yes"]
+    rerank_fetch_multiplier: int = int(os.getenv("RERANK_FETCH_MULTIPLIER", "4"))
+    rerank_mmr_lambda: float = float(os.getenv("RERANK_MMR_LAMBDA", "0.7"))
+    rerank_dedup_threshold: float = float(os.getenv("RERANK_DEDUP_THRESHOLD", "0.95"))
+    
+    # 记忆整合配置（后台把各会话中早于 CONSOLIDATION_MIN_AGE_HOURS 的对话聚类为摘要，替换原始向量）
+    consolidation_enabled: bool = os.getenv("CONSOLIDATION_ENABLED", "false").lower() in ["true", "1", "yes"]
+    consolidation_interval: float = float(os.getenv("CONSOLIDATION_INTERVAL", "600"))
+    consolidation_min_age_hours: float = float(os.getenv("CONSOLIDATION_MIN_AGE_HOURS", "24"))
+    consolidation_min_items: int = int(os.getenv("CONSOLIDATION_MIN_ITEMS", "8"))
+    consolidation_ratio: int = int(os.getenv("CONSOLIDATION_RATIO", "4"))
+    consolidation_sessions_per_run: int = int(os.getenv("CONSOLIDATION_SESSIONS_PER_RUN", "50"))
+    
+    # 知识库保留策略配置（条目保留天数、每用户条目上限，0 表示不限制；超出上限时按 importance 或 lru 淘汰）
+    retention_enabled: bool = os.getenv("RETENTION_ENABLED", "false").lower() in ["true", "1", "yes"]
+    retention_ttl_days: float = float(os.getenv("RETENTION_TTL_DAYS", "0"))
+    retention_max_items_per_user: int = int(os.getenv("RETENTION_MAX_ITEMS_PER_USER", "0"))
+    retention_eviction: str = os.getenv("RETENTION_EVICTION", "importance")
+    retention_interval: float = float(os.getenv("RETENTION_INTERVAL", "300"))
+    retention_users_per_run: int = int(os.getenv("RETENTION_USERS_PER_RUN", "100"))
+    retention_delete_batch_size: int = int(os.getenv("RETENTION_DELETE_BATCH_SIZE", "200"))
+    retention_max_deletes_per_run: int = int(os.getenv("RETENTION_MAX_DELETES_PER_RUN", "5000"))
+    retention_tracker_size: int = int(os.getenv("RETENTION_TRACKER_SIZE", "100000"))
+    
+    # 知识库批量导入配置（API 只允许导入 INGESTION_DIRECTORY 下的文件）
+    ingestion_directory: str = os.getenv("INGESTION_DIRECTORY", "./knowledge")
+    ingestion_checkpoint_directory: str = os.getenv("INGESTION_CHECKPOINT_DIRECTORY", "./ingestion_checkpoints")
+    ingestion_batch_size: int = int(os.getenv("INGESTION_BATCH_SIZE", "256"))
+    ingestion_workers: int = int(os.getenv("INGESTION_WORKERS", "2"))
+    ingestion_chunk_size: int = int(os.getenv("INGESTION_CHUNK_SIZE", "400"))
+    ingestion_chunk_overlap: int = int(os.getenv("INGESTION_CHUNK_OVERLAP", "50"))
+    
+    # 模型情感分析配置（在独立进程池中运行 EMOTION_MODEL_NAME，超出延迟预算时使用关键词分析结果）
+    emotion_model_enabled: bool = os.getenv("EMOTION_MODEL_ENABLED", "false").lower() in ["true", "1", "yes"]
+    emotion_model_processes: int = int(os.getenv("EMOTION_MODEL_PROCESSES", "1"))
+    emotion_model_threads: int = int(os.getenv("EMOTION_MODEL_THREADS", "2"))
+    emotion_model_max_length: int = int(os.getenv("EMOTION_MODEL_MAX_LENGTH", "128"))
+    emotion_model_batch_size: int = int(os.getenv("EMOTION_MODEL_BATCH_SIZE", "16"))
+    emotion_model_batch_max_wait: float = float(os.getenv("EMOTION_MODEL_BATCH_MAX_WAIT", "0.01"))
+    emotion_model_latency_budget_ms: float = float(os.getenv("EMOTION_MODEL_LATENCY_BUDGET_MS", "200"))
+    emotion_model_cache_size: int = int(os.getenv("EMOTION_MODEL_CACHE_SIZE", "10000"))
+    # 模型标签到情感类型（joy/sadness/anger/fear/surprise/love/positive/negative/neutral）的映射，未列出的标签视为 neutral
+    emotion_model_label_mapping: str = os.getenv(
+        "EMOTION_MODEL_LABEL_MAPPING",
+        "joy:joy,sadness:sadness,anger:anger,fear:fear,surprise:surprise,love:love,"
+        "disgust:anger,optimism:positive,trust:positive,anticipation:positive,pessimism:negative"
+    )
+    
+    # 批量情感分析配置（单次请求的文本数上限）
+    emotion_batch_max_texts: int = int(os.getenv("EMOTION_BATCH_MAX_TEXTS", "1000"))
+    
+    # 启动配置（编码器和向量存储在后台并行加载，预热后首个请求无需等待模型初始化）
+    startup_prewarm: bool = os.getenv("STARTUP_PREWARM", "true").lower() in ["true", "1", "yes"]
+    
+    # 启动重试配置（子系统初始化失败后按指数退避重试，首次等待秒数和最长等待秒数）
+    startup_retry_initial_delay: float = float(os.getenv("STARTUP_RETRY_INITIAL_DELAY", "1"))
+    startup_retry_max_delay: float = float(os.getenv("STARTUP_RETRY_MAX_DELAY", "60"))
+    
+    # 知识库执行器配置（句子编码和向量库读写在专用线程池中执行）
+    rag_executor_workers: int = int(os.getenv("RAG_EXECUTOR_WORKERS", "2"))
+    rag_executor_queue_size: int = int(os.getenv("RAG_EXECUTOR_QUEUE_SIZE", "64"))
+    
+    # 向量缓存配置（按文本内容哈希缓存句向量的内存上限，单位MB，为0时禁用缓存）
+    embedding_cache_max_mb: float = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "64"))
+    
+    # 编码微批配置（并发请求的编码合并成批，达到批大小或等待超时后提交）
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    embedding_batch_max_wait: float = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT", "0.005"))
+    
+    # 回写队列配置（回复后的消息、人格状态和向量写入由后台任务批量完成）
+    write_behind_queue_size: int = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "1000"))
+    write_behind_batch_size: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "16"))
+    write_behind_flush_interval: float = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.05"))
+    write_behind_max_retries: int = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "3"))
+    
     class Config:
         env_file = ".env"
 
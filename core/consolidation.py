@@ -0,0 +1,145 @@
+"""
+记忆整合任务
+后台定期选出含有较早对话（早于 CONSOLIDATION_MIN_AGE_HOURS）的会话，把这些对话聚类整合为摘要（MemorySummary），
+并用摘要向量替换原始向量，使每个用户的检索索引规模保持有界
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from core.config import settings
+from core.logger import logger
+from memory.manager import MemoryManager
+from rag.knowledge_base import KnowledgeBase
+
+
+class ConsolidationWorker:
+    """记忆整合后台任务"""
+
+    def __init__(
+        self,
+        memory_manager: MemoryManager,
+        knowledge_base: KnowledgeBase,
+        interval: float = None,
+        min_age_hours: float = None,
+        min_items: int = None,
+        ratio: int = None,
+        sessions_per_run: int = None
+    ):
+        self.memory_manager = memory_manager
+        self.knowledge_base = knowledge_base
+        self.interval = interval or settings.consolidation_interval
+        self.min_age_hours = min_age_hours if min_age_hours is not None else settings.consolidation_min_age_hours
+        self.min_items = min_items or settings.consolidation_min_items
+        self.ratio = ratio or settings.consolidation_ratio
+        self.sessions_per_run = sessions_per_run or settings.consolidation_sessions_per_run
+
+        self._worker_task: Optional[asyncio.Task] = None
+
+        # 运行指标
+        self._runs = 0
+        self._sessions = 0
+        self._summaries = 0
+        self._consolidated_items = 0
+        self._failures = 0
+        self._last_run_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker_task is not None and not self._worker_task.done()
+
+    async def start(self):
+        """启动后台整合任务"""
+        if self.running:
+            return
+        self._worker_task = asyncio.create_task(self._worker())
+        logger.info(f"记忆整合任务已启动，间隔 {self.interval} 秒")
+
+    async def stop(self):
+        """停止后台整合任务"""
+        if not self.running:
+            return
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+        except asyncio.CancelledError:
+            pass
+        self._worker_task = None
+        logger.info("记忆整合任务已停止")
+
+    async def _worker(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"记忆整合异常: {e}")
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        执行一轮整合
+
+        Returns:
+            Dict[str, int]: 本轮处理的会话数和生成的摘要数
+        """
+        self._runs += 1
+        self._last_run_at = datetime.now()
+        cutoff = self._last_run_at - timedelta(hours=self.min_age_hours)
+
+        sessions = await self.memory_manager.get_sessions_for_consolidation(cutoff, self.sessions_per_run)
+        created = 0
+        for session in sessions:
+            user_id, session_id = session["user_id"], session["session_id"]
+            try:
+                summaries = await self.knowledge_base.aplan_consolidation(
+                    user_id, session_id, cutoff.timestamp(), self.min_items, self.ratio
+                )
+                complete = True
+                for summary in summaries:
+                    saved = await self.memory_manager.create_memory_summary(
+                        user_id=user_id,
+                        session_id=session_id,
+                        summary_text=summary["summary_text"],
+                        key_topics=summary["key_topics"],
+                        emotional_tone=summary["emotional_tone"],
+                        importance_score=summary["importance_score"]
+                    )
+                    if not saved:
+                        # 摘要没有保存时保留簇内的原始条目，下一轮重新整合
+                        complete = False
+                        continue
+                    await self.knowledge_base.aapply_consolidation(user_id, session_id, summary)
+                    self._consolidated_items += len(summary["source_ids"])
+                    created += 1
+                if not complete:
+                    self._failures += 1
+                    logger.warning(f"会话 {session_id} 部分摘要保存失败，下次整合时重试")
+                    continue
+                await self.memory_manager.mark_session_consolidated(user_id, session_id, cutoff)
+                self._sessions += 1
+            except Exception as e:
+                self._failures += 1
+                logger.error(f"会话 {session_id} 记忆整合失败: {e}")
+
+        self._summaries += created
+        if sessions:
+            logger.info(f"记忆整合完成: {len(sessions)} 个会话，生成 {created} 条摘要")
+        return {"sessions": len(sessions), "summaries": created}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取整合任务指标
+
+        Returns:
+            Dict[str, Any]: 指标信息
+        """
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "runs": self._runs,
+            "sessions": self._sessions,
+            "summaries": self._summaries,
+            "consolidated_items": self._consolidated_items,
+            "failures": self._failures,
+            "last_run_at": self._last_run_at.isoformat() if self._last_run_at else None
+        }
@@ -0,0 +1,158 @@
+"""
+有界执行器
+为句子编码、向量库读写等阻塞型任务提供专用的线程池/进程池，
+避免这些任务在异步请求中阻塞事件循环
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from core.logger import logger
+
+
+class BoundedExecutor:
+    """有界执行器：固定工作线程/进程数量，并限制排队任务数量"""
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int = 2,
+        max_queue_size: int = 64,
+        use_processes: bool = False,
+        initializer: Optional[Callable[..., Any]] = None,
+        initargs: tuple = ()
+    ):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max(0, max_queue_size)
+        self.use_processes = use_processes
+        self._initializer = initializer
+        self._initargs = initargs
+
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        # 同时在执行或排队的任务上限，超过后调用方在事件循环中等待（背压）
+        self._slots = asyncio.Semaphore(self.max_workers + self.max_queue_size)
+
+        # 运行指标
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+        self._peak_queue_depth = 0
+        self._total_latency = 0.0
+
+    def _get_executor(self) -> Executor:
+        """延迟创建底层执行器"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            initializer=self._initializer,
+                            initargs=self._initargs
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix=f"{self.name}-worker",
+                            initializer=self._initializer,
+                            initargs=self._initargs
+                        )
+                    logger.info(
+                        f"执行器 {self.name} 已创建: "
+                        f"{'进程' if self.use_processes else '线程'}数 {self.max_workers}, "
+                        f"队列上限 {self.max_queue_size}"
+                    )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在执行器中运行阻塞函数
+
+        Args:
+            func: 要执行的函数（进程池模式下必须可序列化）
+            *args: 函数参数
+
+        Returns:
+            Any: 函数返回值
+        """
+        with self._stats_lock:
+            self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            with self._stats_lock:
+                self._waiting -= 1
+
+        started = time.perf_counter()
+        with self._stats_lock:
+            self._in_flight += 1
+            self._peak_queue_depth = max(self._peak_queue_depth, self._queue_depth())
+
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            self._finish(started, failed=True)
+            raise
+
+        try:
+            # shield：调用方被取消时工作线程仍在执行，任务真正结束后才释放名额并计入统计
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._finish(started, failed=future.cancelled() or future.exception() is not None)
+            else:
+                future.add_done_callback(
+                    lambda done: self._finish(started, failed=done.cancelled() or done.exception() is not None)
+                )
+
+    def _finish(self, started: float, failed: bool):
+        """任务结束：记录结果和耗时，释放名额"""
+        with self._stats_lock:
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+            self._in_flight -= 1
+            self._total_latency += time.perf_counter() - started
+        self._slots.release()
+
+    def _queue_depth(self) -> int:
+        """已提交但尚未分配到工作线程/进程的任务数"""
+        return max(0, self._in_flight - self.max_workers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取执行器运行指标
+
+        Returns:
+            Dict[str, Any]: 指标信息
+        """
+        with self._stats_lock:
+            finished = self._completed + self._failed
+            return {
+                "name": self.name,
+                "kind": "process" if self.use_processes else "thread",
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+                "in_flight": self._in_flight,
+                "queue_depth": self._queue_depth(),
+                "peak_queue_depth": self._peak_queue_depth,
+                "waiting_for_slot": self._waiting,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_latency_ms": round(self._total_latency / finished * 1000, 2) if finished else 0.0
+            }
+
+    def shutdown(self, wait: bool = True):
+        """关闭执行器"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+            logger.info(f"执行器 {self.name} 已关闭")
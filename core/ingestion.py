@@ -0,0 +1,131 @@
+"""
+知识库导入任务
+API 提交的批量导入在后台线程中执行，可通过任务ID查询进度；
+只允许导入 INGESTION_DIRECTORY 目录下的文件
+"""
+import asyncio
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from core.config import settings
+from core.logger import logger
+from rag.ingestion import BulkIngestor
+from rag.knowledge_base import KnowledgeBase
+
+
+class IngestRequest(BaseModel):
+    """导入请求"""
+    # 相对于 INGESTION_DIRECTORY 的文件路径
+    path: str
+    # 知识所属用户，为空时作为共享知识
+    user_id: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    resume: bool = True
+
+
+class IngestionJobManager:
+    """知识库导入任务管理"""
+
+    def __init__(self, knowledge_base: KnowledgeBase, directory: str = None):
+        self.knowledge_base = knowledge_base
+        self.directory = os.path.abspath(directory or settings.ingestion_directory)
+        self.ingestor = BulkIngestor(knowledge_base)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stop_event = threading.Event()
+
+    def resolve_path(self, path: str) -> str:
+        """
+        把请求中的路径解析为导入目录下的绝对路径
+
+        Args:
+            path: 相对路径
+
+        Returns:
+            str: 绝对路径
+        """
+        resolved = os.path.realpath(os.path.join(self.directory, path))
+        if os.path.commonpath([resolved, os.path.realpath(self.directory)]) != os.path.realpath(self.directory):
+            raise ValueError("只能导入导入目录下的文件")
+        if not os.path.isfile(resolved):
+            raise FileNotFoundError(f"文件不存在: {path}")
+        return resolved
+
+    def submit(self, request: IngestRequest) -> Dict[str, Any]:
+        """
+        提交导入任务，同一文件同时只能有一个导入任务
+
+        Args:
+            request: 导入请求
+
+        Returns:
+            Dict[str, Any]: 任务信息
+        """
+        source = self.resolve_path(request.path)
+        for job in self._jobs.values():
+            if job["source"] == source and job["status"] == "running":
+                return job
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "source": source,
+            "user_id": request.user_id,
+            "status": "running",
+            "chunks_done": 0,
+            "ingested": 0,
+            "elapsed": 0.0,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "finished_at": None
+        }
+        self._jobs[job_id] = job
+        self._tasks[job_id] = asyncio.create_task(self._run(job, request))
+        logger.info(f"已提交知识库导入任务 {job_id}: {source}")
+        return job
+
+    async def _run(self, job: Dict[str, Any], request: IngestRequest):
+        def progress(state: Dict[str, Any]):
+            job.update(chunks_done=state["chunks_done"], ingested=state["ingested"], elapsed=state["elapsed"])
+
+        try:
+            result = await asyncio.to_thread(
+                self.ingestor.ingest,
+                job["source"],
+                request.user_id,
+                request.metadata,
+                request.resume,
+                progress,
+                self._stop_event
+            )
+            job.update(
+                status="completed" if result["completed"] else "stopped",
+                ingested=result["ingested"],
+                elapsed=result["elapsed"]
+            )
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+            logger.error(f"知识库导入任务 {job['job_id']} 失败: {e}")
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            self._tasks.pop(job["job_id"], None)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务信息"""
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """列出所有任务"""
+        return list(self._jobs.values())
+
+    async def stop(self):
+        """停止正在执行的导入：写完已编码的批次后退出，下次提交同一文件时从检查点继续"""
+        self._stop_event.set()
+        if self._tasks:
+            logger.info(f"等待 {len(self._tasks)} 个知识库导入任务结束")
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
@@ -0,0 +1,169 @@
+"""
+多关键词匹配
+构造时把全部关键词编译为少量正则（互相不可能重叠的关键词合并为一个多选正则），
+之后每段文本只需扫描这几个正则，即可得到所有关键词（及其所属分组）的出现次数，
+扫描次数与关键词数量无关
+"""
+import re
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Mapping
+
+
+def _can_overlap(a: str, b: str) -> bool:
+    """两个关键词在文本中的出现是否可能重叠（包含关系，或一方的后缀是另一方的前缀）"""
+    if a in b or b in a:
+        return True
+    for size in range(1, min(len(a), len(b))):
+        if a[-size:] == b[:size] or b[-size:] == a[:size]:
+            return True
+    return False
+
+
+class KeywordMatcher:
+    """多关键词匹配器
+
+    关键词按分组（如情感类型）组织，同一关键词可以属于多个分组。
+    计数语义与对每个关键词分别执行 re.findall 相同：同一关键词的多次出现互不重叠，
+    不同关键词之间的重叠不受影响。
+
+    可能相互重叠的关键词（如"不"和"不好"）放在不同的层中，同一层的关键词在文本中
+    的出现不会相交，因此一次从左到右的多选扫描就能找到它们的全部出现位置。
+    """
+
+    def __init__(self, groups: Mapping[Hashable, Iterable[str]], case_sensitive: bool = False):
+        """
+        Args:
+            groups: 分组 -> 关键词列表
+            case_sensitive: 是否区分大小写（不区分时关键词和文本都转为小写）
+        """
+        self.case_sensitive = case_sensitive
+        self.keywords: List[str] = []
+        self.keyword_groups: List[List[Hashable]] = []
+        self.groups: List[Hashable] = list(groups)
+        self._index: Dict[str, int] = {}
+
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                keyword = keyword if case_sensitive else keyword.lower()
+                if keyword not in self._index:
+                    self._index[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    self.keyword_groups.append([])
+                if group not in self.keyword_groups[self._index[keyword]]:
+                    self.keyword_groups[self._index[keyword]].append(group)
+
+        self._patterns = self._compile()
+
+    def _compile(self) -> List[re.Pattern]:
+        """把关键词贪心分层（同层互不重叠），每层编译为一个多选正则"""
+        layers: List[List[str]] = []
+        # 长关键词优先放置，短关键词（通常与更多关键词重叠）放到后面的层
+        for keyword in sorted(self.keywords, key=len, reverse=True):
+            for layer in layers:
+                if not any(_can_overlap(keyword, other) for other in layer):
+                    layer.append(keyword)
+                    break
+            else:
+                layers.append([keyword])
+        return [re.compile("|".join(re.escape(keyword) for keyword in layer)) for layer in layers]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    @property
+    def passes(self) -> int:
+        """每段文本需要的扫描次数"""
+        return len(self._patterns)
+
+    def scan(self, text: str) -> Dict[str, int]:
+        """
+        扫描文本，得到出现过的关键词及其出现次数（同一关键词的出现互不重叠）
+
+        扫描结果可以交给多个使用方，各自按自己的关键词查表解读，同一段文本只需扫描一次
+
+        Args:
+            text: 文本
+
+        Returns:
+            Dict[str, int]: 关键词（不区分大小写时为小写）-> 出现次数，只包含出现过的关键词
+        """
+        if not self.case_sensitive:
+            text = text.lower()
+        found = Counter()
+        for pattern in self._patterns:
+            found.update(pattern.findall(text))
+        return found
+
+    def count_keywords(self, text: str) -> List[int]:
+        """
+        统计每个关键词的出现次数（同一关键词的出现互不重叠）
+
+        Args:
+            text: 文本
+
+        Returns:
+            List[int]: 与 self.keywords 一一对应的出现次数
+        """
+        found = self.scan(text)
+        return [found.get(keyword, 0) for keyword in self.keywords]
+
+    def matched_indices(self, matches: Mapping[str, int]) -> List[int]:
+        """
+        把扫描结果转换为出现过的关键词下标（按关键词注册顺序）
+
+        只遍历出现过的关键词，不属于本匹配器的关键词会被忽略
+
+        Args:
+            matches: 关键词 -> 出现次数（如 scan 的结果）
+
+        Returns:
+            List[int]: self.keywords 中出现过的关键词下标，升序
+        """
+        return sorted(self._index[keyword] for keyword, count in matches.items() if count and keyword in self._index)
+
+    def count_groups(self, text: str) -> Dict[Hashable, int]:
+        """
+        统计每个分组的关键词出现总次数
+
+        Args:
+            text: 文本
+
+        Returns:
+            Dict[Hashable, int]: 分组 -> 次数（包含所有分组，未出现的为0）
+        """
+        totals = {group: 0 for group in self.groups}
+        for index, count in enumerate(self.count_keywords(text)):
+            if count:
+                for group in self.keyword_groups[index]:
+                    totals[group] += count
+        return totals
+
+    def find_groups(self, text: str) -> Dict[Hashable, List[str]]:
+        """
+        找出文本中出现的关键词，按分组列出
+
+        Args:
+            text: 文本
+
+        Returns:
+            Dict[Hashable, List[str]]: 分组 -> 出现的关键词（按关键词注册顺序，不重复），只包含有匹配的分组
+        """
+        return self.group_matches(self.scan(text))
+
+    def group_matches(self, matches: Mapping[str, int]) -> Dict[Hashable, List[str]]:
+        """
+        把扫描结果按分组列出
+
+        Args:
+            matches: 关键词 -> 出现次数（如 scan 的结果）
+
+        Returns:
+            Dict[Hashable, List[str]]: 分组 -> 出现的关键词（按关键词注册顺序，不重复），只包含有匹配的分组
+        """
+        found: Dict[Hashable, List[str]] = {}
+        for index in self.matched_indices(matches):
+            for group in self.keyword_groups[index]:
+                found.setdefault(group, []).append(self.keywords[index])
+        return found
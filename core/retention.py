@@ -0,0 +1,159 @@
+"""
+知识库保留策略清理任务
+后台按用户ID顺序分批扫描知识库中的用户，删除过期或超出条目上限的知识，
+每轮处理有限的用户数和删除数，游标跨轮次保留，避免一次性全量扫描
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.config import settings
+from core.logger import logger
+from rag.knowledge_base import KnowledgeBase
+from rag.retention import RetentionPolicy
+
+
+class RetentionSweeper:
+    """知识库保留策略后台清理任务"""
+
+    def __init__(
+        self,
+        knowledge_base: KnowledgeBase,
+        policy: RetentionPolicy = None,
+        interval: float = None,
+        users_per_run: int = None,
+        delete_batch_size: int = None,
+        max_deletes_per_run: int = None,
+        session_user_ids: Callable[[str, int], Awaitable[List[str]]] = None
+    ):
+        self.knowledge_base = knowledge_base
+        # 按用户ID顺序分页列出有会话的用户（参数为 after 和 limit），
+        # 向量存储不能按分区列出用户（单个 ChromaDB 集合或哈希分片）时代替扫描全部条目
+        self.session_user_ids = session_user_ids
+        self.policy = policy or RetentionPolicy()
+        self.interval = interval or settings.retention_interval
+        self.users_per_run = users_per_run or settings.retention_users_per_run
+        self.delete_batch_size = delete_batch_size or settings.retention_delete_batch_size
+        self.max_deletes_per_run = max_deletes_per_run or settings.retention_max_deletes_per_run
+
+        self._worker_task: Optional[asyncio.Task] = None
+        # 上一轮处理到的用户ID，下一轮从其后继续
+        self._cursor = ""
+
+        # 运行指标
+        self._runs = 0
+        self._users = 0
+        self._deleted = 0
+        self._passes = 0
+        self._failures = 0
+        self._last_run_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker_task is not None and not self._worker_task.done()
+
+    async def start(self):
+        """启动后台清理任务"""
+        if self.running:
+            return
+        if not self.policy.active:
+            logger.info("未设置保留天数和条目上限，保留策略清理任务不启动")
+            return
+        self._worker_task = asyncio.create_task(self._worker())
+        logger.info(
+            f"保留策略清理任务已启动，间隔 {self.interval} 秒，"
+            f"保留 {self.policy.ttl_days} 天，每用户上限 {self.policy.max_items_per_user} 条"
+        )
+
+    async def stop(self):
+        """停止后台清理任务"""
+        if not self.running:
+            return
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+        except asyncio.CancelledError:
+            pass
+        self._worker_task = None
+        logger.info("保留策略清理任务已停止")
+
+    async def _worker(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"保留策略清理异常: {e}")
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        执行一轮清理
+
+        Returns:
+            Dict[str, int]: 本轮处理的用户数和删除的条目数
+        """
+        self._runs += 1
+        self._last_run_at = datetime.now()
+
+        start_cursor = self._cursor
+        # 按用户分区的向量存储直接列举分区（会话记录可能已被 TTL 索引删除）；
+        # 其他后端列出用户需要扫描全部条目，改为从会话中分页读取
+        if self.session_user_ids is not None and not self.knowledge_base.lists_users_cheaply:
+            user_ids = await self.session_user_ids(start_cursor, self.users_per_run)
+        else:
+            user_ids = await self.knowledge_base.alist_user_ids(start_cursor, self.users_per_run)
+
+        budget = self.max_deletes_per_run
+        deleted = 0
+        processed = 0
+        for user_id in user_ids:
+            if budget <= 0:
+                break
+            try:
+                count = await self.knowledge_base.aapply_retention(
+                    user_id, self.policy, self.delete_batch_size, budget
+                )
+                deleted += count
+                budget -= count
+            except Exception as e:
+                self._failures += 1
+                logger.error(f"用户 {user_id} 保留策略清理失败: {e}")
+            processed += 1
+
+        if budget <= 0 and processed:
+            # 删除数达到上限，最后一个用户可能还有剩余，下一轮从该用户继续
+            self._cursor = user_ids[processed - 2] if processed > 1 else start_cursor
+        elif len(user_ids) < self.users_per_run:
+            # 已扫描到末尾，下一轮从头开始
+            self._cursor = ""
+            self._passes += 1
+        else:
+            self._cursor = user_ids[-1]
+
+        self._users += processed
+        self._deleted += deleted
+        if deleted:
+            logger.info(f"保留策略清理完成: {processed} 个用户，删除 {deleted} 条知识")
+        return {"users": processed, "deleted": deleted}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取清理任务指标
+
+        Returns:
+            Dict[str, Any]: 指标信息
+        """
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "ttl_days": self.policy.ttl_days,
+            "max_items_per_user": self.policy.max_items_per_user,
+            "eviction": self.policy.eviction,
+            "runs": self._runs,
+            "passes": self._passes,
+            "users": self._users,
+            "deleted": self._deleted,
+            "failures": self._failures,
+            "cursor": self._cursor,
+            "last_run_at": self._last_run_at.isoformat() if self._last_run_at else None
+        }
@@ -3,10 +3,12 @@
 负责解析环境变量中的世界观设置，提取关键词，并管理世界观数据
 """
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Mapping, Sequence, Tuple
 from datetime import datetime
 
+from core.cache import LRUCache
 from core.config import settings
+from core.keyword_matcher import KeywordMatcher
 from core.logger import logger
 from memory.models import WorldviewKeywords
 
@@ -35,6 +37,9 @@ class WorldviewManager:
             "behavior_guidelines": 0.9,  # 行为准则权重很高
             "taboos": 1.0          # 禁忌事项权重最高
         }
+        
+        # 编译好的关键词匹配器，按关键词版本缓存（关键词相同的用户共用同一个匹配器）
+        self._matchers = LRUCache("worldview_matchers", max_size=settings.keyword_matcher_cache_size)
     
     def parse_worldview_from_env(self) -> Dict[str, List[str]]:
         """
@@ -192,13 +197,61 @@ class WorldviewManager:
 - 你的行为准则是积极乐观、主动帮助、善于倾听、富有同理心、追求成长
 - 你绝对避免伤害他人、欺骗撒谎、破坏环境、歧视偏见、消极悲观"""
     
-    def analyze_worldview_influence(self, message: str, worldview_keywords: List[WorldviewKeywords]) -> Dict[str, Any]:
+    @staticmethod
+    def keyword_version(worldview_keywords: List[WorldviewKeywords]) -> Tuple:
+        """
+        世界观关键词的版本标识（由各类别的关键词内容决定，关键词变化后版本随之变化）
+        
+        Args:
+            worldview_keywords: 世界观关键词列表
+            
+        Returns:
+            Tuple: 可哈希的版本标识
+        """
+        return tuple((record.category, tuple(record.keywords)) for record in worldview_keywords)
+    
+    def get_keyword_matcher(
+        self,
+        worldview_keywords: List[WorldviewKeywords],
+        extra_keywords: Sequence[str] = ()
+    ) -> KeywordMatcher:
+        """
+        获取用户世界观关键词的匹配器，每个关键词版本只编译一次
+        
+        Args:
+            worldview_keywords: 世界观关键词列表
+            extra_keywords: 一并编译进匹配器的其他关键词（如情感和主题关键词），
+                使一次扫描的结果可以同时供多种分析使用
+            
+        Returns:
+            KeywordMatcher: 关键词匹配器
+        """
+        extra_keywords = tuple(extra_keywords)
+        key = (self.keyword_version(worldview_keywords), extra_keywords)
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            groups = {None: extra_keywords}
+            for record in worldview_keywords:
+                groups.setdefault(record.category, []).extend(record.keywords)
+            matcher = KeywordMatcher(groups)
+            self._matchers.set(key, matcher)
+            logger.debug(f"编译世界观关键词匹配器: {len(matcher)} 个关键词，{matcher.passes} 次扫描")
+        return matcher
+    
+    def analyze_worldview_influence(
+        self,
+        message: str,
+        worldview_keywords: List[WorldviewKeywords],
+        matched_groups: Optional[Mapping[str, List[str]]] = None
+    ) -> Dict[str, Any]:
         """
         分析消息与世界观的关联度
         
         Args:
             message: 用户消息
             worldview_keywords: 世界观关键词列表
+            matched_groups: 已有的扫描结果（类别 -> 出现的关键词（小写），由 get_keyword_matcher
+                返回的匹配器得到），为 None 时使用缓存的匹配器扫描消息
             
         Returns:
             Dict[str, Any]: 世界观影响分析结果
@@ -206,7 +259,8 @@ class WorldviewManager:
         if not worldview_keywords:
             return {"influence_score": 0.0, "triggered_categories": [], "suggestions": []}
         
-        message_lower = message.lower()
+        if matched_groups is None:
+            matched_groups = self.get_keyword_matcher(worldview_keywords).find_groups(message)
         triggered_categories = []
         total_influence = 0.0
         suggestions = []
@@ -215,9 +269,10 @@ class WorldviewManager:
             category_influence = 0.0
             matched_keywords = []
             
-            # 检查关键词匹配
-            for keyword in record.keywords:
-                if keyword.lower() in message_lower:
+            # 检查关键词匹配（只需检查扫描中出现过关键词的类别）
+            hits = matched_groups.get(record.category, ())
+            for keyword in record.keywords if hits else ():
+                if keyword.lower() in hits:
                     matched_keywords.append(keyword)
                     category_influence += record.weight
             
@@ -248,6 +303,10 @@ class WorldviewManager:
             "suggestions": suggestions
         }
     
+    def get_matcher_stats(self) -> Dict[str, Any]:
+        """获取关键词匹配器缓存的统计信息"""
+        return self._matchers.get_stats()
+    
     def get_worldview_summary(self, worldview_keywords: List[WorldviewKeywords]) -> Dict[str, Any]:
         """
         获取世界观摘要信息
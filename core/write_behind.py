@@ -0,0 +1,314 @@
+"""
+回写队列
+LLM回复生成后，将消息写入、人格状态更新和向量入库交给后台任务批量处理，
+使聊天接口在生成回复后即可返回
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.logger import logger
+from memory.manager import MemoryManager
+from memory.models import ConversationMessage, PersonaState
+from rag.knowledge_base import KnowledgeBase
+
+
+class PersistenceJob:
+    """一轮对话的待持久化数据"""
+
+    def __init__(
+        self,
+        user_id: str,
+        session_id: str,
+        user_message: ConversationMessage,
+        assistant_message: ConversationMessage,
+        persona_state: Optional[PersonaState] = None,
+        emotion_info: Dict[str, Any] = None
+    ):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.user_message = user_message
+        self.assistant_message = assistant_message
+        self.persona_state = persona_state
+        self.emotion_info = emotion_info
+
+        # 各步骤的完成状态，重试时只重做失败的步骤
+        self.messages_saved = False
+        self.persona_saved = persona_state is None
+        self.vectors_saved = False
+        self.attempts = 0
+        # 提交顺序（由队列分配）和下次重试的时间（事件循环时钟）
+        self.sequence = 0
+        self.retry_at = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.messages_saved and self.persona_saved and self.vectors_saved
+
+
+class WriteBehindQueue:
+    """回写队列：有界队列 + 后台批处理任务
+
+    写入失败的任务按指数退避安排重试，到期后与新任务一起写入，不阻塞其后的任务。
+    """
+
+    def __init__(
+        self,
+        memory_manager: MemoryManager,
+        knowledge_base: KnowledgeBase,
+        max_size: int = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_retries: int = None,
+        retry_backoff: float = 0.5
+    ):
+        self.memory_manager = memory_manager
+        self.knowledge_base = knowledge_base
+        self.max_size = max_size or settings.write_behind_queue_size
+        self.batch_size = batch_size or settings.write_behind_batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else settings.write_behind_flush_interval
+        self.max_retries = max_retries if max_retries is not None else settings.write_behind_max_retries
+        self.retry_backoff = retry_backoff
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        # 等待重试的任务（按 retry_at 到期后与新任务一起写入，后台任务不为重试而等待）
+        self._retry_jobs: List[PersistenceJob] = []
+        # 各会话已写入的最新人格状态的提交顺序：重试的旧任务不能覆盖其后已写入的人格状态
+        self._persona_written: Dict[Tuple[str, str], int] = {}
+
+        # 运行指标
+        self._submitted = 0
+        self._persisted = 0
+        self._retried = 0
+        self._dropped = 0
+        self._batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker_task is not None and not self._worker_task.done()
+
+    async def start(self):
+        """启动后台写入任务"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._worker_task = asyncio.create_task(self._worker())
+        logger.info(f"回写队列已启动，容量 {self.max_size}，批大小 {self.batch_size}")
+
+    async def submit(self, job: PersistenceJob):
+        """
+        提交持久化任务
+
+        队列已满时等待空位（背压）；后台任务未启动时直接同步写入。
+
+        Args:
+            job: 持久化任务
+        """
+        self._submitted += 1
+        job.sequence = self._submitted
+        if not self.running:
+            await self._process_inline(job)
+            return
+        await self._queue.put(job)
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        停止后台任务，停止前尽量把队列中的任务全部写入
+
+        Args:
+            timeout: 等待队列清空的最长时间（秒）
+        """
+        if not self.running:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"回写队列关闭超时，仍有 {self._queue.qsize()} 个任务未写入，{len(self._retry_jobs)} 个任务等待重试"
+            )
+
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+        except asyncio.CancelledError:
+            pass
+        self._worker_task = None
+        logger.info("回写队列已停止")
+
+    async def _worker(self):
+        """后台任务：按批大小或刷新间隔取出新任务和到期的重试任务并写入"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._take_due_retries(loop.time())
+            if not batch:
+                # 没有到期的重试时等待新任务，最多等到下一个重试到期
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=self._next_retry_delay(loop.time())))
+                except asyncio.TimeoutError:
+                    continue
+
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                failed = await self._process_batch(batch)
+            except Exception as e:
+                logger.error(f"回写批处理异常: {e}")
+                failed = []
+
+            retrying = {id(job) for job in failed}
+            for job in failed:
+                self._schedule_retry(job, loop.time())
+            # 等待重试的任务在最终完成或被丢弃后才标记完成，stop 时会等待它们
+            for job in batch:
+                if id(job) not in retrying:
+                    self._queue.task_done()
+
+    def _take_due_retries(self, now: float) -> List[PersistenceJob]:
+        """取出已到期的重试任务（不超过一批）"""
+        due = [job for job in self._retry_jobs if job.retry_at <= now][:self.batch_size]
+        if due:
+            taken = {id(job) for job in due}
+            self._retry_jobs = [job for job in self._retry_jobs if id(job) not in taken]
+        return due
+
+    def _next_retry_delay(self, now: float) -> Optional[float]:
+        if not self._retry_jobs:
+            return None
+        return max(0.0, min(job.retry_at for job in self._retry_jobs) - now)
+
+    def _schedule_retry(self, job: PersistenceJob, now: float):
+        """按指数退避安排重试"""
+        job.retry_at = now + self.retry_backoff * (2 ** (job.attempts - 1))
+        self._retry_jobs.append(job)
+
+    async def _process_inline(self, job: PersistenceJob):
+        """后台任务未启动时在调用方中写入，失败的步骤按指数退避重试"""
+        pending = [job]
+        while pending:
+            pending = await self._process_batch(pending)
+            if pending:
+                await asyncio.sleep(self.retry_backoff * (2 ** (job.attempts - 1)))
+
+    async def _process_batch(self, batch: List[PersistenceJob]) -> List[PersistenceJob]:
+        """
+        写入一批任务
+
+        Returns:
+            List[PersistenceJob]: 有步骤失败、需要重试的任务（超过重试次数的任务已丢弃）
+        """
+        self._batches += 1
+        await self._write(batch)
+
+        failed = []
+        for job in batch:
+            if job.done:
+                self._persisted += 1
+                continue
+            job.attempts += 1
+            if job.attempts > self.max_retries:
+                self._dropped += 1
+                logger.error(
+                    f"回写任务重试 {self.max_retries} 次后仍失败，已丢弃 "
+                    f"(用户: {job.user_id}, 会话: {job.session_id})"
+                )
+            else:
+                failed.append(job)
+
+        self._retried += len(failed)
+        if not failed and not self._retry_jobs:
+            # 没有等待重试的旧任务时，之后提交的任务总是更新，无需再记录
+            self._persona_written.clear()
+        return failed
+
+    async def _write(self, batch: List[PersistenceJob]):
+        """执行一次写入：按会话合并消息，人格状态只写每个会话的最新值"""
+        messages_by_session: Dict[Tuple[str, str], List[PersistenceJob]] = {}
+        latest_persona: Dict[Tuple[str, str], PersistenceJob] = {}
+        for job in batch:
+            key = (job.user_id, job.session_id)
+            if not job.messages_saved:
+                messages_by_session.setdefault(key, []).append(job)
+            if not job.persona_saved:
+                if job.sequence <= self._persona_written.get(key, 0):
+                    # 同一会话更新的人格状态已经写入
+                    job.persona_saved = True
+                elif key not in latest_persona or job.sequence > latest_persona[key].sequence:
+                    latest_persona[key] = job
+
+        tasks = []
+        for (user_id, session_id), jobs in messages_by_session.items():
+            tasks.append(self._write_messages(user_id, session_id, jobs))
+        for (user_id, session_id), job in latest_persona.items():
+            tasks.append(self._write_persona(user_id, session_id, job, batch))
+        for job in batch:
+            if not job.vectors_saved:
+                tasks.append(self._write_vectors(job))
+
+        # 某一步抛出异常时不影响其它步骤；失败步骤的完成状态保持未完成，由重试循环重做
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"回写步骤失败: {result}")
+
+    async def _write_messages(self, user_id: str, session_id: str, jobs: List[PersistenceJob]):
+        messages = []
+        for job in jobs:
+            messages.extend([job.user_message, job.assistant_message])
+        if await self.memory_manager.add_messages(user_id, session_id, messages):
+            for job in jobs:
+                job.messages_saved = True
+
+    async def _write_persona(
+        self,
+        user_id: str,
+        session_id: str,
+        job: PersistenceJob,
+        batch: List[PersistenceJob]
+    ):
+        if await self.memory_manager.update_persona_state(user_id, session_id, job.persona_state):
+            # 同一会话中较早的人格状态已被覆盖，无需再写
+            key = (user_id, session_id)
+            self._persona_written[key] = max(self._persona_written.get(key, 0), job.sequence)
+            for other in batch:
+                if (other.user_id, other.session_id) == key and other.sequence <= job.sequence:
+                    other.persona_saved = True
+
+    async def _write_vectors(self, job: PersistenceJob):
+        user_id_result, _ = await self.knowledge_base.aadd_conversation_turn(
+            user_message=job.user_message.content,
+            assistant_response=job.assistant_message.content,
+            user_id=job.user_id,
+            session_id=job.session_id,
+            emotion_info=job.emotion_info
+        )
+        if user_id_result:
+            job.vectors_saved = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取回写队列指标
+
+        Returns:
+            Dict[str, Any]: 指标信息
+        """
+        return {
+            "running": self.running,
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "retry_pending": len(self._retry_jobs),
+            "max_size": self.max_size,
+            "submitted": self._submitted,
+            "persisted": self._persisted,
+            "retried": self._retried,
+            "dropped": self._dropped,
+            "batches": self._batches
+        }
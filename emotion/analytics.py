@@ -0,0 +1,91 @@
+"""
+情感历史分析
+对用户的历史消息批量重新评分，并汇总情感分布
+"""
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from emotion.analyzer import EmotionAnalyzer, EmotionResult, EmotionType
+
+
+def emotion_to_dict(result: EmotionResult) -> Dict[str, Any]:
+    """把情感分析结果转换为接口返回的字典"""
+    return {
+        "emotion": result.emotion.value,
+        "confidence": result.confidence,
+        "emoji": result.emoji,
+        "description": result.description
+    }
+
+
+def rescore_messages(analyzer: EmotionAnalyzer, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    对一组历史消息重新做情感分析并汇总（一次批量分析，统计用数组运算完成）
+
+    Args:
+        analyzer: 情感分析器
+        messages: 消息列表（含 content，可含 session_id 和已保存的 emotion）
+
+    Returns:
+        Dict[str, Any]: results 为与消息一一对应的分析结果，summary 为情感分布统计
+    """
+    results = analyzer.analyze_emotions([message.get("content") or "" for message in messages])
+
+    emotion_types = list(EmotionType)
+    column = {emotion_type: i for i, emotion_type in enumerate(emotion_types)}
+    labels = np.array([column[result.emotion] for result in results], dtype=np.int64)
+    confidences = np.array([result.confidence for result in results], dtype=np.float64)
+
+    counts = np.bincount(labels, minlength=len(emotion_types))
+    confidence_sums = np.bincount(labels, weights=confidences, minlength=len(emotion_types))
+    changed = sum(
+        1 for message, result in zip(messages, results)
+        if message.get("emotion") != result.emotion.value
+    )
+
+    # 每个会话中出现最多的情感
+    sessions: Dict[str, List[int]] = {}
+    for message, label in zip(messages, labels.tolist()):
+        sessions.setdefault(message.get("session_id"), []).append(label)
+    session_emotions = {
+        session_id: emotion_types[int(np.bincount(session_labels).argmax())].value
+        for session_id, session_labels in sessions.items() if session_id
+    }
+
+    total = len(results)
+    return {
+        "results": results,
+        "summary": {
+            "total": total,
+            "changed": changed,
+            "distribution": {
+                emotion_type.value: {
+                    "count": int(counts[i]),
+                    "ratio": round(float(counts[i]) / total, 4) if total else 0.0,
+                    "avg_confidence": round(float(confidence_sums[i] / counts[i]), 4) if counts[i] else 0.0
+                }
+                for i, emotion_type in enumerate(emotion_types) if counts[i]
+            },
+            "session_emotions": session_emotions
+        }
+    }
+
+
+def emotion_updates(messages: List[Dict[str, Any]], results: List[EmotionResult]) -> List[Tuple[Any, str, float]]:
+    """
+    找出情感标注有变化的消息
+
+    Args:
+        messages: 消息列表（含 _id、emotion、emotion_confidence）
+        results: 与消息一一对应的新分析结果
+
+    Returns:
+        List[Tuple[Any, str, float]]: (消息 _id, 情感, 置信度) 列表
+    """
+    return [
+        (message["_id"], result.emotion.value, result.confidence)
+        for message, result in zip(messages, results)
+        if message.get("emotion") != result.emotion.value
+        or message.get("emotion_confidence") != result.confidence
+    ]
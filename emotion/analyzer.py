@@ -2,10 +2,12 @@
 情感分析器
 分析用户输入的情感倾向并返回对应的表情符号
 """
-import re
-from typing import Dict, List, Tuple
+import asyncio
+from typing import List, Mapping
 from enum import Enum
+import numpy as np
 from pydantic import BaseModel
+from core.keyword_matcher import KeywordMatcher
 from core.logger import logger
 
 
@@ -69,6 +71,48 @@ class EmotionAnalyzer:
             EmotionType.NEGATIVE: "检测到负面消极的情绪",
             EmotionType.NEUTRAL: "检测到中性平和的情绪"
         }
+        
+        # 没有检测到特定情感时，用于简单正负面判断的指示词
+        self.positive_indicators = ["好", "棒", "赞", "不错", "可以", "行", "对", "是的", "谢谢"]
+        self.negative_indicators = ["不", "没", "别", "不要", "不行", "不好", "错", "坏"]
+        
+        self.compile_keywords()
+    
+    def compile_keywords(self):
+        """
+        把情感关键词和正负面指示词编译为一个匹配器（修改关键词后需重新调用）
+        
+        正负面指示词分别归入 POSITIVE / NEGATIVE 分组，与情感关键词在同一次扫描中统计；
+        同时生成关键词到分组的归属矩阵，批量分析时用矩阵运算一次算出所有文本的得分
+        """
+        self._matcher = KeywordMatcher({
+            **self.emotion_keywords,
+            EmotionType.POSITIVE: self.positive_indicators,
+            EmotionType.NEGATIVE: self.negative_indicators
+        })
+        
+        # 结果标签：各情感类型，之后依次为 POSITIVE、NEGATIVE、NEUTRAL
+        self._emotion_types = list(self.emotion_keywords)
+        self._labels = self._emotion_types + [EmotionType.POSITIVE, EmotionType.NEGATIVE, EmotionType.NEUTRAL]
+        
+        keyword_count = len(self._matcher)
+        self._emotion_membership = np.zeros((keyword_count, len(self._emotion_types)), dtype=np.int64)
+        self._positive_mask = np.zeros(keyword_count, dtype=np.int64)
+        self._negative_mask = np.zeros(keyword_count, dtype=np.int64)
+        column = {emotion_type: i for i, emotion_type in enumerate(self._emotion_types)}
+        for index, groups in enumerate(self._matcher.keyword_groups):
+            for group in groups:
+                if group is EmotionType.POSITIVE:
+                    self._positive_mask[index] = 1
+                elif group is EmotionType.NEGATIVE:
+                    self._negative_mask[index] = 1
+                else:
+                    self._emotion_membership[index, column[group]] = 1
+    
+    @property
+    def keywords(self) -> List[str]:
+        """全部情感关键词和正负面指示词（小写），可与其他关键词编译进同一个匹配器"""
+        return self._matcher.keywords
     
     def analyze_emotion(self, text: str) -> EmotionResult:
         """
@@ -80,28 +124,38 @@ class EmotionAnalyzer:
         Returns:
             EmotionResult: 情感分析结果
         """
-        text = text.lower()
-        emotion_scores = {}
+        return self.analyze_matches(self._matcher.scan(text))
+    
+    def analyze_matches(self, matches: Mapping[str, int]) -> EmotionResult:
+        """
+        根据关键词扫描结果分析情感倾向
+        
+        扫描结果可以来自包含更多关键词的匹配器（如每轮对话共用的匹配器），
+        不属于情感分析的关键词会被忽略
         
-        # 基于关键词的情感分析
-        for emotion_type, keywords in self.emotion_keywords.items():
-            score = 0
-            for keyword in keywords:
-                # 计算关键词在文本中的出现次数
-                count = len(re.findall(keyword, text))
-                score += count
+        Args:
+            matches: 关键词（小写）-> 出现次数
             
-            if score > 0:
-                emotion_scores[emotion_type] = score
+        Returns:
+            EmotionResult: 情感分析结果
+        """
+        emotion_scores = {}
+        positive_score = 0
+        negative_score = 0
+        
+        # 情感关键词累计次数，正负面指示词只计是否出现（按关键词注册顺序，保证同分时结果稳定）
+        for index in self._matcher.matched_indices(matches):
+            count = matches[self._matcher.keywords[index]]
+            for group in self._matcher.keyword_groups[index]:
+                if group is EmotionType.POSITIVE:
+                    positive_score += 1
+                elif group is EmotionType.NEGATIVE:
+                    negative_score += 1
+                else:
+                    emotion_scores[group] = emotion_scores.get(group, 0) + count
         
         # 如果没有检测到特定情感，进行简单的正负面判断
         if not emotion_scores:
-            positive_indicators = ["好", "棒", "赞", "不错", "可以", "行", "对", "是的", "谢谢"]
-            negative_indicators = ["不", "没", "别", "不要", "不行", "不好", "错", "坏"]
-            
-            positive_score = sum(1 for indicator in positive_indicators if indicator in text)
-            negative_score = sum(1 for indicator in negative_indicators if indicator in text)
-            
             if positive_score > negative_score:
                 emotion_type = EmotionType.POSITIVE
                 confidence = min(0.8, positive_score * 0.3)
@@ -117,16 +171,75 @@ class EmotionAnalyzer:
             max_score = emotion_scores[emotion_type]
             confidence = min(0.9, max_score * 0.2 + 0.3)
         
-        result = EmotionResult(
+        logger.debug(f"情感分析结果: {emotion_type.value}, 置信度: {confidence:.2f}")
+        
+        return self.build_result(emotion_type, confidence)
+    
+    def build_result(self, emotion_type: EmotionType, confidence: float) -> EmotionResult:
+        """根据情感类型和置信度生成结果（附带对应的表情符号和描述）"""
+        return EmotionResult(
             emotion=emotion_type,
             confidence=confidence,
             emoji=self.emotion_emojis[emotion_type],
             description=self.emotion_descriptions[emotion_type]
         )
+    
+    def analyze_emotions(self, texts: List[str]) -> List[EmotionResult]:
+        """
+        批量分析文本的情感倾向
+        
+        规则与 analyze_emotion 相同；每条文本扫描一次得到关键词计数，
+        所有文本的计数组成矩阵后用矩阵运算一次算出得分和结果类型。
+        
+        Args:
+            texts: 待分析的文本列表
+            
+        Returns:
+            List[EmotionResult]: 与输入一一对应的情感分析结果
+        """
+        if not texts:
+            return []
+        
+        counts = np.array(
+            [self._matcher.count_keywords(text) for text in texts], dtype=np.int64
+        ).reshape(len(texts), len(self._matcher))
+        present = (counts > 0).astype(np.int64)
+        
+        emotion_scores = counts @ self._emotion_membership
+        positive = present @ self._positive_mask
+        negative = present @ self._negative_mask
         
-        logger.info(f"情感分析结果: {emotion_type.value}, 置信度: {confidence:.2f}")
+        rows = np.arange(len(texts))
+        best = emotion_scores.argmax(axis=1) if self._emotion_types else np.zeros(len(texts), dtype=np.int64)
+        max_score = emotion_scores[rows, best] if self._emotion_types else np.zeros(len(texts), dtype=np.int64)
+        has_emotion = max_score > 0
         
-        return result
+        base = len(self._emotion_types)
+        labels = np.where(
+            has_emotion,
+            best,
+            np.where(positive > negative, base, np.where(negative > positive, base + 1, base + 2))
+        )
+        confidences = np.where(
+            has_emotion,
+            np.minimum(0.9, max_score * 0.2 + 0.3),
+            np.where(
+                positive > negative,
+                np.minimum(0.8, positive * 0.3),
+                np.where(negative > positive, np.minimum(0.8, negative * 0.3), 0.5)
+            )
+        )
+        
+        results = [
+            self.build_result(self._labels[label], confidence)
+            for label, confidence in zip(labels.tolist(), confidences.tolist())
+        ]
+        logger.debug(f"批量情感分析完成: {len(results)} 条")
+        return results
+    
+    async def aanalyze_emotions(self, texts: List[str]) -> List[EmotionResult]:
+        """analyze_emotions 的异步版本，在线程中执行，不阻塞事件循环"""
+        return await asyncio.to_thread(self.analyze_emotions, texts)
     
     def get_emotion_emoji(self, emotion: EmotionType) -> str:
         """获取情感对应的表情符号"""
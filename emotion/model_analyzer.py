@@ -0,0 +1,263 @@
+"""
+基于模型的情感分析器
+在独立的进程池中运行情感分类模型（EMOTION_MODEL_NAME），避免阻塞事件循环；
+并发请求合并成批，结果按文本哈希缓存，超出延迟预算或模型不可用时回退到关键词分析
+"""
+import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.batching import MicroBatcher
+from core.cache import LRUCache
+from core.config import settings
+from core.logger import logger
+from emotion.analyzer import EmotionAnalyzer, EmotionResult, EmotionType
+
+# 工作进程中的模型（每个进程加载一份）
+_model = None
+_tokenizer = None
+_max_length = 128
+
+
+def _load_model(model_name: str, max_length: int, num_threads: int):
+    """工作进程初始化：加载分词器和分类模型"""
+    global _model, _tokenizer, _max_length
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    torch.set_num_threads(max(1, num_threads))
+    _tokenizer = AutoTokenizer.from_pretrained(model_name)
+    _model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    _model.eval()
+    _max_length = max_length
+
+
+def _classify(texts: List[str]) -> List[Tuple[str, float]]:
+    """在工作进程中对一批文本分类，返回每条文本得分最高的 (模型标签, 概率)"""
+    import torch
+
+    inputs = _tokenizer(texts, padding=True, truncation=True, max_length=_max_length, return_tensors="pt")
+    with torch.no_grad():
+        logits = _model(**inputs).logits
+    # 多标签模型（如 cardiffnlp 的情感模型）各标签独立打分
+    if _model.config.problem_type == "multi_label_classification":
+        probabilities = torch.sigmoid(logits)
+    else:
+        probabilities = torch.softmax(logits, dim=-1)
+    scores, indices = probabilities.max(dim=-1)
+    id2label = _model.config.id2label
+    return [(id2label[int(index)], float(score)) for index, score in zip(indices, scores)]
+
+
+def parse_label_mapping(spec: str) -> Dict[str, EmotionType]:
+    """
+    解析模型标签到 EmotionType 的映射
+
+    Args:
+        spec: 形如 "joy:joy,optimism:positive" 的映射字符串
+
+    Returns:
+        Dict[str, EmotionType]: 模型标签（小写）-> 情感类型
+    """
+    mapping = {}
+    for pair in spec.split(","):
+        if not pair.strip():
+            continue
+        label, _, emotion = pair.partition(":")
+        try:
+            mapping[label.strip().lower()] = EmotionType(emotion.strip().lower())
+        except ValueError:
+            logger.warning(f"情感标签映射无效，已忽略: {pair}")
+    return mapping
+
+
+class ModelEmotionAnalyzer:
+    """基于模型的情感分析器，超时或出错时回退到关键词分析"""
+
+    def __init__(
+        self,
+        keyword_analyzer: EmotionAnalyzer,
+        model_name: str = None,
+        processes: int = None,
+        max_batch_size: int = None,
+        max_wait: float = None,
+        latency_budget_ms: float = None,
+        cache_size: int = None,
+        label_mapping: str = None
+    ):
+        """
+        Args:
+            keyword_analyzer: 回退使用的关键词分析器（同时提供表情符号和描述）
+            model_name: 情感分类模型名称
+            processes: 工作进程数
+            max_batch_size: 单批最大文本数
+            max_wait: 凑批的最长等待时间（秒）
+            latency_budget_ms: 单次分析的延迟预算（毫秒），超出后使用关键词分析结果
+            cache_size: 结果缓存条目数
+            label_mapping: 模型标签到 EmotionType 的映射字符串
+        """
+        self.keyword_analyzer = keyword_analyzer
+        self.model_name = model_name or settings.emotion_model_name
+        self.processes = processes or settings.emotion_model_processes
+        self.latency_budget = (latency_budget_ms or settings.emotion_model_latency_budget_ms) / 1000
+        self.label_mapping = parse_label_mapping(label_mapping or settings.emotion_model_label_mapping)
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._prewarm_task: Optional[asyncio.Task] = None
+        # 进程池损坏（如模型加载失败）后不再尝试，全部使用关键词分析
+        self._available = True
+        self._cache = LRUCache("emotion_model", max_size=cache_size or settings.emotion_model_cache_size)
+        self.batcher = MicroBatcher(
+            name="emotion_model",
+            process_batch=self._classify_batch,
+            max_batch_size=max_batch_size or settings.emotion_model_batch_size,
+            max_wait=max_wait if max_wait is not None else settings.emotion_model_batch_max_wait
+        )
+
+        # 运行指标
+        self._model_results = 0
+        self._timeouts = 0
+        self._errors = 0
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # 使用 spawn 启动工作进程，避免 fork 带有事件循环和线程的主进程
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_model,
+                initargs=(self.model_name, settings.emotion_model_max_length, settings.emotion_model_threads)
+            )
+            logger.info(f"情感模型进程池已启动: {self.model_name}，{self.processes} 个进程")
+        return self._pool
+
+    async def start(self):
+        """启动进程池并在后台预加载模型（加载完成前的请求使用关键词分析）"""
+        if self._prewarm_task is None:
+            self._prewarm_task = asyncio.create_task(self._prewarm())
+
+    async def _prewarm(self):
+        try:
+            await self.batcher.submit("你好")
+            logger.info("情感模型加载完成")
+        except Exception as e:
+            logger.error(f"情感模型加载失败，使用关键词分析: {e}")
+
+    async def _classify_batch(self, texts: List[str]) -> List[EmotionResult]:
+        """在进程池中对一批文本分类，结果写入缓存（超时的请求之后也能命中）"""
+        loop = asyncio.get_running_loop()
+        try:
+            predictions = await loop.run_in_executor(self._ensure_pool(), _classify, texts)
+        except BrokenProcessPool:
+            # 进程池损坏（如模型加载失败导致工作进程退出）后停止使用模型；
+            # 其它错误（如个别批次推理出错）只影响本批，由调用方计数并回退
+            self._available = False
+            raise
+
+        results = []
+        for text, (label, score) in zip(texts, predictions):
+            emotion_type = self.label_mapping.get(label.lower(), EmotionType.NEUTRAL)
+            result = self.keyword_analyzer.build_result(emotion_type, round(score, 4))
+            self._cache.set(self._key(text), result)
+            results.append(result)
+        return results
+
+    async def aanalyze_emotion(self, text: str, fallback: Optional[EmotionResult] = None) -> EmotionResult:
+        """
+        分析文本的情感倾向
+
+        Args:
+            text: 待分析的文本
+            fallback: 调用方已算出的关键词分析结果，为 None 时在回退时再做关键词分析
+
+        Returns:
+            EmotionResult: 模型结果；延迟预算内未完成或模型不可用时为关键词分析结果
+        """
+        cached = self._cache.get(self._key(text))
+        if cached is not None:
+            return cached
+        if not self._available:
+            return fallback or self.keyword_analyzer.analyze_emotion(text)
+
+        task = asyncio.ensure_future(self.batcher.submit(text))
+        try:
+            # shield：超时后模型仍会完成这次计算，结果进入缓存
+            result = await asyncio.wait_for(asyncio.shield(task), self.latency_budget)
+            self._model_results += 1
+            return result
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            # 超时的计算在后台完成，取走其异常避免未获取异常的警告
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            logger.debug(f"情感模型超出延迟预算 {self.latency_budget * 1000:.0f}ms，使用关键词分析")
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"情感模型分析失败，使用关键词分析: {e}")
+        return fallback or self.keyword_analyzer.analyze_emotion(text)
+
+    async def aanalyze_emotions(self, texts: List[str]) -> List[EmotionResult]:
+        """
+        批量分析文本的情感倾向（与其他并发请求合并成批）
+
+        显式的批量请求不受单次延迟预算限制；整批使用同一种分析方式，
+        模型不可用或任一文本分析失败时整批改用关键词分析，避免结果混用两种标注
+
+        Args:
+            texts: 待分析的文本列表
+
+        Returns:
+            List[EmotionResult]: 与输入一一对应的分析结果
+        """
+        if not texts:
+            return []
+        if self._available:
+            results = await asyncio.gather(*(self._amodel_result(text) for text in texts), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if not errors:
+                self._model_results += len(texts)
+                return list(results)
+            self._errors += 1
+            logger.warning(f"情感模型批量分析失败，整批使用关键词分析: {errors[0]}")
+        return await self.keyword_analyzer.aanalyze_emotions(texts)
+
+    async def _amodel_result(self, text: str) -> EmotionResult:
+        """获取单条文本的模型结果（优先使用缓存），不设延迟预算"""
+        cached = self._cache.get(self._key(text))
+        if cached is not None:
+            return cached
+        return await self.batcher.submit(text)
+
+    async def stop(self):
+        """停止批处理任务并关闭进程池"""
+        if self._prewarm_task is not None and not self._prewarm_task.done():
+            self._prewarm_task.cancel()
+        await self.batcher.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取模型分析器指标
+
+        Returns:
+            Dict[str, Any]: 指标信息
+        """
+        return {
+            "model_name": self.model_name,
+            "available": self._available,
+            "processes": self.processes,
+            "latency_budget_ms": round(self.latency_budget * 1000, 1),
+            "model_results": self._model_results,
+            "timeouts": self._timeouts,
+            "errors": self._errors,
+            "cache": self._cache.get_stats(),
+            "batcher": self.batcher.get_stats()
+        }
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+ONNX 编码器导出脚本
+将 sentence-transformers 模型导出为 ONNX 格式并做 int8 动态量化，
+供 ENCODER_BACKEND=onnx 使用（导出需要 PyTorch，运行时只需 onnxruntime）
+"""
+import argparse
+import os
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import AutoModel, AutoTokenizer
+
+
+def export_encoder(model_name: str, output_dir: str, opset: int = 14):
+    """
+    导出并量化编码器
+
+    Args:
+        model_name: HuggingFace 模型名
+        output_dir: 输出目录
+        opset: ONNX opset 版本
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model_int8.onnx")
+
+    print(f"📦 加载模型: {model_name}")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    sample = tokenizer(["导出示例文本", "export sample"], padding=True, return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    print(f"🔄 导出 ONNX 模型: {fp32_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+
+    print(f"🔄 int8 动态量化: {int8_path}")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    # OnnxEncoder 从模型同目录读取 tokenizer.json
+    tokenizer.save_pretrained(output_dir)
+    print("✅ 导出完成")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出并量化 ONNX 句向量编码器")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2", help="HuggingFace 模型名")
+    parser.add_argument("--output", default="./models/all-MiniLM-L6-v2-onnx", help="输出目录")
+    parser.add_argument("--opset", type=int, default=14, help="ONNX opset 版本")
+    args = parser.parse_args()
+
+    export_encoder(args.model, args.output, args.opset)
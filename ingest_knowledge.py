@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+预制知识库导入脚本
+流式读取 .txt / .md / .jsonl 文件，切分后分批编码并批量写入知识库；
+每批写入后记录检查点，中断后重新执行会从上次完成的位置继续
+"""
+import argparse
+
+from core.config import settings
+from rag.ingestion import BulkIngestor
+from rag.knowledge_base import KnowledgeBase
+
+
+def ingest_knowledge(args: argparse.Namespace):
+    """
+    导入所有指定文件
+
+    Args:
+        args: 命令行参数
+    """
+    knowledge_base = KnowledgeBase(args.collection)
+    ingestor = BulkIngestor(
+        knowledge_base,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap
+    )
+
+    def progress(state):
+        rate = state["ingested"] / state["elapsed"] if state["elapsed"] > 0 else 0.0
+        print(f"  已写入 {state['chunks_done']} 个片段（{rate:.0f} 条/秒）")
+
+    try:
+        for path in args.paths:
+            print(f"🔄 开始导入 {path} ...")
+            try:
+                result = ingestor.ingest(path, user_id=args.user_id, resume=not args.restart, progress=progress)
+            except KeyboardInterrupt:
+                print("⏸️ 已中断，重新执行即可从检查点继续")
+                return
+            except Exception as e:
+                print(f"❌ 导入失败（已写入的部分会从检查点继续）: {e}")
+                continue
+            print(
+                f"✅ {path}: 新写入 {result['ingested']} 个片段，跳过已导入 {result['skipped']} 个，"
+                f"耗时 {result['elapsed']:.1f} 秒"
+            )
+        print(f"   知识库共 {knowledge_base.vector_store.count()} 条")
+    finally:
+        knowledge_base.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量导入预制知识库")
+    parser.add_argument("paths", nargs="+", help="要导入的文件（.txt / .md / .jsonl）")
+    parser.add_argument("--user-id", default=None, help="知识所属用户，不指定时为共享知识（检索时需开启 SHARED_KNOWLEDGE_ENABLED）")
+    parser.add_argument("--collection", default="chatbot_knowledge", help="知识库集合名称")
+    parser.add_argument("--batch-size", type=int, default=settings.ingestion_batch_size, help="每批编码和写入的片段数")
+    parser.add_argument("--workers", type=int, default=settings.ingestion_workers, help="并行编码的线程数")
+    parser.add_argument("--chunk-size", type=int, default=settings.ingestion_chunk_size, help="片段最大字符数")
+    parser.add_argument("--chunk-overlap", type=int, default=settings.ingestion_chunk_overlap, help="相邻片段重叠字符数")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点，从头导入")
+    args = parser.parse_args()
+
+    ingest_knowledge(args)
@@ -2,8 +2,9 @@
 LLM基础抽象类
 定义统一的LLM接口，支持不同的LLM提供商
 """
+import json
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from pydantic import BaseModel
 
 
@@ -21,6 +22,173 @@ class ChatResponse(BaseModel):
     model: Optional[str] = None
 
 
+class ChatStreamChunk(BaseModel):
+    """流式响应片段"""
+    type: str  # thinking: 思维链步骤, content: 回答片段, done: 结束
+    content: str = ""
+    usage: Optional[Dict[str, Any]] = None
+    model: Optional[str] = None
+
+
+class ThinkingStreamParser:
+    """
+    增量解析流式输出中的 <thinking> 标签
+    
+    标签可能被拆分在多个片段中，解析器会缓存尚不能确定归属的文本：
+    回答中第一个 <thinking> 到 </thinking> 之间的思维过程按行输出为 thinking 片段，其余文本作为 content 片段输出。
+    思维链没有闭合（如回答被 max_tokens 截断）时，结束时把 <thinking> 之后的原文作为回答输出，不丢弃文本。
+    非流式响应通过 parse_thinking 使用同一个解析器，两种方式的结果一致。
+    """
+    
+    OPEN_TAG = "<thinking>"
+    CLOSE_TAG = "</thinking>"
+    
+    def __init__(self, enable_thinking: bool = True):
+        self._state = "scan" if enable_thinking else "answer"
+        self._buffer = ""
+        # 已输出为 thinking 片段的原文，思维链未闭合时作为回答补发
+        self._thinking_text = ""
+        self._answer_started = False
+        self.thinking_process: List[str] = []
+        self.content = ""
+    
+    def feed(self, text: str) -> List[ChatStreamChunk]:
+        """
+        输入一个文本片段
+        
+        Args:
+            text: 模型输出的增量文本
+            
+        Returns:
+            List[ChatStreamChunk]: 可以立即输出的片段
+        """
+        self._buffer += text
+        chunks = []
+        
+        if self._state == "scan":
+            open_index = self._buffer.find(self.OPEN_TAG)
+            if open_index >= 0:
+                chunks.extend(self._emit_content(self._buffer[:open_index]))
+                self._buffer = self._buffer[open_index + len(self.OPEN_TAG):]
+                self._state = "thinking"
+            else:
+                # 末尾可能是被截断的开始标签，留到下一个片段再判断
+                keep = self._partial_tag_length(self._buffer)
+                chunks.extend(self._emit_content(self._buffer[:len(self._buffer) - keep]))
+                self._buffer = self._buffer[len(self._buffer) - keep:]
+                return chunks
+        
+        if self._state == "thinking":
+            close_index = self._buffer.find(self.CLOSE_TAG)
+            if close_index >= 0:
+                chunks.extend(self._emit_thinking(self._buffer[:close_index]))
+                self._buffer = self._buffer[close_index + len(self.CLOSE_TAG):]
+                self._state = "answer"
+            else:
+                # 结束标签不会跨行，最后一个换行之前的内容都可以输出
+                newline_index = self._buffer.rfind("\n")
+                if newline_index >= 0:
+                    chunks.extend(self._emit_thinking(self._buffer[:newline_index + 1]))
+                    self._buffer = self._buffer[newline_index + 1:]
+        
+        if self._state == "answer":
+            chunks.extend(self._emit_content(self._buffer))
+            self._buffer = ""
+        
+        return chunks
+    
+    def finish(self) -> List[ChatStreamChunk]:
+        """
+        输出缓存中剩余的文本
+        
+        Returns:
+            List[ChatStreamChunk]: 剩余片段
+        """
+        text = self._buffer
+        self._buffer = ""
+        if self._state == "thinking":
+            # 没有结束标签：不是完整的思维链，原文作为回答输出
+            text = self.OPEN_TAG + self._thinking_text + text
+            self.thinking_process = []
+        self._state = "answer"
+        return self._emit_content(text)
+    
+    @classmethod
+    def _partial_tag_length(cls, text: str) -> int:
+        """text 末尾与开始标签前缀重合的长度"""
+        for length in range(min(len(text), len(cls.OPEN_TAG) - 1), 0, -1):
+            if text.endswith(cls.OPEN_TAG[:length]):
+                return length
+        return 0
+    
+    def _emit_thinking(self, text: str) -> List[ChatStreamChunk]:
+        self._thinking_text += text
+        chunks = []
+        for line in text.split("\n"):
+            step = line.strip()
+            if step:
+                self.thinking_process.append(step)
+                chunks.append(ChatStreamChunk(type="thinking", content=step))
+        return chunks
+    
+    def _emit_content(self, text: str) -> List[ChatStreamChunk]:
+        if not self._answer_started:
+            # 与非流式解析一致，去掉回答开头的空白
+            text = text.lstrip()
+            if not text:
+                return []
+            self._answer_started = True
+        if not text:
+            return []
+        self.content += text
+        return [ChatStreamChunk(type="content", content=text)]
+
+
+def parse_thinking(content: str, enable_thinking: bool = True) -> Tuple[str, Optional[List[str]]]:
+    """
+    从完整回答中分离思维链（非流式响应使用，规则与 ThinkingStreamParser 相同）
+    
+    Args:
+        content: 模型输出的完整文本
+        enable_thinking: 是否解析思维链
+        
+    Returns:
+        Tuple[str, Optional[List[str]]]: 最终回答，以及思维过程步骤（没有完整的思维链时为 None）
+    """
+    parser = ThinkingStreamParser(enable_thinking)
+    parser.feed(content)
+    parser.finish()
+    return parser.content.strip(), parser.thinking_process or None
+
+
+async def iter_sse_deltas(response) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    解析 OpenAI 兼容接口的 SSE 流
+    
+    Args:
+        response: httpx 流式响应
+        
+    Yields:
+        Tuple[str, Optional[Dict[str, Any]]]: 增量文本和用量信息（如果有）
+    """
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        
+        delta = ""
+        choices = event.get("choices") or []
+        if choices:
+            delta = (choices[0].get("delta") or {}).get("content") or ""
+        yield delta, event.get("usage")
+
+
 class BaseLLM(ABC):
     """LLM基础抽象类"""
     
@@ -52,7 +220,46 @@ class BaseLLM(ABC):
         """
         pass
     
+    async def chat_completion_stream(
+        self,
+        messages: List[ChatMessage],
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        enable_thinking: bool = False
+    ) -> AsyncIterator[ChatStreamChunk]:
+        """
+        流式聊天完成接口
+        
+        默认实现调用 chat_completion 后一次性输出，支持流式的提供商应覆盖此方法。
+        
+        Args:
+            messages: 聊天消息列表
+            model: 模型名称
+            temperature: 温度参数
+            max_tokens: 最大token数
+            enable_thinking: 是否启用思维链
+            
+        Yields:
+            ChatStreamChunk: 思维链步骤、回答片段，最后是 done 片段
+        """
+        response = await self.chat_completion(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            enable_thinking=enable_thinking
+        )
+        for step in response.thinking_process or []:
+            yield ChatStreamChunk(type="thinking", content=step)
+        yield ChatStreamChunk(type="content", content=response.content)
+        yield ChatStreamChunk(type="done", usage=response.usage, model=response.model)
+    
     @abstractmethod
     def get_available_models(self) -> List[str]:
         """获取可用的模型列表"""
+        pass
+    
+    async def aclose(self):
+        """释放网络连接等资源，默认无需处理"""
         pass 
\ No newline at end of file
@@ -2,7 +2,7 @@
 LLM工厂类
 根据配置创建不同的LLM实例
 """
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from core.config import settings
 from core.logger import logger
 from .base import BaseLLM
@@ -14,10 +14,15 @@ from .mock import MockLLM
 class LLMFactory:
     """LLM工厂类"""
     
+    # 提供商实例注册表：每个 (提供商, API地址) 只保留一个实例及其HTTP连接池
+    _instances: Dict[Tuple[str, str], BaseLLM] = {}
+    
     @staticmethod
     def create_llm(provider: Optional[str] = None) -> BaseLLM:
         """
-        创建LLM实例
+        获取LLM实例
+        
+        同一提供商和API地址的实例会被缓存复用，以复用其中的HTTP长连接。
         
         Args:
             provider: LLM提供商名称，如果为None则使用默认配置
@@ -30,6 +35,22 @@ class LLMFactory:
         
         provider = provider.lower()
         
+        if provider == "deepseek":
+            key = (provider, settings.deepseek_base_url)
+        elif provider == "siliconflow":
+            key = (provider, settings.siliconflow_base_url)
+        else:
+            key = (provider, "")
+        
+        llm = LLMFactory._instances.get(key)
+        if llm is None:
+            llm = LLMFactory._build_llm(provider)
+            LLMFactory._instances[key] = llm
+        return llm
+    
+    @staticmethod
+    def _build_llm(provider: str) -> BaseLLM:
+        """创建新的LLM实例"""
         if provider == "deepseek":
             if not settings.deepseek_api_key:
                 raise ValueError("DeepSeek API Key未配置")
@@ -58,6 +79,17 @@ class LLMFactory:
         else:
             raise ValueError(f"不支持的LLM提供商: {provider}")
     
+    @staticmethod
+    async def close_all():
+        """关闭所有缓存的LLM实例及其HTTP连接池"""
+        for (provider, base_url), llm in list(LLMFactory._instances.items()):
+            try:
+                await llm.aclose()
+            except Exception as e:
+                logger.warning(f"关闭LLM实例 {provider} 失败: {e}")
+        LLMFactory._instances.clear()
+        logger.info("LLM实例已全部关闭")
+    
     @staticmethod
     def get_available_providers() -> list:
         """获取可用的LLM提供商列表"""
@@ -72,4 +104,4 @@ class LLMFactory:
         # 模拟提供商总是可用
         providers.append("mock")
         
-        return providers 
\ No newline at end of file
+        return providers
\ No newline at end of file
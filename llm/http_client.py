@@ -0,0 +1,34 @@
+"""
+LLM HTTP客户端
+为各提供商创建长连接复用的 httpx.AsyncClient
+"""
+import httpx
+from core.config import settings
+from core.logger import logger
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    创建带连接池的异步HTTP客户端
+    
+    连接池大小、keep-alive 参数和是否启用 HTTP/2 均由配置决定；
+    未安装 h2 时自动退回 HTTP/1.1。
+    
+    Returns:
+        httpx.AsyncClient: HTTP客户端
+    """
+    limits = httpx.Limits(
+        max_connections=settings.llm_http_max_connections,
+        max_keepalive_connections=settings.llm_http_max_keepalive_connections,
+        keepalive_expiry=settings.llm_http_keepalive_expiry
+    )
+    
+    http2 = settings.llm_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("未安装 h2，LLM HTTP客户端退回 HTTP/1.1")
+            http2 = False
+    
+    return httpx.AsyncClient(limits=limits, http2=http2)
@@ -2,10 +2,11 @@
 模拟LLM提供商
 用于演示和测试，不需要真实的API密钥
 """
+import asyncio
 import random
 import time
-from typing import List, Optional, Dict, Any
-from .base import BaseLLM, ChatMessage, ChatResponse
+from typing import List, Optional, AsyncIterator
+from .base import BaseLLM, ChatMessage, ChatResponse, ChatStreamChunk
 
 
 class MockLLM(BaseLLM):
@@ -59,6 +60,47 @@ class MockLLM(BaseLLM):
             thinking_process=thinking_process
         )
     
+    async def chat_completion_stream(
+        self,
+        messages: List[ChatMessage],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        enable_thinking: bool = False
+    ) -> AsyncIterator[ChatStreamChunk]:
+        """模拟流式聊天完成，逐步输出思维过程和回复片段"""
+        
+        user_message = ""
+        for msg in reversed(messages):
+            if msg.role == "user":
+                user_message = msg.content
+                break
+        
+        if enable_thinking:
+            for step in self._generate_thinking_process(user_message):
+                await asyncio.sleep(random.uniform(0.05, 0.15))
+                yield ChatStreamChunk(type="thinking", content=step)
+        
+        response_content = self._generate_mock_response(user_message, messages)
+        
+        # 模拟逐token输出，每次输出2-4个字符
+        position = 0
+        while position < len(response_content):
+            step = random.randint(2, 4)
+            await asyncio.sleep(random.uniform(0.02, 0.06))
+            yield ChatStreamChunk(type="content", content=response_content[position:position + step])
+            position += step
+        
+        yield ChatStreamChunk(
+            type="done",
+            model=model or self.default_model,
+            usage={
+                "prompt_tokens": len(str(messages)) // 4,
+                "completion_tokens": len(response_content) // 4,
+                "total_tokens": (len(str(messages)) + len(response_content)) // 4
+            }
+        )
+    
     def get_available_models(self) -> List[str]:
         """获取可用模型列表"""
         return self.available_models
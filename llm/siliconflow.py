@@ -1,11 +1,11 @@
 """
 SiliconFlow LLM实现
 """
-import json
 import httpx
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 from core.logger import logger
-from .base import BaseLLM, ChatMessage, ChatResponse
+from .http_client import create_http_client
+from .base import BaseLLM, ChatMessage, ChatResponse, ChatStreamChunk, ThinkingStreamParser, iter_sse_deltas, parse_thinking
 
 
 class SiliconFlowLLM(BaseLLM):
@@ -13,6 +13,7 @@ class SiliconFlowLLM(BaseLLM):
     
     def __init__(self, api_key: str, base_url: str = "https://api.siliconflow.cn/v1", default_model: str = "Qwen/Qwen2.5-7B-Instruct"):
         super().__init__(api_key, base_url)
+        self._client: Optional[httpx.AsyncClient] = None
         self.default_model = default_model
         
         # SiliconFlow支持的模型列表
@@ -111,6 +112,65 @@ class SiliconFlowLLM(BaseLLM):
     ) -> ChatResponse:
         """SiliconFlow聊天完成实现"""
         
+        model, headers, payload = self._build_request(
+            messages, model, temperature, max_tokens, enable_thinking, stream=False
+        )
+        
+        try:
+            client = self._get_client()
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=60.0
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            content = result["choices"][0]["message"]["content"]
+            
+            # 解析思维过程（与流式解析规则相同），只保留最终回答
+            content, thinking_process = parse_thinking(content, enable_thinking)
+            
+            logger.info(f"SiliconFlow API调用成功，模型: {model}")
+            
+            return ChatResponse(
+                content=content,
+                thinking_process=thinking_process,
+                usage=result.get("usage"),
+                model=model
+            )
+            
+        except httpx.HTTPError as e:
+            logger.error(f"SiliconFlow API调用失败: {e}")
+            raise Exception(f"SiliconFlow API调用失败: {e}")
+        except Exception as e:
+            logger.error(f"SiliconFlow处理异常: {e}")
+            raise Exception(f"SiliconFlow处理异常: {e}")
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取长连接复用的HTTP客户端（首次使用时创建）"""
+        if self._client is None or self._client.is_closed:
+            self._client = create_http_client()
+        return self._client
+    
+    async def aclose(self):
+        """关闭HTTP客户端"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    def _build_request(
+        self,
+        messages: List[ChatMessage],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        enable_thinking: bool,
+        stream: bool
+    ):
+        """构建请求头和请求体，返回实际使用的模型名"""
+        
         if not model:
             model = self.default_model
             
@@ -153,48 +213,54 @@ class SiliconFlowLLM(BaseLLM):
             "messages": [{"role": msg.role, "content": msg.content} for msg in enhanced_messages],
             "temperature": temperature,
             "max_tokens": max_tokens,
-            "stream": False
+            "stream": stream
         }
         
+        return model, headers, payload
+    
+    async def chat_completion_stream(
+        self,
+        messages: List[ChatMessage],
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: int = None,
+        enable_thinking: bool = False
+    ) -> AsyncIterator[ChatStreamChunk]:
+        """SiliconFlow流式聊天完成实现"""
+        
+        model, headers, payload = self._build_request(
+            messages, model, temperature, max_tokens, enable_thinking, stream=True
+        )
+        
+        parser = ThinkingStreamParser(enable_thinking)
+        usage = None
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                )
+            client = self._get_client()
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=60.0
+            ) as response:
                 response.raise_for_status()
                 
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                
-                # 解析思维过程
-                thinking_process = None
-                if enable_thinking and "<thinking>" in content:
-                    thinking_start = content.find("<thinking>") + len("<thinking>")
-                    thinking_end = content.find("</thinking>")
-                    if thinking_end > thinking_start:
-                        thinking_text = content[thinking_start:thinking_end].strip()
-                        thinking_process = [step.strip() for step in thinking_text.split('\n') if step.strip()]
-                        # 移除思维过程，只保留最终回答
-                        content = content[thinking_end + len("</thinking>"):].strip()
-                
-                logger.info(f"SiliconFlow API调用成功，模型: {model}")
-                
-                return ChatResponse(
-                    content=content,
-                    thinking_process=thinking_process,
-                    usage=result.get("usage"),
-                    model=model
-                )
-                
+                async for delta, chunk_usage in iter_sse_deltas(response):
+                    if chunk_usage:
+                        usage = chunk_usage
+                    for chunk in parser.feed(delta):
+                        yield chunk
+            
+            for chunk in parser.finish():
+                yield chunk
+            
+            logger.info(f"SiliconFlow流式API调用成功，模型: {model}")
+            yield ChatStreamChunk(type="done", usage=usage, model=model)
+            
         except httpx.HTTPError as e:
-            logger.error(f"SiliconFlow API调用失败: {e}")
-            raise Exception(f"SiliconFlow API调用失败: {e}")
-        except Exception as e:
-            logger.error(f"SiliconFlow处理异常: {e}")
-            raise Exception(f"SiliconFlow处理异常: {e}")
+            logger.error(f"SiliconFlow流式API调用失败: {e}")
+            raise Exception(f"SiliconFlow流式API调用失败: {e}")
     
     def get_available_models(self) -> List[str]:
         """获取SiliconFlow可用模型列表"""
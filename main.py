@@ -2,15 +2,20 @@
 FastAPI 主应用
 提供聊天机器人的Web API接口
 """
+import json
 import uvicorn
 from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 from typing import Dict, Any
 
-from core.chatbot import ChatbotCore, ChatRequest, ChatbotResponse
+from core.chatbot import ChatbotCore, ChatRequest, ChatbotResponse, EmotionBatchRequest
+from core.ingestion import IngestRequest
 from core.logger import logger
 from core.config import settings
+from llm.factory import LLMFactory
 
 
 # 全局聊天机器人实例
@@ -22,11 +27,12 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     global chatbot_core
     
-    # 启动时初始化
+    # 启动时初始化（数据库连接、编码器和向量存储在后台并行加载，就绪状态见 /ready）
     logger.info("正在启动聊天机器人系统...")
     try:
         chatbot_core = ChatbotCore()
-        logger.info("聊天机器人系统启动成功")
+        await chatbot_core.start()
+        logger.info("聊天机器人系统已启动，正在后台加载模型和连接数据库")
         yield
     except Exception as e:
         logger.error(f"聊天机器人系统启动失败: {e}")
@@ -34,7 +40,10 @@ async def lifespan(app: FastAPI):
     finally:
         # 关闭时清理资源
         if chatbot_core:
+            # 先写入回写队列中尚未持久化的数据，再关闭连接
+            await chatbot_core.stop()
             chatbot_core.close()
+        await LLMFactory.close_all()
         logger.info("聊天机器人系统已关闭")
 
 
@@ -104,6 +113,69 @@ async def chat(request: ChatRequest) -> ChatbotResponse:
         raise HTTPException(status_code=500, detail=f"聊天处理失败: {str(e)}")
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    流式聊天接口（Server-Sent Events）
+    
+    事件类型：
+    - start: 会话ID和情感分析结果
+    - thinking: 思维链步骤
+    - token: 回答片段
+    - done: 完整的聊天响应（与 /chat 返回结构相同）
+    - error: 处理失败
+    """
+    if not chatbot_core:
+        raise HTTPException(status_code=500, detail="聊天机器人系统未初始化")
+    
+    logger.info(f"收到流式聊天请求 - 用户: {request.user_id}, 消息: {request.message[:50]}...")
+    
+    async def event_stream():
+        async for event in chatbot_core.process_chat_stream(request):
+            data = json.dumps(jsonable_encoder(event["data"]), ensure_ascii=False)
+            yield f"event: {event['event']}\ndata: {data}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/emotion/batch")
+async def analyze_emotion_batch(request: EmotionBatchRequest) -> Dict[str, Any]:
+    """批量情感分析"""
+    try:
+        if not chatbot_core:
+            raise HTTPException(status_code=500, detail="聊天机器人系统未初始化")
+        
+        return {"results": await chatbot_core.analyze_emotions(request.texts)}
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"批量情感分析失败: {e}")
+        raise HTTPException(status_code=500, detail=f"批量情感分析失败: {str(e)}")
+
+
+@app.post("/emotion/history/{user_id}/rescore")
+async def rescore_emotion_history(user_id: str, write_back: bool = False) -> Dict[str, Any]:
+    """对用户的全部历史消息重新做情感分析并返回情感分布，write_back=true 时写回新的标注"""
+    try:
+        if not chatbot_core:
+            raise HTTPException(status_code=500, detail="聊天机器人系统未初始化")
+        
+        return await chatbot_core.rescore_emotion_history(user_id, write_back)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"情感历史重新评分失败: {e}")
+        raise HTTPException(status_code=500, detail=f"情感历史重新评分失败: {str(e)}")
+
+
 @app.get("/session/{user_id}/{session_id}/summary")
 async def get_session_summary(user_id: str, session_id: str) -> Dict[str, Any]:
     """
@@ -224,8 +296,6 @@ async def get_available_llm_providers() -> Dict[str, Any]:
 async def get_available_models(provider: str) -> Dict[str, Any]:
     """获取指定提供商的可用模型列表"""
     try:
-        from llm.factory import LLMFactory
-        
         # 验证提供商是否可用
         available_providers = LLMFactory.get_available_providers()
         if provider not in available_providers:
@@ -262,8 +332,6 @@ async def get_available_models(provider: str) -> Dict[str, Any]:
 async def get_all_available_models() -> Dict[str, Any]:
     """获取所有提供商的可用模型列表"""
     try:
-        from llm.factory import LLMFactory
-        
         available_providers = LLMFactory.get_available_providers()
         all_models = {}
         
@@ -620,9 +688,74 @@ async def reset_worldview(user_id: str) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"重置世界观设定失败: {str(e)}")
 
 
+@app.post("/knowledge/ingest")
+async def ingest_knowledge(request: IngestRequest) -> Dict[str, Any]:
+    """提交知识库批量导入任务（文件需位于 INGESTION_DIRECTORY 下）"""
+    try:
+        if not chatbot_core:
+            raise HTTPException(status_code=500, detail="聊天机器人系统未初始化")
+        
+        return chatbot_core.ingestion.submit(request)
+        
+    except HTTPException:
+        raise
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"提交知识库导入任务失败: {e}")
+        raise HTTPException(status_code=500, detail=f"提交知识库导入任务失败: {str(e)}")
+
+
+@app.get("/knowledge/ingest")
+async def list_ingestion_jobs() -> Dict[str, Any]:
+    """列出知识库导入任务"""
+    if not chatbot_core:
+        raise HTTPException(status_code=500, detail="聊天机器人系统未初始化")
+    
+    return {"jobs": chatbot_core.ingestion.list_jobs()}
+
+
+@app.get("/knowledge/ingest/{job_id}")
+async def get_ingestion_job(job_id: str) -> Dict[str, Any]:
+    """查询知识库导入任务进度"""
+    if not chatbot_core:
+        raise HTTPException(status_code=500, detail="聊天机器人系统未初始化")
+    
+    job = chatbot_core.ingestion.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="导入任务不存在")
+    return job
+
+
+@app.get("/metrics")
+async def get_runtime_metrics() -> Dict[str, Any]:
+    """获取运行时指标（执行器队列深度等）"""
+    try:
+        if not chatbot_core:
+            raise HTTPException(status_code=500, detail="聊天机器人系统未初始化")
+        
+        return chatbot_core.get_runtime_stats()
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取运行时指标失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取运行时指标失败: {str(e)}")
+
+
+@app.get("/ready")
+async def readiness_check():
+    """就绪检查接口：数据库、编码器和向量存储全部初始化完成后返回200，否则返回503"""
+    if not chatbot_core:
+        return JSONResponse(status_code=503, content={"ready": False, "message": "聊天机器人系统未初始化"})
+    
+    readiness = chatbot_core.get_readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+
 @app.get("/health")
 async def health_check() -> Dict[str, Any]:
-    """健康检查接口"""
+    """健康检查接口（存活检查，不等待模型加载）"""
     try:
         if not chatbot_core:
             return {"status": "unhealthy", "message": "聊天机器人系统未初始化"}
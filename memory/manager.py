@@ -2,10 +2,15 @@
 记忆管理器
 负责管理对话记忆、会话状态和用户档案
 """
+import asyncio
+import hashlib
 import uuid
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from core.cache import LRUCache
 from core.config import settings
 from core.logger import logger
 from .models import (
@@ -28,37 +33,63 @@ class MemoryManager:
         
         # 集合引用
         self.conversations = self.db.conversations
+        self.messages = self.db.messages
         self.summaries = self.db.summaries
         self.user_profiles = self.db.user_profiles
         self.bot_profiles = self.db.bot_profiles
         self.worldview_keywords = self.db.worldview_keywords
         
-        # 创建索引
-        self._create_indexes()
+        # 热点数据缓存：档案和世界观只在对应接口调用时变化，写入时主动失效；
+        # 过期时间保证多进程部署下其他进程的缓存最终一致
+        self.bot_profile_cache = LRUCache(
+            "bot_profile",
+            max_size=settings.hot_state_cache_size,
+            ttl=settings.hot_state_cache_ttl
+        )
+        self.worldview_cache = LRUCache(
+            "worldview_keywords",
+            max_size=settings.hot_state_cache_size,
+            ttl=settings.hot_state_cache_ttl
+        )
         
         logger.info("记忆管理器初始化完成")
     
-    def _create_indexes(self):
-        """创建数据库索引"""
+    async def ping(self):
+        """检查数据库连接，连接失败时抛出异常"""
+        await self.client.admin.command("ping")
+    
+    async def create_indexes(self):
+        """创建数据库索引（各索引互不依赖，并发创建以缩短启动时间）"""
+        # 开启保留期限时，长期未更新的会话和过期消息由 TTL 索引自动删除
+        ttl_seconds = int(settings.retention_ttl_days * 86400) if settings.retention_ttl_days > 0 else None
         try:
-            # 对话会话索引
-            self.conversations.create_index([("user_id", 1), ("session_id", 1)])
-            self.conversations.create_index([("user_id", 1), ("created_at", -1)])
-            self.conversations.create_index([("is_active", 1)])
-            
-            # 记忆摘要索引
-            self.summaries.create_index([("user_id", 1), ("created_at", -1)])
-            self.summaries.create_index([("importance_score", -1)])
-            
-            # 用户档案索引
-            self.user_profiles.create_index([("user_id", 1)], unique=True)
-            
-            # 机器人档案索引
-            self.bot_profiles.create_index([("user_id", 1)], unique=True)
-            
-            # 世界观关键词索引
-            self.worldview_keywords.create_index([("user_id", 1), ("category", 1)])
-            self.worldview_keywords.create_index([("user_id", 1)])
+            await asyncio.gather(
+                # 对话会话索引
+                # 唯一索引保证并发的首次请求不会为同一会话插入两条记录
+                self._ensure_unique_index(self.conversations, [("user_id", 1), ("session_id", 1)]),
+                self.conversations.create_index([("user_id", 1), ("created_at", -1)]),
+                self.conversations.create_index([("is_active", 1)]),
+                self.conversations.create_index([("consolidated_until", 1), ("updated_at", 1)]),
+                self._ensure_ttl_index(self.conversations, "updated_at", ttl_seconds),
+                self._ensure_ttl_index(self.messages, "timestamp", ttl_seconds),
+                
+                # 消息索引（按会话读取最近N条）
+                self.messages.create_index([("user_id", 1), ("session_id", 1), ("timestamp", -1)]),
+                
+                # 记忆摘要索引
+                self.summaries.create_index([("user_id", 1), ("created_at", -1)]),
+                self.summaries.create_index([("importance_score", -1)]),
+                
+                # 用户档案索引
+                self.user_profiles.create_index([("user_id", 1)], unique=True),
+                
+                # 机器人档案索引
+                self.bot_profiles.create_index([("user_id", 1)], unique=True),
+                
+                # 世界观关键词索引
+                self.worldview_keywords.create_index([("user_id", 1), ("category", 1)]),
+                self.worldview_keywords.create_index([("user_id", 1)])
+            )
             
             logger.info("数据库索引创建完成")
         except Exception as e:
@@ -91,6 +122,74 @@ class MemoryManager:
             logger.error(f"创建会话失败: {e}")
             raise
     
+    async def upsert_session_with_persona(
+        self, 
+        user_id: str, 
+        session_id: str, 
+        initial_persona: PersonaState
+    ) -> Optional[ConversationSession]:
+        """
+        获取会话，不存在时以初始人格状态创建（一次数据库往返）
+        
+        基于 find_one_and_update + upsert 实现，只返回对话流程需要的字段
+        （session_id 和 persona_state），不加载其他会话数据。
+        (user_id, session_id) 上的唯一索引保证并发的首次请求只会创建一条会话，
+        插入冲突的一方重新读取已创建的会话。
+        
+        Args:
+            user_id: 用户ID
+            session_id: 会话ID
+            initial_persona: 新建会话时使用的人格状态
+            
+        Returns:
+            Optional[ConversationSession]: 只包含必要字段的会话对象
+        """
+        now = datetime.now()
+        new_session = ConversationSession(
+            user_id=user_id,
+            session_id=session_id,
+            persona_state=initial_persona,
+            created_at=now,
+            updated_at=now
+        )
+        insert_fields = new_session.dict(
+            by_alias=True,
+            exclude={"user_id", "session_id", "updated_at", "messages"}
+        )
+        
+        query = {"user_id": user_id, "session_id": session_id}
+        projection = {"_id": 1, "user_id": 1, "session_id": 1, "persona_state": 1}
+        try:
+            try:
+                session_data = await self.conversations.find_one_and_update(
+                    query,
+                    {
+                        "$setOnInsert": insert_fields,
+                        "$set": {"updated_at": now}
+                    },
+                    projection=projection,
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # 另一个并发请求刚刚创建了该会话
+                session_data = await self.conversations.find_one_and_update(
+                    query,
+                    {"$set": {"updated_at": now}},
+                    projection=projection,
+                    return_document=ReturnDocument.AFTER
+                )
+            if session_data is None:
+                return None
+            
+            if session_data.get("_id") == new_session.id:
+                logger.info(f"创建新会话: {session_id}, 用户: {user_id}")
+            return ConversationSession(**session_data)
+            
+        except Exception as e:
+            logger.error(f"获取或创建会话失败: {e}")
+            return None
+    
     async def add_message(
         self, 
         user_id: str, 
@@ -108,29 +207,146 @@ class MemoryManager:
         Returns:
             bool: 是否成功
         """
+        return await self.add_messages(user_id, session_id, [message])
+    
+    async def add_messages(
+        self, 
+        user_id: str, 
+        session_id: str, 
+        messages: List[ConversationMessage]
+    ) -> bool:
+        """
+        批量添加消息到会话
+        
+        消息单独存放在 messages 集合中，会话文档只维护消息计数和更新时间，
+        避免会话文档随消息数量无限增长。消息主键由会话和消息内容确定并以 upsert 写入，
+        消息计数由写入后的实际消息数得出，失败后重试同一批消息不会重复写入或重复计数。
+        
+        Args:
+            user_id: 用户ID
+            session_id: 会话ID
+            messages: 消息列表
+            
+        Returns:
+            bool: 是否成功
+        """
+        if not messages:
+            return True
+        
         try:
+            message_ids = [self._message_id(session_id, index, message) for index, message in enumerate(messages)]
+            await self.messages.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": message_id},
+                        {"$setOnInsert": {"user_id": user_id, "session_id": session_id, **message.dict()}},
+                        upsert=True
+                    )
+                    for message_id, message in zip(message_ids, messages)
+                ],
+                ordered=False
+            )
+            
+            # 计数 = 独立集合中的消息数 + 尚未迁移的内嵌消息数；
+            # 取与原值的较大者，并发写入时后完成的较小计数不会覆盖先完成的
+            stored = await self.count_messages(user_id, session_id)
             result = await self.conversations.update_one(
                 {"user_id": user_id, "session_id": session_id},
-                {
-                    "$push": {"messages": message.dict()},
-                    "$set": {"updated_at": datetime.now()}
-                }
+                [{
+                    "$set": {
+                        "message_count": {"$max": [
+                            {"$ifNull": ["$message_count", 0]},
+                            {"$add": [stored, {"$size": {"$ifNull": ["$messages", []]}}]}
+                        ]},
+                        "updated_at": datetime.now()
+                    }
+                }]
             )
             
-            if result.modified_count > 0:
-                logger.info(f"添加消息到会话 {session_id}")
-                return True
-            else:
+            if result.matched_count == 0:
                 logger.warning(f"会话 {session_id} 不存在")
+                await self.messages.delete_many({"_id": {"$in": message_ids}})
                 return False
+            
+            logger.info(f"添加 {len(messages)} 条消息到会话 {session_id}")
+            return True
                 
         except Exception as e:
             logger.error(f"添加消息失败: {e}")
             return False
     
+    @staticmethod
+    def _message_id(session_id: str, index: int, message: ConversationMessage) -> str:
+        """由会话、批内序号和消息内容确定的消息主键（同一批消息重试时不变）"""
+        digest = hashlib.sha1(
+            f"{index}\x00{message.role}\x00{message.timestamp.isoformat()}\x00{message.content}".encode("utf-8")
+        ).hexdigest()
+        return f"{session_id}:{digest[:24]}"
+    
+    async def get_user_messages(
+        self,
+        user_id: str,
+        role: Optional[str] = "user",
+        limit: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按时间顺序获取用户在所有会话中的消息（用于离线分析）
+        
+        Args:
+            user_id: 用户ID
+            role: 只返回该角色的消息，为 None 时返回全部
+            limit: 数量上限，为 None 时不限制
+            
+        Returns:
+            List[Dict[str, Any]]: 消息列表（含 _id、session_id、content、timestamp、emotion、emotion_confidence）
+        """
+        query = {"user_id": user_id}
+        if role:
+            query["role"] = role
+        try:
+            cursor = self.messages.find(
+                query,
+                {"_id": 1, "session_id": 1, "content": 1, "timestamp": 1, "emotion": 1, "emotion_confidence": 1}
+            ).sort("timestamp", 1)
+            if limit:
+                cursor = cursor.limit(limit)
+            return await cursor.to_list(length=limit)
+            
+        except Exception as e:
+            logger.error(f"获取用户消息失败: {e}")
+            return []
+    
+    async def update_message_emotions(self, updates: List[Tuple[Any, str, float]]) -> int:
+        """
+        批量更新消息的情感标注
+        
+        Args:
+            updates: (消息 _id, 情感, 置信度) 列表
+            
+        Returns:
+            int: 更新的消息数
+        """
+        if not updates:
+            return 0
+        try:
+            result = await self.messages.bulk_write(
+                [
+                    UpdateOne({"_id": message_id}, {"$set": {"emotion": emotion, "emotion_confidence": confidence}})
+                    for message_id, emotion, confidence in updates
+                ],
+                ordered=False
+            )
+            return result.modified_count
+            
+        except Exception as e:
+            logger.error(f"更新消息情感失败: {e}")
+            return 0
+    
     async def get_session(self, user_id: str, session_id: str) -> Optional[ConversationSession]:
         """
-        获取会话信息
+        获取会话信息（不包含消息内容，消息请通过 get_recent_messages 获取）
+        
+        没有 message_count 的旧会话按实际消息数补全
         
         Args:
             user_id: 用户ID
@@ -140,12 +356,14 @@ class MemoryManager:
             Optional[ConversationSession]: 会话对象
         """
         try:
-            session_data = await self.conversations.find_one({
-                "user_id": user_id,
-                "session_id": session_id
-            })
+            session_data = await self.conversations.find_one(
+                {"user_id": user_id, "session_id": session_id},
+                {"messages": 0}
+            )
             
             if session_data:
+                if not session_data.get("message_count"):
+                    session_data["message_count"] = await self._stored_message_count(user_id, session_id)
                 return ConversationSession(**session_data)
             return None
             
@@ -168,20 +386,116 @@ class MemoryManager:
             limit: 消息数量限制
             
         Returns:
-            List[ConversationMessage]: 消息列表
+            List[ConversationMessage]: 按时间正序排列的消息列表
         """
         try:
-            session = await self.get_session(user_id, session_id)
-            if session and session.messages:
-                # 返回最近的消息
-                recent_messages = session.messages[-limit:] if len(session.messages) > limit else session.messages
-                return recent_messages
-            return []
+            cursor = self.messages.find(
+                {"user_id": user_id, "session_id": session_id},
+                {"_id": 0, "user_id": 0, "session_id": 0}
+            ).sort([("timestamp", -1), ("_id", -1)]).limit(limit)
+            messages_data = await cursor.to_list(length=limit)
+            messages_data.reverse()
+            
+            if len(messages_data) < limit:
+                # 尚未迁移的旧会话：内嵌数组中的消息早于独立集合中的新消息，只取其最后几条补足
+                session_data = await self.conversations.find_one(
+                    {"user_id": user_id, "session_id": session_id, "messages.0": {"$exists": True}},
+                    {"messages": {"$slice": -(limit - len(messages_data))}}
+                )
+                legacy_messages = (session_data or {}).get("messages") or []
+                messages_data = legacy_messages + messages_data
+            
+            return [ConversationMessage(**data) for data in messages_data]
             
         except Exception as e:
             logger.error(f"获取最近消息失败: {e}")
             return []
     
+    async def count_messages(self, user_id: str, session_id: str) -> int:
+        """
+        统计会话中的消息数量
+        
+        Args:
+            user_id: 用户ID
+            session_id: 会话ID
+            
+        Returns:
+            int: 消息数量
+        """
+        try:
+            return await self.messages.count_documents({"user_id": user_id, "session_id": session_id})
+        except Exception as e:
+            logger.error(f"统计消息数量失败: {e}")
+            return 0
+    
+    async def _stored_message_count(self, user_id: str, session_id: str) -> int:
+        """统计会话实际存储的消息数：独立集合中的消息加上尚未迁移的内嵌消息"""
+        count = await self.count_messages(user_id, session_id)
+        # 只在数据库端计算内嵌数组长度，不读取消息内容
+        cursor = self.conversations.aggregate([
+            {"$match": {"user_id": user_id, "session_id": session_id}},
+            {"$project": {"_id": 0, "count": {"$size": {"$ifNull": ["$messages", []]}}}}
+        ])
+        results = await cursor.to_list(length=1)
+        return count + (results[0]["count"] if results else 0)
+    
+    async def migrate_embedded_messages(self, batch_size: int = 100) -> Dict[str, int]:
+        """
+        将旧版会话文档中内嵌的 messages 数组迁移到独立的 messages 集合
+        
+        迁移后的消息使用 "会话ID:序号" 作为主键，重复执行不会产生重复数据；
+        每个会话迁移完成后才移除其内嵌数组。
+        
+        Args:
+            batch_size: 每次批量写入的消息数
+            
+        Returns:
+            Dict[str, int]: 迁移的会话数和消息数
+        """
+        migrated_sessions = 0
+        migrated_messages = 0
+        
+        cursor = self.conversations.find(
+            {"messages.0": {"$exists": True}},
+            {"user_id": 1, "session_id": 1, "messages": 1}
+        )
+        
+        async for session_data in cursor:
+            user_id = session_data["user_id"]
+            session_id = session_data["session_id"]
+            embedded = session_data.get("messages") or []
+            
+            operations = [
+                ReplaceOne(
+                    {"_id": f"{session_id}:{index}"},
+                    {
+                        "_id": f"{session_id}:{index}",
+                        "user_id": user_id,
+                        "session_id": session_id,
+                        **ConversationMessage(**message).dict()
+                    },
+                    upsert=True
+                )
+                for index, message in enumerate(embedded)
+            ]
+            for start in range(0, len(operations), batch_size):
+                await self.messages.bulk_write(operations[start:start + batch_size], ordered=False)
+            
+            await self.conversations.update_one(
+                {"_id": session_data["_id"]},
+                {
+                    "$unset": {"messages": ""},
+                    "$set": {"message_count": await self.count_messages(user_id, session_id)}
+                }
+            )
+            
+            migrated_sessions += 1
+            migrated_messages += len(embedded)
+            logger.info(f"迁移会话 {session_id} 的 {len(embedded)} 条消息")
+        
+        logger.info(f"消息迁移完成: {migrated_sessions} 个会话, {migrated_messages} 条消息")
+        return {"sessions": migrated_sessions, "messages": migrated_messages}
+    
     async def update_persona_state(
         self, 
         user_id: str, 
@@ -260,6 +574,144 @@ class MemoryManager:
             logger.error(f"创建记忆摘要失败: {e}")
             return False
     
+    async def _ensure_unique_index(self, collection, keys: List[Tuple[str, int]]):
+        """
+        创建唯一索引；已存在同键的普通索引时替换为唯一索引
+        
+        已有重复数据时无法建立唯一索引，此时恢复普通索引并记录错误，需要清理重复数据后重启
+        
+        Args:
+            collection: 集合
+            keys: 索引键
+        """
+        try:
+            await collection.create_index(keys, unique=True)
+            return
+        except OperationFailure as e:
+            # 选项冲突之外的错误（如权限不足）直接抛出
+            if e.code not in (85, 86):
+                raise
+        
+        name = "_".join(f"{field}_{direction}" for field, direction in keys)
+        logger.info(f"{collection.name}.{name} 由普通索引升级为唯一索引")
+        await collection.drop_index(name)
+        try:
+            await collection.create_index(keys, unique=True)
+        except (DuplicateKeyError, OperationFailure) as e:
+            await collection.create_index(keys)
+            logger.error(f"{collection.name}.{name} 存在重复数据，无法建立唯一索引: {e}")
+    
+    async def _ensure_ttl_index(self, collection, field: str, ttl_seconds: Optional[int]):
+        """
+        创建单字段索引；ttl_seconds 不为空时为 TTL 索引，已存在的索引通过 collMod 更新过期时间
+        
+        Args:
+            collection: 集合
+            field: 字段名
+            ttl_seconds: 过期秒数，为 None 时创建普通索引
+        """
+        if ttl_seconds is None:
+            try:
+                await collection.create_index([(field, 1)])
+            except OperationFailure:
+                # 已存在同名 TTL 索引（之前开启过保留期限），保留原索引
+                logger.warning(f"{collection.name}.{field} 已存在 TTL 索引，如需关闭请手动删除")
+            return
+        
+        try:
+            await collection.create_index([(field, 1)], expireAfterSeconds=ttl_seconds)
+        except OperationFailure:
+            # 索引已存在但选项不同（普通索引或过期时间不同）
+            await self.db.command(
+                "collMod",
+                collection.name,
+                index={"keyPattern": {field: 1}, "expireAfterSeconds": ttl_seconds}
+            )
+            logger.info(f"已更新 {collection.name}.{field} 的 TTL 为 {ttl_seconds} 秒")
+    
+    async def list_user_ids(self, after: str = "", limit: int = 100) -> List[str]:
+        """
+        按用户ID顺序分页列出有会话的用户
+        
+        Args:
+            after: 从该用户ID之后开始
+            limit: 返回数量上限
+            
+        Returns:
+            List[str]: 用户ID列表
+        """
+        try:
+            cursor = self.conversations.aggregate([
+                {"$match": {"user_id": {"$gt": after}}},
+                {"$group": {"_id": "$user_id"}},
+                {"$sort": {"_id": 1}},
+                {"$limit": limit}
+            ])
+            return [doc["_id"] async for doc in cursor]
+            
+        except Exception as e:
+            logger.error(f"列出用户失败: {e}")
+            return []
+    
+    async def get_sessions_for_consolidation(
+        self,
+        older_than: datetime,
+        limit: int = 50
+    ) -> List[Dict[str, str]]:
+        """
+        获取需要整合记忆的会话：创建早于 older_than（即存在早于该时间的对话），
+        且上次整合后又有新消息（或从未整合）；持续活跃的会话同样会被选中，只整合其中较早的对话
+        
+        最久未整合的会话优先，刚整合过的会话排到最后
+        
+        Args:
+            older_than: 对话时间截止点
+            limit: 返回数量上限
+            
+        Returns:
+            List[Dict[str, str]]: 包含 user_id 和 session_id 的列表
+        """
+        try:
+            cursor = self.conversations.find(
+                {
+                    "created_at": {"$lt": older_than},
+                    "$or": [
+                        {"consolidated_until": {"$exists": False}},
+                        {"$expr": {"$lt": ["$consolidated_until", "$updated_at"]}}
+                    ]
+                },
+                {"_id": 0, "user_id": 1, "session_id": 1}
+            ).sort([("consolidated_until", 1), ("updated_at", 1)]).limit(limit)
+            return await cursor.to_list(length=limit)
+            
+        except Exception as e:
+            logger.error(f"获取待整合会话失败: {e}")
+            return []
+    
+    async def mark_session_consolidated(self, user_id: str, session_id: str, until: datetime) -> bool:
+        """
+        标记会话中 until 之前的对话已完成记忆整合
+        
+        Args:
+            user_id: 用户ID
+            session_id: 会话ID
+            until: 本次整合的对话时间截止点
+            
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            # consolidated_until 早于 updated_at（之后又有新消息）时会被再次选中，这里不修改 updated_at
+            result = await self.conversations.update_one(
+                {"user_id": user_id, "session_id": session_id},
+                {"$set": {"consolidated_until": until}}
+            )
+            return result.matched_count > 0
+            
+        except Exception as e:
+            logger.error(f"标记会话整合状态失败: {e}")
+            return False
+    
     async def get_user_profile(self, user_id: str) -> Optional[UserProfile]:
         """
         获取用户档案
@@ -351,15 +803,22 @@ class MemoryManager:
         Returns:
             Optional[BotProfile]: 机器人档案
         """
+        cached = self.bot_profile_cache.get(user_id)
+        if cached is not None:
+            # 返回副本，避免调用方修改缓存中的对象
+            return cached.model_copy(deep=True)
+        
         try:
             profile_data = await self.bot_profiles.find_one({"user_id": user_id})
             if profile_data:
-                return BotProfile(**profile_data)
+                bot_profile = BotProfile(**profile_data)
+            else:
+                # 如果没有找到，创建默认的天城档案
+                bot_profile = BotProfile(user_id=user_id)
+                await self.update_bot_profile(bot_profile)
             
-            # 如果没有找到，创建默认的天城档案
-            default_profile = BotProfile(user_id=user_id)
-            await self.update_bot_profile(default_profile)
-            return default_profile
+            self.bot_profile_cache.set(user_id, bot_profile.model_copy(deep=True))
+            return bot_profile
             
         except Exception as e:
             logger.error(f"获取机器人档案失败: {e}")
@@ -383,6 +842,7 @@ class MemoryManager:
                 {"$set": bot_profile.dict(by_alias=True, exclude={"id"})},
                 upsert=True
             )
+            self.bot_profile_cache.invalidate(bot_profile.user_id)
             
             logger.info(f"更新机器人档案: {bot_profile.bot_name} (用户: {bot_profile.user_id})")
             return True
@@ -432,6 +892,7 @@ class MemoryManager:
                     }
                 }
             )
+            self.bot_profile_cache.invalidate(user_id)
             
             if result.modified_count > 0:
                 logger.info(f"更新机器人名字为: {new_name} (用户: {user_id})")
@@ -472,6 +933,7 @@ class MemoryManager:
                 {"user_id": user_id},
                 {"$set": update_data}
             )
+            self.bot_profile_cache.invalidate(user_id)
             
             if result.modified_count > 0:
                 logger.info(f"更新机器人人格为: {personality_type} (用户: {user_id})")
@@ -507,6 +969,7 @@ class MemoryManager:
                     }
                 }
             )
+            self.bot_profile_cache.invalidate(user_id)
             
             if result.modified_count > 0:
                 logger.info(f"更新机器人说话风格 (用户: {user_id})")
@@ -533,11 +996,13 @@ class MemoryManager:
         try:
             # 先删除用户的现有世界观关键词
             user_id = worldview_keywords[0].user_id
+            self.worldview_cache.invalidate(user_id)
             await self.worldview_keywords.delete_many({"user_id": user_id})
             
             # 插入新的世界观关键词
             keywords_data = [kw.dict(by_alias=True) for kw in worldview_keywords]
             result = await self.worldview_keywords.insert_many(keywords_data)
+            self.worldview_cache.invalidate(user_id)
             
             logger.info(f"保存了 {len(result.inserted_ids)} 个世界观关键词记录")
             return True
@@ -556,6 +1021,10 @@ class MemoryManager:
         Returns:
             List[WorldviewKeywords]: 世界观关键词列表
         """
+        cached = self.worldview_cache.get(user_id)
+        if cached is not None:
+            return [record.model_copy(deep=True) for record in cached]
+        
         try:
             cursor = self.worldview_keywords.find({"user_id": user_id})
             keywords_data = await cursor.to_list(length=None)
@@ -564,6 +1033,9 @@ class MemoryManager:
             for data in keywords_data:
                 worldview_keywords.append(WorldviewKeywords(**data))
             
+            self.worldview_cache.set(
+                user_id, [record.model_copy(deep=True) for record in worldview_keywords]
+            )
             logger.info(f"获取到 {len(worldview_keywords)} 个世界观关键词记录")
             return worldview_keywords
             
@@ -602,6 +1074,7 @@ class MemoryManager:
                 },
                 upsert=True
             )
+            self.worldview_cache.invalidate(user_id)
             
             logger.info(f"更新世界观关键词类别 {category}")
             return True
@@ -627,6 +1100,7 @@ class MemoryManager:
                 query["category"] = category
             
             result = await self.worldview_keywords.delete_many(query)
+            self.worldview_cache.invalidate(user_id)
             
             logger.info(f"删除了 {result.deleted_count} 个世界观关键词记录")
             return True
@@ -635,6 +1109,18 @@ class MemoryManager:
             logger.error(f"删除世界观关键词失败: {e}")
             return False
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取热点数据缓存统计
+        
+        Returns:
+            Dict[str, Any]: 各缓存的命中统计
+        """
+        return {
+            "bot_profile": self.bot_profile_cache.get_stats(),
+            "worldview_keywords": self.worldview_cache.get_stats()
+        }
+    
     def close(self):
         """关闭数据库连接"""
         if self.client:
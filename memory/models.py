@@ -44,7 +44,8 @@ class ConversationSession(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     user_id: str
     session_id: str
-    messages: List[ConversationMessage] = []
+    messages: List[ConversationMessage] = []  # 旧版内嵌消息，新消息存放在独立的 messages 集合中
+    message_count: int = 0
     persona_state: PersonaState
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+消息迁移脚本
+将旧版会话文档中内嵌的 messages 数组迁移到独立的 messages 集合
+可重复执行，已迁移的消息不会重复写入
+"""
+import asyncio
+from memory.manager import MemoryManager
+
+
+async def migrate_messages():
+    """执行消息迁移"""
+    print("🔄 开始迁移会话消息...")
+    
+    memory_manager = MemoryManager()
+    try:
+        await memory_manager.create_indexes()
+        result = await memory_manager.migrate_embedded_messages()
+        print(f"✅ 迁移完成: {result['sessions']} 个会话, {result['messages']} 条消息")
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+    finally:
+        memory_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_messages())
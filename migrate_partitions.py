@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+知识库分区迁移脚本
+把旧版单一集合（chatbot_knowledge）中的数据复制到当前配置的分区存储
+（VECTOR_STORE_PARTITIONING=user/hash，或 VECTOR_STORE_BACKEND=mmap）
+复制时保留原有ID和向量，可重复执行，已迁移的条目不会重复写入
+"""
+import argparse
+
+from core.config import settings
+from rag.vector_store import ChromaVectorStore, create_vector_store
+
+
+def migrate_partitions(collection_name: str, batch_size: int):
+    """
+    执行分区迁移
+
+    Args:
+        collection_name: 源集合名称
+        batch_size: 每批复制的条目数
+    """
+    if settings.vector_store_backend == "chroma" and settings.vector_store_partitioning == "none":
+        print("❌ 当前配置未启用分区，请先设置 VECTOR_STORE_PARTITIONING 或 VECTOR_STORE_BACKEND=mmap")
+        return
+
+    print(f"🔄 开始迁移集合 {collection_name} ...")
+    source = ChromaVectorStore(collection_name)
+    target = create_vector_store(collection_name)
+
+    total = source.count()
+    copied = 0
+    try:
+        for page in source.iter_items(batch_size):
+            # 元数据缺少 user_id 的条目进入共享分区
+            metadatas = [metadata or {} for metadata in page["metadatas"]]
+            target.add(
+                ids=page["ids"],
+                embeddings=[list(embedding) for embedding in page["embeddings"]],
+                documents=page["documents"],
+                metadatas=metadatas
+            )
+            copied += len(page["ids"])
+            print(f"  已复制 {copied}/{total}")
+
+        print(f"✅ 迁移完成: {copied} 条，目标存储共 {target.count()} 条")
+        print("   确认无误后可删除旧集合")
+    except Exception as e:
+        print(f"❌ 迁移失败（已复制 {copied} 条，可直接重新执行）: {e}")
+    finally:
+        target.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="将单一知识库集合迁移到分区存储")
+    parser.add_argument("--collection", default="chatbot_knowledge", help="源集合名称")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批复制的条目数")
+    args = parser.parse_args()
+
+    migrate_partitions(args.collection, args.batch_size)
@@ -0,0 +1,115 @@
+"""
+记忆整合
+把同一会话中较早的对话按向量聚类，每个簇生成一条摘要（抽取式），
+摘要向量取簇的归一化中心，用于替换簇内的原始条目；已有的摘要也参与聚类，与相近的条目再次合并
+"""
+import math
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+
+from rag.lexical_index import tokenize
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def cluster_embeddings(embeddings: np.ndarray, n_clusters: int, iterations: int = 10) -> np.ndarray:
+    """
+    球面 k-means 聚类（余弦相似度），最远点初始化，结果确定
+
+    Args:
+        embeddings: 向量矩阵 (条目数, 维度)
+        n_clusters: 簇数量
+        iterations: 迭代次数上限
+
+    Returns:
+        np.ndarray: 每个条目所属的簇编号
+    """
+    vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+    count = len(vectors)
+    n_clusters = max(1, min(n_clusters, count))
+
+    # 最远点初始化：依次选择与已选中心最不相似的条目
+    centers = [0]
+    max_sim = vectors @ vectors[0]
+    while len(centers) < n_clusters:
+        nxt = int(np.argmin(max_sim))
+        centers.append(nxt)
+        np.maximum(max_sim, vectors @ vectors[nxt], out=max_sim)
+    centroids = vectors[centers]
+
+    labels = np.zeros(count, dtype=np.int64)
+    for step in range(iterations):
+        new_labels = np.argmax(vectors @ centroids.T, axis=1)
+        if step > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(n_clusters):
+            members = vectors[labels == c]
+            if len(members):
+                centroids[c] = _normalize(members.sum(axis=0))
+    return labels
+
+
+def _excerpt(item: Dict[str, Any]) -> str:
+    """条目的代表性语句：摘要条目取其引用的语句部分，避免摘要文本层层嵌套"""
+    content = item["content"]
+    if item["metadata"].get("content_type") == "summary":
+        content = content.split("：", 1)[-1]
+    return content[:60]
+
+
+def summarize_cluster(items: List[Dict[str, Any]], embeddings: np.ndarray, max_excerpts: int = 2) -> Dict[str, Any]:
+    """
+    为一个簇生成抽取式摘要
+
+    Args:
+        items: 簇内条目（含 content、metadata），可以包含以前生成的摘要
+        embeddings: 簇内条目的向量
+        max_excerpts: 摘要中引用的代表性语句数量
+
+    Returns:
+        Dict[str, Any]: summary_text、embedding、key_topics、emotional_tone、importance_score、timestamp_ts，
+            以及 source_count（涵盖的原始对话数，摘要按其 source_count 计）
+    """
+    vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+    centroid = _normalize(vectors.mean(axis=0))
+
+    # 离中心最近的用户语句或摘要作为代表（都没有时用全部条目）
+    order = np.argsort(-(vectors @ centroid))
+    user_rows = [i for i in order if items[i]["metadata"].get("role") in ("user", "summary")] or list(order)
+    excerpts = [_excerpt(items[i]) for i in user_rows[:max_excerpts]]
+    source_count = sum(int(item["metadata"].get("source_count", 1)) for item in items)
+
+    terms = Counter()
+    for item in items:
+        terms.update(tokenize(item["content"]))
+    key_topics = [term for term, _ in terms.most_common(5)]
+
+    emotions = Counter(
+        item["metadata"]["emotion"] for item in items if item["metadata"].get("emotion")
+    )
+    confidences = [
+        float(item["metadata"]["emotion_confidence"])
+        for item in items if item["metadata"].get("emotion_confidence") is not None
+    ]
+
+    # 重要性：簇越大、情绪越强烈越重要（各占一半）
+    size_score = min(1.0, math.log2(1 + source_count) / 4)
+    emotion_score = sum(confidences) / len(confidences) if confidences else 0.0
+    importance_score = round(0.5 * size_score + 0.5 * emotion_score, 3)
+
+    timestamps = [item["metadata"].get("timestamp_ts") for item in items]
+    return {
+        "summary_text": f"{source_count}条对话的摘要：" + "；".join(excerpts),
+        "embedding": centroid,
+        "key_topics": key_topics,
+        "emotional_tone": emotions.most_common(1)[0][0] if emotions else "neutral",
+        "importance_score": importance_score,
+        "timestamp_ts": max((t for t in timestamps if t is not None), default=None),
+        "source_count": source_count
+    }
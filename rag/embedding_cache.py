@@ -0,0 +1,96 @@
+"""
+向量缓存
+以文本内容哈希为键缓存句向量，使同一文本在检索和写入时只编码一次
+"""
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from core.cache import LRUCache
+
+
+class EmbeddingCache:
+    """基于内容哈希的句向量 LRU 缓存"""
+
+    def __init__(self, namespace: str, max_bytes: int, max_entries: int = 1_000_000):
+        """
+        Args:
+            namespace: 命名空间（通常为模型名，避免不同模型的向量混用）
+            max_bytes: 缓存向量占用的内存上限（字节），不大于 0 时禁用缓存
+            max_entries: 最大条目数
+        """
+        self.namespace = namespace
+        self.enabled = max_bytes > 0
+        self._cache = LRUCache(
+            "embedding",
+            max_size=max_entries,
+            max_bytes=max_bytes,
+            sizeof=lambda vector: vector.nbytes
+        )
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.namespace}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """获取单条文本的缓存向量"""
+        if not self.enabled:
+            return None
+        return self._cache.get(self._key(text))
+
+    def peek(self, text: str) -> Optional[np.ndarray]:
+        """获取单条文本的缓存向量，不计入命中统计"""
+        if not self.enabled:
+            return None
+        return self._cache.peek(self._key(text))
+
+    def put(self, text: str, vector: np.ndarray):
+        """缓存单条文本的向量"""
+        if not self.enabled:
+            return
+        self._cache.set(self._key(text), vector)
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        encode_fn: Callable[[List[str]], np.ndarray],
+        count_lookups: bool = True
+    ) -> np.ndarray:
+        """
+        获取一批文本的向量，只对未命中缓存的文本调用编码函数
+
+        Args:
+            texts: 文本列表
+            encode_fn: 批量编码函数，输入文本列表，返回二维向量矩阵
+            count_lookups: 是否把本次查找计入命中统计（调用方已统计过时为 False）
+
+        Returns:
+            np.ndarray: 与输入顺序一致的向量矩阵
+        """
+        lookup = self.get if count_lookups else self.peek
+        vectors: List[Optional[np.ndarray]] = [lookup(text) for text in texts]
+
+        # 同一批内重复的文本也只编码一次
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            encoded = np.asarray(encode_fn(missing), dtype=np.float32)
+            fresh = {}
+            for text, vector in zip(missing, encoded):
+                # 复制为独立数组，避免缓存的行视图拖住整个批次矩阵
+                vector = vector.copy()
+                fresh[text] = vector
+                self.put(text, vector)
+            vectors = [vector if vector is not None else fresh[text] for text, vector in zip(texts, vectors)]
+
+        return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 命中率、内存占用等
+        """
+        stats = self._cache.get_stats()
+        stats["enabled"] = self.enabled
+        return stats
@@ -0,0 +1,83 @@
+"""
+向量编码服务
+将并发对话中的编码请求合并为批次，在一次编码器前向计算中完成，
+使编码吞吐随并发量提升
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from core.batching import MicroBatcher
+from core.executor import BoundedExecutor
+from rag.embedding_cache import EmbeddingCache
+
+
+class EmbeddingService:
+    """跨请求微批编码服务"""
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        executor: BoundedExecutor,
+        cache: EmbeddingCache,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005
+    ):
+        """
+        Args:
+            encode_fn: 批量编码函数（阻塞），输入文本列表，返回二维向量矩阵
+            executor: 运行编码函数的执行器
+            cache: 向量缓存，命中的文本不进入批次
+            max_batch_size: 单批最大文本数
+            max_wait: 凑批的最长等待时间（秒）
+        """
+        self._encode_fn = encode_fn
+        self.executor = executor
+        self.cache = cache
+        self.batcher = MicroBatcher(
+            name="embedding",
+            process_batch=self._encode_batch,
+            max_batch_size=max_batch_size,
+            max_wait=max_wait
+        )
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        生成一组文本的向量
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            np.ndarray: 与输入顺序一致的向量矩阵
+        """
+        vectors = [self.cache.get(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = await asyncio.gather(*(self.batcher.submit(texts[i]) for i in missing))
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    async def _encode_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """在执行器中对一批文本做一次编码，同批重复文本只编码一次"""
+        return await self.executor.run(self._encode_sync, texts)
+
+    def _encode_sync(self, texts: List[str]) -> List[np.ndarray]:
+        # 批次中的文本在 embed 中已按未命中计数；这里再次查找只为复用并发请求刚写入的向量，不重复计数
+        matrix = self.cache.encode(texts, self._encode_fn, count_lookups=False)
+        return list(matrix)
+
+    async def stop(self):
+        """停止批处理任务"""
+        await self.batcher.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取编码服务指标
+
+        Returns:
+            Dict[str, Any]: 批处理指标
+        """
+        return self.batcher.get_stats()
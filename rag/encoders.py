@@ -0,0 +1,161 @@
+"""
+句向量编码器
+提供统一的编码器接口，支持 sentence-transformers（PyTorch）和 ONNX Runtime 两种后端，
+ONNX 后端可加载 int8 量化模型，无需安装 PyTorch
+"""
+import os
+from abc import ABC, abstractmethod
+from typing import List, Sequence
+
+import numpy as np
+
+from core.config import settings
+from core.logger import logger
+
+
+class Encoder(ABC):
+    """句向量编码器接口"""
+
+    # 编码器标识，用于区分不同模型/后端生成的向量（如向量缓存的命名空间）
+    name: str = "encoder"
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        批量编码文本
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            np.ndarray: 形状为 (len(texts), 维度) 的 float32 向量矩阵
+        """
+        pass
+
+
+class SentenceTransformerEncoder(Encoder):
+    """基于 sentence-transformers 的编码器（PyTorch fp32）"""
+
+    def __init__(self, model_name: str, fallback_model_name: str = "paraphrase-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        try:
+            self.model = SentenceTransformer(model_name)
+            logger.info("句子转换器加载成功")
+        except Exception as e:
+            logger.error(f"句子转换器加载失败: {e}")
+            # 使用备用模型
+            model_name = fallback_model_name
+            self.model = SentenceTransformer(model_name)
+        self.name = model_name
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts)), dtype=np.float32)
+
+
+class OnnxEncoder(Encoder):
+    """基于 ONNX Runtime 的编码器，支持 int8 量化模型"""
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: str = None,
+        max_length: int = 256,
+        num_threads: int = 0,
+        normalize: bool = True
+    ):
+        """
+        Args:
+            model_path: ONNX 模型文件路径
+            tokenizer_path: tokenizer.json 所在目录，默认与模型文件同目录
+            max_length: 最大token数，超出部分截断
+            num_threads: 推理线程数，0 表示由 ONNX Runtime 决定
+            normalize: 是否对输出向量做L2归一化（与 all-MiniLM-L6-v2 的默认输出一致）
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        tokenizer_dir = tokenizer_path or os.path.dirname(model_path)
+        self.tokenizer = Tokenizer.from_file(os.path.join(tokenizer_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+        self.normalize = normalize
+        self.name = f"onnx:{os.path.basename(model_path)}"
+        logger.info(f"ONNX编码器加载成功: {model_path}")
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids)
+        }
+        token_embeddings = self.session.run(
+            None, {k: v for k, v in feeds.items() if k in self._input_names}
+        )[0]
+
+        # 按注意力掩码做平均池化
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def create_encoder(backend: str = None) -> Encoder:
+    """
+    根据配置创建编码器
+
+    Args:
+        backend: 编码后端（sentence_transformers / onnx），默认读取配置
+
+    Returns:
+        Encoder: 编码器实例，ONNX 后端加载失败时回退到 sentence-transformers
+    """
+    backend = (backend or settings.encoder_backend).lower()
+
+    if backend == "onnx":
+        try:
+            return OnnxEncoder(
+                model_path=settings.onnx_model_path,
+                tokenizer_path=settings.onnx_tokenizer_path or None,
+                max_length=settings.encoder_max_length,
+                num_threads=settings.onnx_num_threads
+            )
+        except Exception as e:
+            logger.error(f"ONNX编码器加载失败，回退到 sentence-transformers: {e}")
+    elif backend != "sentence_transformers":
+        logger.warning(f"未知的编码后端: {backend}，使用 sentence-transformers")
+
+    return SentenceTransformerEncoder(settings.encoder_model_name)
+
+
+def get_available_backends() -> List[str]:
+    """
+    获取当前环境可用的编码后端
+
+    Returns:
+        List[str]: 后端名称列表
+    """
+    backends = []
+    for backend, module in (("sentence_transformers", "sentence_transformers"), ("onnx", "onnxruntime")):
+        try:
+            __import__(module)
+            backends.append(backend)
+        except ImportError:
+            pass
+    return backends
@@ -0,0 +1,343 @@
+"""
+知识库批量导入
+流式读取文本（.txt）、Markdown（.md）和 JSONL（.jsonl）文件，切分为片段后
+分批编码、批量写入向量存储，并记录检查点，中断后可从上次完成的位置继续
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core.config import settings
+from core.logger import logger
+from rag.knowledge_base import SHARED_USER_ID
+
+SUPPORTED_SUFFIXES = (".txt", ".md", ".markdown", ".jsonl")
+
+# 句末标点（中英文），切分长段落时优先在这些位置断开
+_SENTENCE_END = re.compile(r"(?<=[。！？；!?;…\n])")
+_MD_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int = 0) -> List[str]:
+    """
+    把文本切分为不超过 chunk_size 个字符的片段，尽量在句末断开
+
+    Args:
+        text: 文本
+        chunk_size: 片段最大字符数
+        overlap: 相邻片段重叠的字符数（保留上下文）
+
+    Returns:
+        List[str]: 片段列表
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= chunk_size:
+        return [text]
+
+    overlap = max(0, min(overlap, chunk_size // 2))
+    step = chunk_size - overlap
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        # 超长的单句按固定步长硬切分
+        while len(sentence) > chunk_size:
+            sentences.append(sentence[:chunk_size])
+            sentence = sentence[step:]
+        if sentence:
+            sentences.append(sentence)
+
+    chunks = []
+    current = ""
+    for sentence in sentences:
+        if current and len(current) + len(sentence) > chunk_size:
+            chunks.append(current.strip())
+            current = current[-overlap:] if overlap else ""
+            if len(current) + len(sentence) > chunk_size:
+                current = ""
+        current += sentence
+    if current.strip():
+        chunks.append(current.strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def iter_records(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    流式读取文件中的文本记录
+
+    - .jsonl：每行一个对象，文本取 content 或 text 字段，metadata 字段中的标量值作为元数据
+    - .md：按空行分段，段落带上所在的标题（section）
+    - .txt：按空行分段
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        Iterator[Tuple[str, Dict[str, Any]]]: (文本, 元数据)
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8") as f:
+        if suffix == ".jsonl":
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"{path} 第 {line_no} 行不是有效的JSON，已跳过")
+                    continue
+                if isinstance(record, str):
+                    yield record, {}
+                    continue
+                text = record.get("content") or record.get("text")
+                if not text:
+                    continue
+                metadata = {
+                    key: value for key, value in (record.get("metadata") or {}).items()
+                    if isinstance(value, (str, int, float, bool))
+                }
+                yield text, metadata
+            return
+
+        is_markdown = suffix in (".md", ".markdown")
+        section = None
+        paragraph: List[str] = []
+        for line in f:
+            stripped = line.rstrip("\n")
+            heading = _MD_HEADING.match(stripped) if is_markdown else None
+            if heading or not stripped.strip():
+                if paragraph:
+                    yield "\n".join(paragraph), ({"section": section} if section else {})
+                    paragraph = []
+                if heading:
+                    section = heading.group(2).strip()
+                continue
+            paragraph.append(stripped)
+        if paragraph:
+            yield "\n".join(paragraph), ({"section": section} if section else {})
+
+
+def iter_chunks(path: str, chunk_size: int, overlap: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """按顺序产出文件中的全部片段，同一文件和参数下顺序固定（用于断点续传）"""
+    for text, metadata in iter_records(path):
+        for chunk in chunk_text(text, chunk_size, overlap):
+            yield chunk, metadata
+
+
+def ingestion_key(source: str, user_id: Optional[str], metadata: Optional[Dict[str, Any]]) -> str:
+    """
+    导入标识：由文件路径、所属用户和附加元数据共同决定，用作检查点文件名和条目ID前缀
+
+    同一文件导入给不同用户（或附带不同元数据）时互不覆盖；相同参数重复导入时ID不变，不会产生重复条目
+
+    Args:
+        source: 文件绝对路径
+        user_id: 知识所属用户
+        metadata: 附加元数据
+
+    Returns:
+        str: 16位十六进制标识
+    """
+    identity = json.dumps(
+        {"source": source, "user_id": user_id, "metadata": metadata or {}},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+
+class IngestionCheckpoint:
+    """导入检查点：记录某次导入（文件 + 所属用户 + 元数据）已写入的片段数，文件内容或切分参数变化后失效"""
+
+    def __init__(self, directory: str, source: str, key: str, chunk_size: int, overlap: int):
+        """
+        Args:
+            directory: 检查点目录
+            source: 文件绝对路径
+            key: 导入标识（见 ingestion_key），同一文件导入给不同用户时各自记录进度
+            chunk_size: 片段最大字符数
+            overlap: 相邻片段重叠字符数
+        """
+        self.source = source
+        stat = os.stat(source)
+        # 文件大小、修改时间和切分参数共同决定片段序列
+        self.fingerprint = f"{stat.st_size}:{int(stat.st_mtime)}:{chunk_size}:{overlap}"
+        self.path = os.path.join(directory, f"{key}.json")
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self) -> Dict[str, Any]:
+        """读取检查点，不存在或已失效时返回空记录"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"chunks_done": 0, "completed": False}
+        if state.get("fingerprint") != self.fingerprint:
+            logger.warning(f"{self.source} 已变化，从头开始导入")
+            return {"chunks_done": 0, "completed": False}
+        return state
+
+    def save(self, chunks_done: int, completed: bool = False):
+        """原子写入检查点"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "source": self.source,
+                "fingerprint": self.fingerprint,
+                "chunks_done": chunks_done,
+                "completed": completed,
+                "updated_at": time.time()
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class BulkIngestor:
+    """知识库批量导入器
+
+    编码在线程池中并行进行，写入按批次顺序执行，每批写入后更新检查点；
+    条目ID由导入标识（文件路径、所属用户、元数据）和片段序号确定，重复导入同一片段不会产生重复条目。
+    不指定用户时作为共享知识写入（所属用户为 SHARED_USER_ID），开启 SHARED_KNOWLEDGE_ENABLED 后检索记忆时与用户自己的记忆合并。
+    """
+
+    def __init__(
+        self,
+        knowledge_base,
+        batch_size: int = None,
+        workers: int = None,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        checkpoint_directory: str = None
+    ):
+        """
+        Args:
+            knowledge_base: 知识库实例
+            batch_size: 每批编码和写入的片段数
+            workers: 并行编码的线程数
+            chunk_size: 片段最大字符数
+            chunk_overlap: 相邻片段重叠字符数
+            checkpoint_directory: 检查点目录
+        """
+        self.knowledge_base = knowledge_base
+        self.batch_size = batch_size or settings.ingestion_batch_size
+        self.workers = workers or settings.ingestion_workers
+        self.chunk_size = chunk_size or settings.ingestion_chunk_size
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else settings.ingestion_chunk_overlap
+        self.checkpoint_directory = checkpoint_directory or settings.ingestion_checkpoint_directory
+
+    def _iter_batches(self, source: str, skip: int) -> Iterator[Tuple[int, List[str], List[Dict[str, Any]]]]:
+        """产出 (首个片段序号, 文本列表, 元数据列表)，跳过前 skip 个已完成的片段"""
+        contents: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        first = skip
+        for index, (chunk, metadata) in enumerate(iter_chunks(source, self.chunk_size, self.chunk_overlap)):
+            if index < skip:
+                continue
+            contents.append(chunk)
+            metadatas.append(metadata)
+            if len(contents) >= self.batch_size:
+                yield first, contents, metadatas
+                first = index + 1
+                contents, metadatas = [], []
+        if contents:
+            yield first, contents, metadatas
+
+    def ingest(
+        self,
+        path: str,
+        user_id: str = None,
+        metadata: Dict[str, Any] = None,
+        resume: bool = True,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        stop_event: threading.Event = None
+    ) -> Dict[str, Any]:
+        """
+        导入一个文件
+
+        Args:
+            path: 文件路径
+            user_id: 知识所属用户，为 None 时作为共享知识
+            metadata: 附加到每个片段的元数据
+            resume: 是否从检查点继续
+            progress: 每批写入后的回调，参数为当前进度
+            stop_event: 置位后在当前批次写入完成后停止，下次导入从检查点继续
+
+        Returns:
+            Dict[str, Any]: 导入结果（写入片段数、跳过片段数、耗时、速率、是否完成）
+        """
+        source = os.path.abspath(path)
+        if os.path.splitext(source)[1].lower() not in SUPPORTED_SUFFIXES:
+            raise ValueError(f"不支持的文件类型: {path}（支持 {', '.join(SUPPORTED_SUFFIXES)}）")
+
+        user_id = user_id or SHARED_USER_ID
+        key = ingestion_key(source, user_id, metadata)
+        checkpoint = IngestionCheckpoint(self.checkpoint_directory, source, key, self.chunk_size, self.chunk_overlap)
+        state = checkpoint.load() if resume else {"chunks_done": 0, "completed": False}
+        skipped = state["chunks_done"]
+        if state.get("completed"):
+            logger.info(f"{source} 已导入完成，跳过")
+            return {"source": source, "ingested": 0, "skipped": skipped, "elapsed": 0.0, "rate": 0.0, "completed": True}
+
+        base_metadata = {
+            "content_type": "preset",
+            "source": os.path.basename(source),
+            **(metadata or {})
+        }
+        encode = self.knowledge_base.encoder.encode
+
+        started = time.perf_counter()
+        done = skipped
+        ingested = 0
+
+        def write(first: int, contents: List[str], metadatas: List[Dict[str, Any]], embeddings):
+            nonlocal done, ingested
+            self.knowledge_base.add_knowledge_batch(
+                contents=contents,
+                metadatas=[{**base_metadata, **item} for item in metadatas],
+                user_id=user_id,
+                embeddings=embeddings.tolist(),
+                ids=[f"ingest-{key}-{first + i}" for i in range(len(contents))]
+            )
+            done = first + len(contents)
+            ingested += len(contents)
+            checkpoint.save(done)
+            if progress:
+                elapsed = time.perf_counter() - started
+                progress({"source": source, "chunks_done": done, "ingested": ingested, "elapsed": elapsed})
+
+        # 最多 workers 批同时编码，写入按批次顺序进行，保证检查点之前的片段都已落盘
+        completed = True
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest") as pool:
+            pending = deque()
+            for first, contents, metadatas in self._iter_batches(source, skipped):
+                if stop_event is not None and stop_event.is_set():
+                    completed = False
+                    break
+                pending.append((first, contents, metadatas, pool.submit(encode, contents)))
+                if len(pending) >= self.workers:
+                    first, contents, metadatas, future = pending.popleft()
+                    write(first, contents, metadatas, future.result())
+            while pending:
+                first, contents, metadatas, future = pending.popleft()
+                write(first, contents, metadatas, future.result())
+
+        elapsed = time.perf_counter() - started
+        rate = ingested / elapsed if elapsed > 0 else 0.0
+        if completed:
+            checkpoint.save(done, completed=True)
+            logger.info(f"{source} 导入完成: {ingested} 个片段，耗时 {elapsed:.1f} 秒（{rate:.0f} 条/秒）")
+        else:
+            logger.info(f"{source} 导入已停止: 已写入 {done} 个片段，可从检查点继续")
+        return {
+            "source": source,
+            "ingested": ingested,
+            "skipped": skipped,
+            "elapsed": elapsed,
+            "rate": rate,
+            "completed": completed
+        }
@@ -2,14 +2,28 @@
 知识库管理器
 实现基于向量检索的知识存储和检索功能
 """
+import asyncio
+import math
+import threading
+import time
 import uuid
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+import numpy as np
 from core.config import settings
+from core.executor import BoundedExecutor
 from core.logger import logger
+from rag.embedding_cache import EmbeddingCache
+from rag.embedding_service import EmbeddingService
+from rag.encoders import Encoder, create_encoder
+from rag.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from rag.rerank import RerankOptions, mmr_select
+from rag.retention import RetentionPolicy, RetrievalTracker, select_evictions
+from rag.consolidation import cluster_embeddings, summarize_cluster
+from rag.vector_store import VectorStore, create_vector_store, item_timestamp
+
+# 共享知识（如导入的预制知识库）的所属用户，检索记忆时与用户自己的记忆一起参与排序
+SHARED_USER_ID = "__shared__"
 
 
 class KnowledgeItem:
@@ -33,31 +47,106 @@ class KnowledgeBase:
     def __init__(self, collection_name: str = "chatbot_knowledge"):
         self.collection_name = collection_name
         
-        # 初始化ChromaDB
-        self.chroma_client = chromadb.PersistentClient(
-            path=settings.chroma_persist_directory,
-            settings=Settings(anonymized_telemetry=False)
+        # 编码和向量库读写都是阻塞操作，统一放到专用的有界线程池中执行
+        self.executor = BoundedExecutor(
+            name="rag",
+            max_workers=settings.rag_executor_workers,
+            max_queue_size=settings.rag_executor_queue_size
         )
         
-        # 初始化句子转换器
-        try:
-            self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info("句子转换器加载成功")
-        except Exception as e:
-            logger.error(f"句子转换器加载失败: {e}")
-            # 使用备用模型
-            self.encoder = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+        # 句向量编码器和向量存储在首次使用时加载（或由 ainitialize 并行预加载），
+        # 构造知识库本身不做任何耗时操作
+        self._encoder: Optional[Encoder] = None
+        self._vector_store: Optional[VectorStore] = None
+        self._encoder_lock = threading.Lock()
+        self._vector_store_lock = threading.Lock()
         
-        # 获取或创建集合
-        try:
-            self.collection = self.chroma_client.get_collection(collection_name)
-            logger.info(f"加载现有知识库集合: {collection_name}")
-        except:
-            self.collection = self.chroma_client.create_collection(
-                name=collection_name,
-                metadata={"description": "Chatbot knowledge base"}
-            )
-            logger.info(f"创建新知识库集合: {collection_name}")
+        # 检索和写入共用的向量缓存，同一文本只编码一次（命名空间在编码器加载后更新为实际模型名）
+        self.embedding_cache = EmbeddingCache(
+            namespace=settings.encoder_model_name,
+            max_bytes=int(settings.embedding_cache_max_mb * 1024 * 1024)
+        )
+        
+        # 异步接口的编码请求在这里跨请求合并成批
+        self.embedding_service = EmbeddingService(
+            encode_fn=lambda texts: self.encoder.encode(texts),
+            executor=self.executor,
+            cache=self.embedding_cache,
+            max_batch_size=settings.embedding_batch_size,
+            max_wait=settings.embedding_batch_max_wait
+        )
+        
+        # 词法索引（中文二元组 BM25），与向量检索结果融合
+        self.lexical_index = LexicalIndex(max_users=settings.lexical_index_max_users)
+        self._hybrid_searches = 0
+        self._lexical_timeouts = 0
+        
+        # 条目最近被检索的时间，供保留策略按最久未使用淘汰
+        self.retrieval_tracker = RetrievalTracker(settings.retention_tracker_size)
+    
+    @property
+    def encoder(self) -> Encoder:
+        """句向量编码器（后端由配置决定），首次访问时加载"""
+        if self._encoder is None:
+            with self._encoder_lock:
+                if self._encoder is None:
+                    started = time.perf_counter()
+                    encoder = create_encoder()
+                    self.embedding_cache.namespace = encoder.name
+                    self._encoder = encoder
+                    logger.info(f"句向量编码器 {encoder.name} 加载完成，耗时 {time.perf_counter() - started:.2f} 秒")
+        return self._encoder
+    
+    @property
+    def encoder_name(self) -> str:
+        return self.encoder.name
+    
+    @property
+    def vector_store(self) -> VectorStore:
+        """向量存储（后端由配置决定），首次访问时打开"""
+        if self._vector_store is None:
+            with self._vector_store_lock:
+                if self._vector_store is None:
+                    started = time.perf_counter()
+                    self._vector_store = create_vector_store(self.collection_name)
+                    logger.info(f"向量存储打开完成，耗时 {time.perf_counter() - started:.2f} 秒")
+        return self._vector_store
+    
+    @property
+    def initialized(self) -> bool:
+        return self._encoder is not None and self._vector_store is not None
+    
+    def prewarm(self):
+        """执行一次编码，使模型权重和计算图在首个真实请求之前就绪"""
+        started = time.perf_counter()
+        self.encoder.encode(["预热"])
+        logger.info(f"编码器预热完成，耗时 {time.perf_counter() - started:.2f} 秒")
+    
+    async def ainitialize(self, prewarm: bool = False):
+        """
+        并行加载编码器和打开向量存储
+        
+        Args:
+            prewarm: 加载完成后是否执行一次预热编码
+        """
+        await asyncio.gather(
+            asyncio.to_thread(lambda: self.encoder),
+            asyncio.to_thread(lambda: self.vector_store)
+        )
+        if prewarm:
+            await asyncio.to_thread(self.prewarm)
+    
+    def _encode(self, texts: List[str]):
+        """
+        生成文本向量，优先使用缓存，未命中的文本一次性批量编码
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            np.ndarray: 向量矩阵
+        """
+        return self.embedding_cache.encode(texts, self.encoder.encode)
     
     def add_knowledge(
         self, 
@@ -78,35 +167,85 @@ class KnowledgeBase:
         Returns:
             str: 知识项目ID
         """
+        return self.add_knowledge_batch(
+            contents=[content],
+            metadatas=[metadata],
+            user_id=user_id,
+            session_id=session_id
+        )[0]
+    
+    def add_knowledge_batch(
+        self, 
+        contents: List[str], 
+        metadatas: List[Dict[str, Any]] = None,
+        user_id: str = None,
+        session_id: str = None,
+        embeddings: List[List[float]] = None,
+        ids: List[str] = None
+    ) -> List[str]:
+        """
+        批量添加知识到知识库
+        
+        所有文本在一次编码器前向计算中生成向量，并通过一次集合写入保存。
+        
+        Args:
+            contents: 知识内容列表
+            metadatas: 与内容一一对应的元数据列表
+            user_id: 用户ID
+            session_id: 会话ID
+            embeddings: 预先计算好的向量，为 None 时在此编码
+            ids: 指定的条目ID（重复写入同一ID不会产生重复条目），为 None 时自动生成
+            
+        Returns:
+            List[str]: 知识项目ID列表
+        """
+        if not contents:
+            return []
+        
+        metadatas = metadatas or [None] * len(contents)
+        if len(metadatas) != len(contents):
+            raise ValueError("contents 与 metadatas 数量不一致")
+        ids = ids or [None] * len(contents)
+        if len(ids) != len(contents):
+            raise ValueError("contents 与 ids 数量不一致")
+        
         try:
-            # 创建知识项目
-            knowledge_item = KnowledgeItem(content=content, metadata=metadata)
-            
-            # 生成向量嵌入
-            embedding = self.encoder.encode([content])[0].tolist()
-            
-            # 准备元数据
-            item_metadata = {
-                "user_id": user_id,
-                "session_id": session_id,
-                "timestamp": knowledge_item.timestamp.isoformat(),
-                "content_type": "conversation",
-                **(metadata or {})
-            }
+            knowledge_items = [
+                KnowledgeItem(content=content, metadata=metadata, item_id=item_id)
+                for content, metadata, item_id in zip(contents, metadatas, ids)
+            ]
             
-            # 添加到ChromaDB
-            self.collection.add(
-                embeddings=[embedding],
-                documents=[content],
-                metadatas=[item_metadata],
-                ids=[knowledge_item.id]
+            # 一次前向计算生成所有向量
+            if embeddings is None:
+                embeddings = self._encode(contents).tolist()
+            
+            item_metadatas = []
+            for item in knowledge_items:
+                item_metadata = {
+                    "user_id": user_id,
+                    "session_id": session_id,
+                    "timestamp": item.timestamp.isoformat(),
+                    # 数值时间戳用于按时间范围过滤和排序
+                    "timestamp_ts": item.timestamp.timestamp(),
+                    "content_type": "conversation",
+                    **item.metadata
+                }
+                # 向量库的元数据不接受空值
+                item_metadatas.append({k: v for k, v in item_metadata.items() if v is not None})
+            
+            self.vector_store.add(
+                ids=[item.id for item in knowledge_items],
+                embeddings=embeddings,
+                documents=contents,
+                metadatas=item_metadatas
             )
+            self.lexical_index.add([item.id for item in knowledge_items], contents, item_metadatas)
             
-            logger.info(f"添加知识到知识库: {content[:50]}...")
-            return knowledge_item.id
+            logger.info(f"批量添加 {len(contents)} 条知识到知识库")
+            return [item.id for item in knowledge_items]
             
         except Exception as e:
-            logger.error(f"添加知识失败: {e}")
+            logger.error(f"批量添加知识失败: {e}")
             raise
     
     def search_knowledge(
@@ -114,48 +253,47 @@ class KnowledgeBase:
         query: str, 
         n_results: int = 5,
         user_id: str = None,
-        filter_metadata: Dict[str, Any] = None
+        filter_metadata: Dict[str, Any] = None,
+        query_embedding: List[float] = None,
+        rerank: RerankOptions = None,
+        relevant_only: bool = False
     ) -> List[Dict[str, Any]]:
         """
         搜索相关知识
         
+        指定用户且启用混合检索时，向量检索与词法检索的结果按倒数排名融合；
+        启用重排时先过量召回候选，再做 MMR 重排和近似重复抑制。
+        
         Args:
             query: 查询文本
             n_results: 返回结果数量
             user_id: 用户ID（用于过滤）
             filter_metadata: 过滤条件
+            query_embedding: 预先计算好的查询向量，为 None 时在此编码
+            rerank: 重排参数，为 None 时使用配置中的默认值
+            relevant_only: 是否在重排前过滤掉不相关的候选（见 _filter_relevant）
             
         Returns:
             List[Dict[str, Any]]: 搜索结果列表
         """
+        options = rerank or RerankOptions()
         try:
             # 生成查询向量
-            query_embedding = self.encoder.encode([query])[0].tolist()
-            
-            # 构建过滤条件
-            where_clause = {}
-            if user_id:
-                where_clause["user_id"] = user_id
-            if filter_metadata:
-                where_clause.update(filter_metadata)
-            
-            # 执行搜索
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=where_clause if where_clause else None,
-                include=["documents", "metadatas", "distances"]
-            )
+            if query_embedding is None:
+                query_embedding = self._encode([query])[0].tolist()
             
-            # 格式化结果
-            formatted_results = []
-            if results["documents"] and results["documents"][0]:
-                for i, doc in enumerate(results["documents"][0]):
-                    formatted_results.append({
-                        "content": doc,
-                        "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                        "similarity": 1 - results["distances"][0][i] if results["distances"] else 0.0
-                    })
+            n_candidates = self._candidate_count(n_results, options, user_id)
+            candidates = self._vector_search(
+                query, n_candidates, user_id, filter_metadata, query_embedding,
+                include_embeddings=options.enabled
+            )
+            if self._hybrid_enabled(user_id):
+                candidates = self._fuse(
+                    candidates,
+                    self._lexical_search(query, n_candidates, user_id, filter_metadata),
+                    n_candidates
+                )
+            formatted_results = self._finalize(candidates, query_embedding, n_results, options, relevant_only)
             
             logger.info(f"知识搜索完成，找到 {len(formatted_results)} 个相关结果")
             return formatted_results
@@ -164,6 +302,130 @@ class KnowledgeBase:
             logger.error(f"知识搜索失败: {e}")
             return []
     
+    def _vector_search(
+        self,
+        query: str,
+        n_results: int,
+        user_id: str = None,
+        filter_metadata: Dict[str, Any] = None,
+        query_embedding: List[float] = None,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        """向量检索，include_embeddings 为真时结果附带条目向量供重排使用"""
+        # 生成查询向量
+        if query_embedding is None:
+            query_embedding = self._encode([query])[0].tolist()
+        
+        # 构建过滤条件
+        where_clause = {}
+        if user_id:
+            where_clause["user_id"] = user_id
+        if filter_metadata:
+            where_clause.update(filter_metadata)
+        
+        # 执行搜索
+        results = self.vector_store.query(
+            embedding=query_embedding,
+            n_results=n_results,
+            where=where_clause if where_clause else None,
+            include_embeddings=include_embeddings
+        )
+        
+        # 格式化结果
+        formatted_results = []
+        for item in results:
+            formatted = {
+                "id": item["id"],
+                "content": item["content"],
+                "metadata": item["metadata"] or {},
+                "similarity": 1 - item["distance"]
+            }
+            if include_embeddings:
+                formatted["embedding"] = item.get("embedding")
+            formatted_results.append(formatted)
+        return formatted_results
+    
+    def _lexical_search(
+        self,
+        query: str,
+        n_results: int,
+        user_id: str,
+        filter_metadata: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """词法检索（BM25），用户索引未加载时先从向量存储加载"""
+        self.lexical_index.ensure_loaded(
+            user_id,
+            lambda uid: self.vector_store.get(where={"user_id": uid})
+        )
+        return self.lexical_index.search(query, user_id, n_results, filter_metadata)
+    
+    def _hybrid_enabled(self, user_id: str = None) -> bool:
+        # 词法索引按用户分区，只在指定用户时参与检索
+        return settings.hybrid_retrieval_enabled and bool(user_id)
+    
+    def _candidate_count(self, n_results: int, options: RerankOptions, user_id: str = None) -> int:
+        """每一路召回的候选数：重排时按倍数过量召回，混合检索时融合前也多取一些"""
+        n_candidates = n_results * options.fetch_multiplier if options.enabled else n_results
+        if self._hybrid_enabled(user_id):
+            n_candidates = max(n_candidates, n_results * 3, 10)
+        return n_candidates
+    
+    def _finalize(
+        self,
+        candidates: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]],
+        n_results: int,
+        options: RerankOptions,
+        relevant_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        对候选做 MMR 重排和去重（或直接截断），并移除结果中的向量字段
+        
+        relevant_only 为真时先过滤掉不相关的候选，避免 MMR 为了多样性选入不相关的条目、
+        过滤后结果数量不足
+        """
+        if relevant_only:
+            candidates = self._filter_relevant(candidates)
+        if options.enabled and query_embedding is not None and len(candidates) > 1:
+            # 只由词法检索命中的候选没有存储向量，补充编码（通常命中向量缓存）
+            missing = [i for i, item in enumerate(candidates) if item.get("embedding") is None]
+            if missing:
+                vectors = self._encode([candidates[i]["content"] for i in missing])
+                for i, vector in zip(missing, vectors):
+                    candidates[i]["embedding"] = vector
+            
+            order = mmr_select(
+                np.asarray(query_embedding, dtype=np.float32),
+                np.stack([item["embedding"] for item in candidates]),
+                n_results,
+                lambda_mult=options.lambda_mult,
+                dedup_threshold=options.dedup_threshold
+            )
+            candidates = [candidates[i] for i in order]
+        else:
+            candidates = candidates[:n_results]
+        
+        for item in candidates:
+            item.pop("embedding", None)
+        self.retrieval_tracker.touch([item["id"] for item in candidates])
+        return candidates
+    
+    @staticmethod
+    def _fuse(
+        vector_results: List[Dict[str, Any]],
+        lexical_results: List[Dict[str, Any]],
+        n_results: int
+    ) -> List[Dict[str, Any]]:
+        """融合两路结果；只由词法检索命中的条目没有向量相似度"""
+        fused = reciprocal_rank_fusion(
+            [vector_results, lexical_results],
+            n_results=n_results,
+            k=settings.hybrid_rrf_k
+        )
+        for item in fused:
+            item.setdefault("similarity", None)
+        return fused
+    
     def get_conversation_context(
         self, 
         user_id: str, 
@@ -186,26 +448,17 @@ class KnowledgeBase:
             if session_id:
                 where_clause["session_id"] = session_id
             
-            # 获取最近的对话记录
-            results = self.collection.query(
-                query_embeddings=None,
-                n_results=limit,
-                where=where_clause,
-                include=["documents", "metadatas"]
-            )
+            # 按时间倒序获取最近的对话记录（不经过向量检索）
+            results = self.vector_store.get_recent(where=where_clause, limit=limit)
             
             context = []
-            if results["documents"] and results["documents"][0]:
-                for i, doc in enumerate(results["documents"][0]):
-                    metadata = results["metadatas"][0][i] if results["metadatas"] else {}
-                    context.append({
-                        "content": doc,
-                        "timestamp": metadata.get("timestamp"),
-                        "metadata": metadata
-                    })
-            
-            # 按时间排序
-            context.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+            for item in results:
+                metadata = item["metadata"] or {}
+                context.append({
+                    "content": item["content"],
+                    "timestamp": metadata.get("timestamp"),
+                    "metadata": metadata
+                })
             
             return context
             
@@ -219,7 +472,8 @@ class KnowledgeBase:
         assistant_response: str,
         user_id: str,
         session_id: str,
-        emotion_info: Dict[str, Any] = None
+        emotion_info: Dict[str, Any] = None,
+        embeddings: List[List[float]] = None
     ) -> Tuple[str, str]:
         """
         添加对话轮次到知识库
@@ -230,35 +484,29 @@ class KnowledgeBase:
             user_id: 用户ID
             session_id: 会话ID
             emotion_info: 情感信息
+            embeddings: 预先计算好的两条消息的向量
             
         Returns:
             Tuple[str, str]: 用户消息ID和助手回复ID
         """
         try:
-            # 添加用户消息
             user_metadata = {
                 "role": "user",
                 "emotion": emotion_info.get("emotion") if emotion_info else None,
                 "emotion_confidence": emotion_info.get("confidence") if emotion_info else None
             }
             
-            user_id_result = self.add_knowledge(
-                content=user_message,
-                metadata=user_metadata,
-                user_id=user_id,
-                session_id=session_id
-            )
-            
-            # 添加助手回复
             assistant_metadata = {
                 "role": "assistant"
             }
             
-            assistant_id_result = self.add_knowledge(
-                content=assistant_response,
-                metadata=assistant_metadata,
+            # 用户消息和助手回复一次编码、一次写入
+            user_id_result, assistant_id_result = self.add_knowledge_batch(
+                contents=[user_message, assistant_response],
+                metadatas=[user_metadata, assistant_metadata],
                 user_id=user_id,
-                session_id=session_id
+                session_id=session_id,
+                embeddings=embeddings
             )
             
             logger.info(f"对话轮次已添加到知识库")
@@ -272,7 +520,9 @@ class KnowledgeBase:
         self,
         current_message: str,
         user_id: str,
-        n_results: int = 3
+        n_results: int = 3,
+        query_embedding: List[float] = None,
+        rerank: RerankOptions = None
     ) -> List[Dict[str, Any]]:
         """
         获取与当前消息相关的记忆
@@ -281,23 +531,29 @@ class KnowledgeBase:
             current_message: 当前消息
             user_id: 用户ID
             n_results: 返回结果数量
+            query_embedding: 预先计算好的查询向量
+            rerank: 重排参数
             
         Returns:
             List[Dict[str, Any]]: 相关记忆列表
         """
         try:
-            # 搜索相关的历史对话
-            relevant_memories = self.search_knowledge(
+            # 搜索相关的历史对话（重排前先过滤掉不相关的候选）
+            filtered_memories = self.search_knowledge(
                 query=current_message,
                 n_results=n_results,
-                user_id=user_id
+                user_id=user_id,
+                query_embedding=query_embedding,
+                rerank=rerank,
+                relevant_only=True
             )
             
-            # 过滤掉相似度太低的结果
-            filtered_memories = [
-                memory for memory in relevant_memories 
-                if memory["similarity"] > 0.3
-            ]
+            if self._shared_enabled(user_id):
+                filtered_memories = self._merge_shared(
+                    filtered_memories,
+                    self._vector_search(current_message, n_results, SHARED_USER_ID, query_embedding=query_embedding),
+                    n_results
+                )
             
             logger.info(f"找到 {len(filtered_memories)} 个相关记忆")
             return filtered_memories
@@ -306,6 +562,135 @@ class KnowledgeBase:
             logger.error(f"获取相关记忆失败: {e}")
             return []
     
+    def plan_consolidation(
+        self,
+        user_id: str,
+        session_id: str,
+        older_than: float,
+        min_items: int = 8,
+        ratio: int = 4
+    ) -> List[Dict[str, Any]]:
+        """
+        规划会话中较早对话的整合：按向量聚类，每个簇生成一条摘要（不写入、不删除）
+        
+        以前生成的摘要同样参与聚类，与相近的对话或摘要再次合并，会话的条目数因此保持有界
+        
+        Args:
+            user_id: 用户ID
+            session_id: 会话ID
+            older_than: 只整合该时间戳（秒）之前的条目
+            min_items: 条目数少于该值时不整合
+            ratio: 平均每个簇包含的条目数，簇数量 = ceil(条目数 / ratio)
+            
+        Returns:
+            List[Dict[str, Any]]: 摘要信息，附带摘要向量 embedding 和被替换的条目 source_ids，
+                由 apply_consolidation 写入
+        """
+        items = self.vector_store.get(
+            where={"user_id": user_id, "session_id": session_id},
+            include_embeddings=True
+        )
+        items = [item for item in items if item_timestamp(item["metadata"]) < older_than]
+        if len(items) < min_items:
+            return []
+        
+        embeddings = np.stack([item["embedding"] for item in items])
+        labels = cluster_embeddings(embeddings, math.ceil(len(items) / max(1, ratio)))
+        
+        summaries = []
+        for cluster in np.unique(labels):
+            rows = np.flatnonzero(labels == cluster)
+            # 单条目的簇无需整合
+            if len(rows) < 2:
+                continue
+            cluster_items = [items[row] for row in rows]
+            summary = summarize_cluster(cluster_items, embeddings[rows])
+            summary["source_ids"] = [item["id"] for item in cluster_items]
+            summaries.append(summary)
+        return summaries
+    
+    def apply_consolidation(self, user_id: str, session_id: str, summary: Dict[str, Any]) -> str:
+        """
+        写入 plan_consolidation 生成的一条摘要，并删除簇内原始条目
+        
+        Args:
+            user_id: 用户ID
+            session_id: 会话ID
+            summary: plan_consolidation 返回的摘要
+            
+        Returns:
+            str: 摘要条目的ID
+        """
+        metadata = {
+            "role": "summary",
+            "content_type": "summary",
+            "importance_score": summary["importance_score"],
+            "source_count": summary["source_count"],
+            "emotion": summary["emotional_tone"],
+            "key_topics": ",".join(summary["key_topics"])
+        }
+        # 摘要沿用簇内最新条目的时间，保持时间顺序
+        if summary["timestamp_ts"] is not None:
+            metadata["timestamp_ts"] = summary["timestamp_ts"]
+            metadata["timestamp"] = datetime.fromtimestamp(summary["timestamp_ts"]).isoformat()
+        
+        # 先写入摘要再删除原始条目，中途失败不会丢失记忆
+        summary_id = self.add_knowledge_batch(
+            contents=[summary["summary_text"]],
+            metadatas=[metadata],
+            user_id=user_id,
+            session_id=session_id,
+            embeddings=[np.asarray(summary["embedding"]).tolist()]
+        )[0]
+        source_ids = summary["source_ids"]
+        self.vector_store.delete(ids=source_ids, where={"user_id": user_id})
+        self.lexical_index.remove(source_ids)
+        
+        logger.info(f"会话 {session_id} 记忆整合: {summary['source_count']} 条对话 -> 摘要 {summary_id}")
+        return summary_id
+    
+    @staticmethod
+    def _filter_relevant(memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        过滤掉不相关的结果：保留向量相似度高于 0.3 的条目，
+        以及命中查询词项比例不低于 HYBRID_MIN_TERM_COVERAGE 的词法检索条目
+        """
+        return [
+            memory for memory in memories
+            if (memory.get("similarity") is not None and memory["similarity"] > 0.3)
+            or memory.get("term_coverage", 0.0) >= settings.hybrid_min_term_coverage
+        ]
+    
+    @staticmethod
+    def _shared_enabled(user_id: str) -> bool:
+        return settings.shared_knowledge_enabled and user_id != SHARED_USER_ID
+    
+    @classmethod
+    def _merge_shared(
+        cls,
+        memories: List[Dict[str, Any]],
+        shared: List[Dict[str, Any]],
+        n_results: int
+    ) -> List[Dict[str, Any]]:
+        """
+        把共享知识的向量检索结果并入用户记忆：过滤掉不相关的条目后按排名做倒数排名融合，取前 n_results 条
+        
+        两路结果的得分不可比（用户记忆已按 MMR 或混合检索排名排序，只由词法检索命中的条目没有相似度），
+        按各自的名次合并可以保留两路内部的顺序
+        
+        Args:
+            memories: 已过滤并排好序的用户记忆
+            shared: 共享知识的向量检索结果
+            n_results: 返回结果数量
+            
+        Returns:
+            List[Dict[str, Any]]: 合并后的相关记忆
+        """
+        shared = cls._filter_relevant(shared)
+        if not shared:
+            return memories
+        return reciprocal_rank_fusion([memories, shared], n_results=n_results, k=settings.hybrid_rrf_k)
+    
     def summarize_session(
         self,
         user_id: str,
@@ -360,7 +745,9 @@ class KnowledgeBase:
             bool: 是否成功
         """
         try:
-            self.collection.delete(ids=[knowledge_id])
+            self.vector_store.delete(ids=[knowledge_id])
+            self.lexical_index.remove([knowledge_id])
+            self.retrieval_tracker.forget([knowledge_id])
             logger.info(f"删除知识项目: {knowledge_id}")
             return True
             
@@ -368,6 +755,65 @@ class KnowledgeBase:
             logger.error(f"删除知识项目失败: {e}")
             return False
     
+    def apply_retention(
+        self,
+        user_id: str,
+        policy: RetentionPolicy = None,
+        batch_size: int = None,
+        max_deletes: int = None
+    ) -> int:
+        """
+        对一个用户执行保留策略：删除过期条目，并把条目数量压到上限以内
+        
+        Args:
+            user_id: 用户ID
+            policy: 保留策略，默认读取配置
+            batch_size: 每批删除的条目数
+            max_deletes: 本次最多删除的条目数，剩余的留到下次
+            
+        Returns:
+            int: 删除的条目数
+        """
+        policy = policy or RetentionPolicy()
+        if not policy.active:
+            return 0
+        batch_size = batch_size or settings.retention_delete_batch_size
+        
+        items = self.vector_store.get(where={"user_id": user_id})
+        evicted = select_evictions(items, policy, self.retrieval_tracker)
+        if max_deletes is not None:
+            evicted = evicted[:max_deletes]
+        
+        for start in range(0, len(evicted), batch_size):
+            batch = evicted[start:start + batch_size]
+            self.vector_store.delete(ids=batch, where={"user_id": user_id})
+            self.lexical_index.remove(batch)
+            self.retrieval_tracker.forget(batch)
+        
+        if evicted:
+            logger.info(f"用户 {user_id} 保留策略淘汰 {len(evicted)} 条知识（共 {len(items)} 条）")
+        return len(evicted)
+    
+    def list_user_ids(self, after: str = "", limit: int = 100) -> List[str]:
+        """
+        按用户ID顺序分页列出在知识库中存有条目的用户（不含共享知识）
+        
+        Args:
+            after: 从该用户ID之后开始
+            limit: 返回数量上限
+            
+        Returns:
+            List[str]: 用户ID列表
+        """
+        # 多取一个，共享知识的用户ID落在本页时仍能返回 limit 个
+        user_ids = self.vector_store.list_user_ids(after, limit + 1)
+        return [user_id for user_id in user_ids if user_id != SHARED_USER_ID][:limit]
+    
+    @property
+    def lists_users_cheaply(self) -> bool:
+        """向量存储能否不扫描条目就列出用户（按用户分区的后端）"""
+        return self.vector_store.lists_users_cheaply
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """
         获取知识库统计信息
@@ -376,12 +822,266 @@ class KnowledgeBase:
             Dict[str, Any]: 统计信息
         """
         try:
-            count = self.collection.count()
+            count = self.vector_store.count()
             return {
                 "total_items": count,
-                "collection_name": self.collection_name
+                "collection_name": self.collection_name,
+                "vector_store": self.vector_store.get_stats(),
+                "executor": self.executor.get_stats(),
+                "embedding_cache": self.embedding_cache.get_stats(),
+                "embedding_batcher": self.embedding_service.get_stats(),
+                "lexical_index": self.lexical_index.get_stats(),
+                "hybrid_retrieval": self._get_hybrid_stats()
             }
             
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
-            return {"total_items": 0, "collection_name": self.collection_name} 
\ No newline at end of file
+            return {
+                "total_items": 0,
+                "collection_name": self.collection_name,
+                "executor": self.executor.get_stats(),
+                "embedding_cache": self.embedding_cache.get_stats(),
+                "embedding_batcher": self.embedding_service.get_stats(),
+                "lexical_index": self.lexical_index.get_stats(),
+                "hybrid_retrieval": self._get_hybrid_stats()
+            }
+    
+    def _get_hybrid_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.hybrid_retrieval_enabled,
+            "latency_budget_ms": settings.hybrid_latency_budget_ms,
+            "searches": self._hybrid_searches,
+            "lexical_timeouts": self._lexical_timeouts
+        }
+    
+    # ===== 异步接口：编码经微批服务合并，向量库操作在专用执行器中运行 =====
+    
+    async def _aembed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """通过微批编码服务生成向量，失败时返回 None，由同步方法自行编码"""
+        try:
+            return (await self.embedding_service.embed(texts)).tolist()
+        except Exception as e:
+            logger.error(f"批量编码失败，回退为单独编码: {e}")
+            return None
+    
+    async def aadd_knowledge(
+        self, 
+        content: str, 
+        metadata: Dict[str, Any] = None,
+        user_id: str = None,
+        session_id: str = None
+    ) -> str:
+        """add_knowledge 的异步版本"""
+        return (await self.aadd_knowledge_batch([content], [metadata], user_id, session_id))[0]
+    
+    async def aadd_knowledge_batch(
+        self, 
+        contents: List[str], 
+        metadatas: List[Dict[str, Any]] = None,
+        user_id: str = None,
+        session_id: str = None
+    ) -> List[str]:
+        """add_knowledge_batch 的异步版本"""
+        embeddings = await self._aembed(contents) if contents else None
+        return await self.executor.run(
+            self.add_knowledge_batch, contents, metadatas, user_id, session_id, embeddings
+        )
+    
+    async def asearch_knowledge(
+        self, 
+        query: str, 
+        n_results: int = 5,
+        user_id: str = None,
+        filter_metadata: Dict[str, Any] = None,
+        rerank: RerankOptions = None,
+        relevant_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        search_knowledge 的异步版本
+        
+        混合检索时向量和词法两路并发执行。向量检索是主路，总是等待其完成；
+        词法检索受 HYBRID_LATENCY_BUDGET_MS 约束（从检索开始计时），向量检索结束且超出预算时
+        不再等待词法检索，其结果不参与融合。向量检索失败时只使用词法检索的结果。
+        两路都在执行器中运行，超时的一路不会被取消，执行完后结果丢弃（用户索引加载仍会生效）。
+        """
+        if not self._hybrid_enabled(user_id):
+            embeddings = await self._aembed([query])
+            return await self.executor.run(
+                self.search_knowledge, query, n_results, user_id, filter_metadata,
+                embeddings[0] if embeddings else None, rerank, relevant_only
+            )
+        
+        try:
+            results = await self._ahybrid_search(
+                query, n_results, user_id, filter_metadata, rerank or RerankOptions(), relevant_only
+            )
+            logger.info(f"知识搜索完成，找到 {len(results)} 个相关结果")
+            return results
+        except Exception as e:
+            logger.error(f"知识搜索失败: {e}")
+            return []
+    
+    async def _ahybrid_search(
+        self,
+        query: str,
+        n_results: int,
+        user_id: str,
+        filter_metadata: Dict[str, Any],
+        options: RerankOptions,
+        relevant_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        n_candidates = self._candidate_count(n_results, options, user_id)
+        
+        async def vector_leg():
+            embeddings = await self._aembed([query])
+            if embeddings:
+                query_embedding = embeddings[0]
+            else:
+                query_embedding = (await self.executor.run(self._encode, [query]))[0].tolist()
+            results = await self.executor.run(
+                self._vector_search, query, n_candidates, user_id, filter_metadata,
+                query_embedding, options.enabled
+            )
+            return query_embedding, results
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.hybrid_latency_budget_ms / 1000
+        vector_task = asyncio.create_task(vector_leg())
+        lexical_task = asyncio.create_task(
+            self.executor.run(self._lexical_search, query, n_candidates, user_id, filter_metadata)
+        )
+        self._hybrid_searches += 1
+        
+        # 不取消任何一路（取消执行器中的任务不会停止工作线程）；asyncio.wait 超时或被取消时也不会取消任务
+        await asyncio.wait({vector_task})
+        vector_failed = vector_task.exception() is not None
+        if not lexical_task.done():
+            # 向量检索失败时词法检索是唯一结果来源，不受预算限制
+            timeout = None if vector_failed else max(0.0, deadline - loop.time())
+            await asyncio.wait({lexical_task}, timeout=timeout)
+        if not lexical_task.done():
+            self._lexical_timeouts += 1
+            # 超出预算的词法检索在后台完成，取走结果避免未获取异常的警告
+            lexical_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        
+        def leg_results(task: asyncio.Task, name: str, empty: Any) -> Any:
+            if not task.done():
+                return empty
+            if task.exception() is not None:
+                logger.error(f"{name}检索失败: {task.exception()}")
+                return empty
+            return task.result()
+        
+        query_embedding, vector_results = leg_results(vector_task, "向量", (None, []))
+        fused = self._fuse(vector_results, leg_results(lexical_task, "词法", []), n_candidates)
+        # 没有查询向量（向量检索超时或失败）时不做重排，直接截断
+        return await self.executor.run(self._finalize, fused, query_embedding, n_results, options, relevant_only)
+    
+    async def aadd_conversation_turn(
+        self,
+        user_message: str,
+        assistant_response: str,
+        user_id: str,
+        session_id: str,
+        emotion_info: Dict[str, Any] = None
+    ) -> Tuple[str, str]:
+        """add_conversation_turn 的异步版本"""
+        embeddings = await self._aembed([user_message, assistant_response])
+        return await self.executor.run(
+            self.add_conversation_turn,
+            user_message, assistant_response, user_id, session_id, emotion_info, embeddings
+        )
+    
+    async def aget_relevant_memories(
+        self,
+        current_message: str,
+        user_id: str,
+        n_results: int = 3,
+        rerank: RerankOptions = None
+    ) -> List[Dict[str, Any]]:
+        """get_relevant_memories 的异步版本（用户记忆和共享知识并发检索）"""
+        async def shared_leg() -> List[Dict[str, Any]]:
+            if not self._shared_enabled(user_id):
+                return []
+            try:
+                embeddings = await self._aembed([current_message])
+                return await self.executor.run(
+                    self._vector_search, current_message, n_results, SHARED_USER_ID, None,
+                    embeddings[0] if embeddings else None
+                )
+            except Exception as e:
+                logger.error(f"共享知识检索失败: {e}")
+                return []
+        
+        relevant_memories, shared = await asyncio.gather(
+            self.asearch_knowledge(
+                query=current_message,
+                n_results=n_results,
+                user_id=user_id,
+                rerank=rerank,
+                relevant_only=True
+            ),
+            shared_leg()
+        )
+        filtered_memories = self._merge_shared(relevant_memories, shared, n_results)
+        logger.info(f"找到 {len(filtered_memories)} 个相关记忆")
+        return filtered_memories
+    
+    async def aget_conversation_context(
+        self,
+        user_id: str,
+        session_id: str = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """get_conversation_context 的异步版本"""
+        return await self.executor.run(self.get_conversation_context, user_id, session_id, limit)
+    
+    async def aplan_consolidation(
+        self,
+        user_id: str,
+        session_id: str,
+        older_than: float,
+        min_items: int = 8,
+        ratio: int = 4
+    ) -> List[Dict[str, Any]]:
+        """plan_consolidation 的异步版本"""
+        return await self.executor.run(
+            self.plan_consolidation, user_id, session_id, older_than, min_items, ratio
+        )
+    
+    async def aapply_consolidation(self, user_id: str, session_id: str, summary: Dict[str, Any]) -> str:
+        """apply_consolidation 的异步版本"""
+        return await self.executor.run(self.apply_consolidation, user_id, session_id, summary)
+    
+    async def aapply_retention(
+        self,
+        user_id: str,
+        policy: RetentionPolicy = None,
+        batch_size: int = None,
+        max_deletes: int = None
+    ) -> int:
+        """apply_retention 的异步版本"""
+        return await self.executor.run(self.apply_retention, user_id, policy, batch_size, max_deletes)
+    
+    async def alist_user_ids(self, after: str = "", limit: int = 100) -> List[str]:
+        """list_user_ids 的异步版本"""
+        return await self.executor.run(self.list_user_ids, after, limit)
+    
+    async def asummarize_session(self, user_id: str, session_id: str) -> Optional[str]:
+        """summarize_session 的异步版本"""
+        return await self.executor.run(self.summarize_session, user_id, session_id)
+    
+    async def aget_collection_stats(self) -> Dict[str, Any]:
+        """get_collection_stats 的异步版本"""
+        return await self.executor.run(self.get_collection_stats)
+    
+    async def stop(self):
+        """停止编码批处理任务"""
+        await self.embedding_service.stop()
+    
+    def close(self):
+        """关闭执行器和向量存储"""
+        self.executor.shutdown(wait=True)
+        if self._vector_store is not None:
+            self._vector_store.close()
+        logger.info("知识库已关闭") 
\ No newline at end of file
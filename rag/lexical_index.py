@@ -0,0 +1,278 @@
+"""
+词法索引
+基于中文字符二元组（英文按单词）的 BM25 倒排索引，按用户分区并随写入增量更新，
+用于弥补英文句向量模型对中文专有名词等精确匹配的不足
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from core.logger import logger
+
+_CJK_RUN = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：中文连续片段切分为字符二元组（单字片段保留单字），英文和数字按单词切分
+
+    Args:
+        text: 文本
+
+    Returns:
+        List[str]: 词项列表
+    """
+    text = text.lower()
+    tokens = []
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(_WORD.findall(text))
+    return tokens
+
+
+class _UserIndex:
+    """单个用户的倒排索引"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_lengths: List[int] = []
+        self.contents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.row_of: Dict[str, int] = {}
+        self.total_length = 0
+        self.live_docs = 0
+
+    def add(self, item_id: str, content: str, metadata: Dict[str, Any]):
+        if item_id in self.row_of:
+            return
+        row = len(self.doc_ids)
+        terms = Counter(tokenize(content))
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[row] = tf
+        length = sum(terms.values())
+
+        self.row_of[item_id] = row
+        self.doc_ids.append(item_id)
+        self.doc_lengths.append(length)
+        self.contents.append(content)
+        self.metadatas.append(metadata or {})
+        self.total_length += length
+        self.live_docs += 1
+
+    def remove(self, item_id: str) -> bool:
+        row = self.row_of.pop(item_id, None)
+        if row is None:
+            return False
+        for term in set(tokenize(self.contents[row])):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(row, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths[row]
+        self.live_docs -= 1
+        # 行号保持不变，只清除内容
+        self.doc_ids[row] = None
+        self.contents[row] = ""
+        return True
+
+    def search(
+        self,
+        query: str,
+        n_results: int,
+        where: Dict[str, Any] = None,
+        k1: float = 1.5,
+        b: float = 0.75
+    ) -> List[Dict[str, Any]]:
+        if not self.live_docs:
+            return []
+
+        avg_length = self.total_length / self.live_docs
+        query_terms = set(tokenize(query))
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for term in query_terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (self.live_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, tf in postings.items():
+                norm = tf + k1 * (1 - b + b * self.doc_lengths[row] / avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (k1 + 1) / norm
+                matched[row] = matched.get(row, 0) + 1
+
+        if where:
+            scores = {
+                row: score for row, score in scores.items()
+                if all(self.metadatas[row].get(key) == value for key, value in where.items())
+            }
+
+        top = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:n_results]
+        return [
+            {
+                "id": self.doc_ids[row],
+                "content": self.contents[row],
+                "metadata": self.metadatas[row],
+                "bm25": score,
+                # 命中的查询词项比例：只命中"今天"之类个别常见二元组的条目比例很低
+                "term_coverage": matched[row] / len(query_terms)
+            }
+            for row, score in top
+        ]
+
+
+class LexicalIndex:
+    """按用户分区的 BM25 索引
+
+    用户索引在首次检索时从向量存储加载，之后随写入增量更新；
+    内存中最多保留 max_users 个用户的索引，超出后淘汰最久未使用的用户。
+    """
+
+    def __init__(self, max_users: int = 1000):
+        self.max_users = max(1, max_users)
+        self._users: "OrderedDict[str, _UserIndex]" = OrderedDict()
+        # 正在加载的用户：加载期间的增量写入先暂存，加载完成后补入
+        self._loading: Dict[str, List[tuple]] = {}
+        self._lock = threading.RLock()
+
+        # 运行指标
+        self._loads = 0
+        self._evictions = 0
+
+    def ensure_loaded(self, user_id: str, loader: Callable[[str], List[Dict[str, Any]]]):
+        """
+        确保用户索引已加载
+
+        Args:
+            user_id: 用户ID
+            loader: 读取该用户全部条目的函数，返回包含 id、content、metadata 的字典列表
+        """
+        with self._lock:
+            if user_id in self._users:
+                self._users.move_to_end(user_id)
+                return
+            self._loading.setdefault(user_id, [])
+
+        # 加载在锁外进行，避免阻塞其他用户的检索
+        try:
+            items = loader(user_id)
+        except Exception:
+            with self._lock:
+                self._loading.pop(user_id, None)
+            raise
+        index = _UserIndex()
+        for item in items:
+            index.add(item["id"], item["content"], item["metadata"])
+
+        with self._lock:
+            for pending in self._loading.pop(user_id, []):
+                index.add(*pending)
+            if user_id in self._users:
+                # 其他线程已完成加载，合并即可
+                existing = self._users[user_id]
+                for item in items:
+                    existing.add(item["id"], item["content"], item["metadata"])
+                return
+            self._users[user_id] = index
+            self._loads += 1
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._evictions += 1
+        logger.debug(f"词法索引已加载用户 {user_id}: {len(items)} 条")
+
+    def add(self, ids: List[str], contents: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        增量写入：只更新已加载的用户索引，未加载的用户在首次检索时会从存储中读到这些条目
+
+        Args:
+            ids: 条目ID列表
+            contents: 文本列表
+            metadatas: 元数据列表（按其中的 user_id 分区）
+        """
+        with self._lock:
+            for item_id, content, metadata in zip(ids, contents, metadatas):
+                user_id = (metadata or {}).get("user_id")
+                index = self._users.get(user_id)
+                if index is not None:
+                    index.add(item_id, content, metadata)
+                elif user_id in self._loading:
+                    self._loading[user_id].append((item_id, content, metadata))
+
+    def remove(self, ids: List[str]):
+        """从已加载的索引中删除条目"""
+        with self._lock:
+            for item_id in ids:
+                for index in self._users.values():
+                    if index.remove(item_id):
+                        break
+
+    def search(self, query: str, user_id: str, n_results: int, where: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        检索用户的条目
+
+        Args:
+            query: 查询文本
+            user_id: 用户ID
+            n_results: 返回结果数量
+            where: 额外的元数据等值过滤条件
+
+        Returns:
+            List[Dict[str, Any]]: 按 BM25 得分降序排列的结果，未加载的用户返回空列表
+        """
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                return []
+            return index.search(query, n_results, where)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计信息
+
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        with self._lock:
+            return {
+                "users_loaded": len(self._users),
+                "max_users": self.max_users,
+                "documents": sum(index.live_docs for index in self._users.values()),
+                "terms": sum(len(index.postings) for index in self._users.values()),
+                "loads": self._loads,
+                "evictions": self._evictions
+            }
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict[str, Any]]],
+    n_results: int,
+    k: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    倒数排名融合（RRF）：score = Σ 1 / (k + rank)
+
+    Args:
+        result_lists: 多路检索结果，每路按相关度降序排列，条目以 id 对齐
+        n_results: 返回结果数量
+        k: 平滑常数
+
+    Returns:
+        List[Dict[str, Any]]: 融合后的结果，同一条目的各路字段合并，并附带 score
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            entry = merged.setdefault(item["id"], {"score": 0.0})
+            for key, value in item.items():
+                entry.setdefault(key, value)
+            entry["score"] += 1.0 / (k + rank)
+
+    fused = sorted(merged.values(), key=lambda entry: entry["score"], reverse=True)
+    return fused[:n_results]
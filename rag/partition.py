@@ -0,0 +1,172 @@
+"""
+分区向量存储
+按用户（或用户ID哈希分片）把知识拆分到多个集合中，
+单个用户的检索只访问其所在分区，检索延迟只与该用户的记忆规模相关
+"""
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from core.logger import logger
+from rag.vector_store import VectorStore, item_timestamp, page_user_ids
+
+
+class PartitionRouter:
+    """分区路由：根据用户ID确定分区名称"""
+
+    STRATEGIES = ("user", "hash")
+    SHARED = "shared"
+
+    def __init__(self, base_name: str, strategy: str = "user", num_shards: int = 16):
+        """
+        Args:
+            base_name: 基础名称，分区名称以 "{base_name}__" 开头
+            strategy: 分区策略，user 为每个用户一个分区，hash 为按用户ID哈希分到固定数量的分片
+            num_shards: hash 策略下的分片数量
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"未知的分区策略: {strategy}")
+        self.base_name = base_name
+        self.strategy = strategy
+        self.num_shards = max(1, num_shards)
+        self.prefix = f"{base_name}__"
+
+    def route(self, user_id: Optional[str]) -> str:
+        """
+        获取用户所在的分区名称
+
+        Args:
+            user_id: 用户ID，为空时路由到共享分区
+
+        Returns:
+            str: 分区名称（满足 ChromaDB 集合命名规则）
+        """
+        if not user_id:
+            return f"{self.prefix}{self.SHARED}"
+        digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+        if self.strategy == "hash":
+            return f"{self.prefix}s{int(digest, 16) % self.num_shards:03d}"
+        return f"{self.prefix}u{digest[:16]}"
+
+    def is_partition(self, name: str) -> bool:
+        """判断集合名称是否属于本路由的分区"""
+        return name.startswith(self.prefix)
+
+
+class PartitionedVectorStore(VectorStore):
+    """分区向量存储：把读写路由到各分区对应的底层存储
+
+    带 user_id 条件的操作只访问一个分区；不带 user_id 的操作遍历所有分区。
+    """
+
+    def __init__(
+        self,
+        router: PartitionRouter,
+        store_factory: Callable[[str], VectorStore],
+        list_partitions: Callable[[], List[str]]
+    ):
+        """
+        Args:
+            router: 分区路由
+            store_factory: 根据分区名称创建底层存储
+            list_partitions: 列出已存在的分区名称
+        """
+        self.router = router
+        self._store_factory = store_factory
+        self._list_partitions = list_partitions
+        self._stores: Dict[str, VectorStore] = {}
+        self._stores_lock = threading.Lock()
+        # 分区名称 -> 所属用户ID（user 策略下分区的所属用户不会改变）
+        self._owners: Dict[str, str] = {}
+
+    def _store(self, name: str) -> VectorStore:
+        with self._stores_lock:
+            store = self._stores.get(name)
+            if store is None:
+                store = self._store_factory(name)
+                self._stores[name] = store
+            return store
+
+    def _targets(self, where: Dict[str, Any] = None) -> List[VectorStore]:
+        if where and "user_id" in where:
+            return [self._store(self.router.route(where["user_id"]))]
+        names = [name for name in self._list_partitions() if self.router.is_partition(name)]
+        return [self._store(name) for name in names]
+
+    def add(self, ids, embeddings, documents, metadatas):
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(self.router.route(metadata.get("user_id")), []).append(i)
+
+        for name, rows in groups.items():
+            self._store(name).add(
+                [ids[i] for i in rows],
+                [embeddings[i] for i in rows],
+                [documents[i] for i in rows],
+                [metadatas[i] for i in rows]
+            )
+
+    def query(self, embedding, n_results, where=None, include_embeddings=False):
+        results = []
+        for store in self._targets(where):
+            results.extend(store.query(embedding, n_results, where, include_embeddings))
+        results.sort(key=lambda item: item["distance"])
+        return results[:n_results]
+
+    def get(self, where=None, limit=None, include_embeddings=False):
+        results = []
+        for store in self._targets(where):
+            remaining = None if limit is None else limit - len(results)
+            if remaining is not None and remaining <= 0:
+                break
+            results.extend(store.get(where, remaining, include_embeddings))
+        return results
+
+    def get_recent(self, where=None, limit=10):
+        results = []
+        for store in self._targets(where):
+            results.extend(store.get_recent(where, limit))
+        results.sort(key=lambda item: item_timestamp(item["metadata"]), reverse=True)
+        return results[:limit]
+
+    def list_user_ids(self, after="", limit=None):
+        names = [name for name in self._list_partitions() if self.router.is_partition(name)]
+        if self.router.strategy != "user":
+            # 每个分片都有多个用户，由分片各自列出后合并（每个分片最多取 limit 个即可）
+            user_ids = set()
+            for name in names:
+                user_ids.update(self._store(name).list_user_ids(after, limit))
+            return page_user_ids(user_ids, after, limit)
+
+        # 每个用户一个分区：只列举分区，所属用户读取一条条目确定后缓存
+        for name in names:
+            if name in self._owners or name == self.router.route(None):
+                continue
+            items = self._store(name).get(limit=1)
+            if items and items[0]["metadata"].get("user_id"):
+                self._owners[name] = items[0]["metadata"]["user_id"]
+        return page_user_ids(self._owners.values(), after, limit)
+
+    @property
+    def lists_users_cheaply(self):
+        return self.router.strategy == "user"
+
+    def delete(self, ids, where=None):
+        for store in self._targets(where):
+            store.delete(ids, where)
+
+    def count(self):
+        return sum(store.count() for store in self._targets())
+
+    def get_stats(self):
+        return {
+            "backend": "partitioned",
+            "strategy": self.router.strategy,
+            "num_shards": self.router.num_shards if self.router.strategy == "hash" else None,
+            "partitions_loaded": len(self._stores)
+        }
+
+    def close(self):
+        for store in self._stores.values():
+            store.close()
+        logger.info(f"分区向量存储已关闭，共 {len(self._stores)} 个分区")
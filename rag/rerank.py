@@ -0,0 +1,81 @@
+"""
+检索结果重排
+对过量召回的候选做最大边际相关性（MMR）重排和近似重复抑制，
+避免相关记忆中出现多条几乎相同的内容
+"""
+from typing import List
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from core.config import settings
+
+
+class RerankOptions(BaseModel):
+    """重排参数，未指定的字段使用配置中的默认值"""
+    enabled: bool = Field(default_factory=lambda: settings.rerank_enabled)
+    # 召回候选数 = 返回数量 × fetch_multiplier
+    fetch_multiplier: int = Field(default_factory=lambda: settings.rerank_fetch_multiplier, ge=1)
+    # 相关性与多样性的权衡：1 只看相关性，0 只看多样性
+    lambda_mult: float = Field(default_factory=lambda: settings.rerank_mmr_lambda, ge=0.0, le=1.0)
+    # 与已选条目的余弦相似度不低于该值时视为重复
+    dedup_threshold: float = Field(default_factory=lambda: settings.rerank_dedup_threshold, ge=0.0, le=1.0)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def mmr_select(
+    query_embedding: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    n_results: int,
+    lambda_mult: float = 0.5,
+    dedup_threshold: float = 0.95
+) -> List[int]:
+    """
+    最大边际相关性选择，同时剔除与已选条目近似重复的候选
+
+    每一步选择 λ·sim(q, d) - (1-λ)·max sim(d, 已选) 最大的候选，
+    相似度矩阵一次计算，逐步更新每个候选到已选集合的最大相似度
+
+    Args:
+        query_embedding: 查询向量 (维度,)
+        candidate_embeddings: 候选向量矩阵 (候选数, 维度)
+        n_results: 选择数量
+        lambda_mult: 相关性权重
+        dedup_threshold: 近似重复阈值（余弦相似度）
+
+    Returns:
+        List[int]: 选中的候选下标，按选择顺序排列
+    """
+    count = len(candidate_embeddings)
+    if count == 0 or n_results <= 0:
+        return []
+
+    candidates = _normalize(np.asarray(candidate_embeddings, dtype=np.float32))
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+
+    available = np.ones(count, dtype=bool)
+    max_sim_to_selected = np.full(count, -1.0, dtype=np.float32)
+    selected: List[int] = []
+
+    while len(selected) < n_results and available.any():
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_sim_to_selected
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+
+        available[best] = False
+        # 与刚选中的条目近似重复的候选不再参与选择
+        available &= pairwise[best] < dedup_threshold
+        np.maximum(max_sim_to_selected, pairwise[best], out=max_sim_to_selected)
+
+    return selected
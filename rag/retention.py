@@ -0,0 +1,119 @@
+"""
+知识库保留策略
+按时间（TTL）和每用户条目上限淘汰知识库条目，超出上限时按重要性最低或最久未被检索的顺序淘汰；
+批量导入的预设知识不参与淘汰
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+from core.cache import LRUCache
+from core.config import settings
+from rag.vector_store import item_timestamp
+
+# 不参与淘汰、也不占用每用户上限的内容类型（批量导入的预设知识只能通过重新导入或手动删除更新）
+PINNED_CONTENT_TYPES = ("preset",)
+
+
+class RetentionPolicy:
+    """保留策略"""
+
+    EVICTION_MODES = ("importance", "lru")
+
+    def __init__(
+        self,
+        ttl_days: float = None,
+        max_items_per_user: int = None,
+        eviction: str = None
+    ):
+        """
+        Args:
+            ttl_days: 条目保留天数，0 表示不按时间淘汰
+            max_items_per_user: 每个用户保留的条目上限，0 表示不限制
+            eviction: 超出上限时的淘汰顺序，importance 为重要性最低优先，lru 为最久未被检索优先
+        """
+        self.ttl_days = ttl_days if ttl_days is not None else settings.retention_ttl_days
+        self.max_items_per_user = (
+            max_items_per_user if max_items_per_user is not None else settings.retention_max_items_per_user
+        )
+        self.eviction = (eviction or settings.retention_eviction).lower()
+        if self.eviction not in self.EVICTION_MODES:
+            raise ValueError(f"未知的淘汰方式: {self.eviction}")
+
+    @property
+    def active(self) -> bool:
+        return self.ttl_days > 0 or self.max_items_per_user > 0
+
+
+class RetrievalTracker:
+    """记录条目最近一次被检索的时间（进程内，容量有限）
+
+    未记录的条目以写入时间作为最近使用时间。
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self._cache = LRUCache("retrieval_tracker", max_size=max_entries)
+
+    def touch(self, ids: List[str]):
+        now = time.time()
+        for item_id in ids:
+            self._cache.set(item_id, now)
+
+    def last_used(self, item: Dict[str, Any]) -> float:
+        # 评估淘汰时只读取，不改变缓存的使用顺序和命中统计
+        return self._cache.peek(item["id"]) or item_timestamp(item["metadata"])
+
+    def forget(self, ids: List[str]):
+        for item_id in ids:
+            self._cache.invalidate(item_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._cache.get_stats()
+
+
+def select_evictions(
+    items: List[Dict[str, Any]],
+    policy: RetentionPolicy,
+    tracker: Optional[RetrievalTracker] = None,
+    now: float = None
+) -> List[str]:
+    """
+    计算一个用户需要淘汰的条目
+
+    Args:
+        items: 该用户的全部条目（含 id、metadata），PINNED_CONTENT_TYPES 中的条目不淘汰
+        policy: 保留策略
+        tracker: 检索记录，lru 淘汰时使用
+        now: 当前时间戳，默认取系统时间
+
+    Returns:
+        List[str]: 需要删除的条目ID，过期条目在前
+    """
+    now = now or time.time()
+    evicted: List[str] = []
+    items = [item for item in items if item["metadata"].get("content_type") not in PINNED_CONTENT_TYPES]
+    kept = items
+
+    if policy.ttl_days > 0:
+        cutoff = now - policy.ttl_days * 86400
+        kept = []
+        for item in items:
+            # 没有时间信息的旧数据不按时间淘汰
+            ts = item_timestamp(item["metadata"])
+            if ts and ts < cutoff:
+                evicted.append(item["id"])
+            else:
+                kept.append(item)
+
+    overflow = len(kept) - policy.max_items_per_user
+    if policy.max_items_per_user > 0 and overflow > 0:
+        if policy.eviction == "lru" and tracker is not None:
+            def order(item):
+                return tracker.last_used(item)
+        else:
+            # 重要性相同（原始对话默认为0）时先淘汰较早的条目
+            def order(item):
+                return (float(item["metadata"].get("importance_score", 0.0)), item_timestamp(item["metadata"]))
+        kept.sort(key=order)
+        evicted.extend(item["id"] for item in kept[:overflow])
+
+    return evicted
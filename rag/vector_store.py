@@ -0,0 +1,912 @@
+"""
+向量存储
+定义统一的向量存储接口，提供 ChromaDB 后端和进程内的内存映射文件后端
+"""
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from core.config import settings
+from core.logger import logger
+
+
+def item_timestamp(metadata: Dict[str, Any]) -> float:
+    """
+    获取条目的数值时间戳
+
+    优先使用 timestamp_ts；旧数据只有 ISO 格式的 timestamp，解析后返回
+
+    Args:
+        metadata: 条目元数据
+
+    Returns:
+        float: Unix 时间戳，无法解析时为 0
+    """
+    if not metadata:
+        return 0.0
+    ts = metadata.get("timestamp_ts")
+    if ts is not None:
+        return float(ts)
+    try:
+        return datetime.fromisoformat(metadata["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def page_user_ids(user_ids: Iterable[str], after: str = "", limit: int = None) -> List[str]:
+    """
+    对用户ID去重、排序并取 after 之后的一页
+
+    Args:
+        user_ids: 用户ID
+        after: 从该用户ID之后开始
+        limit: 返回数量上限，None 表示不限
+
+    Returns:
+        List[str]: 用户ID列表
+    """
+    return sorted(user_id for user_id in set(user_ids) if user_id > after)[:limit]
+
+
+class VectorStore(ABC):
+    """向量存储接口
+
+    检索结果统一为字典列表，每项包含 id、content、metadata 和 distance（平方L2距离，与 ChromaDB 默认一致）。
+    """
+
+    @abstractmethod
+    def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ):
+        """批量写入向量"""
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        embedding: List[float],
+        n_results: int,
+        where: Dict[str, Any] = None,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        向量近邻检索
+
+        Args:
+            embedding: 查询向量
+            n_results: 返回结果数量
+            where: 元数据等值过滤条件
+            include_embeddings: 是否在结果中附带条目向量（embedding 字段）
+
+        Returns:
+            List[Dict[str, Any]]: 按距离升序排列的结果
+        """
+        pass
+
+    @abstractmethod
+    def get(
+        self,
+        where: Dict[str, Any] = None,
+        limit: int = None,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        """按元数据条件读取条目（不做向量检索），include_embeddings 为真时附带条目向量"""
+        pass
+
+    def get_recent(self, where: Dict[str, Any] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        按时间倒序读取最近的条目
+
+        默认实现读取全部匹配条目后排序，后端可覆盖为基于索引的实现
+
+        Args:
+            where: 元数据等值过滤条件
+            limit: 返回数量
+
+        Returns:
+            List[Dict[str, Any]]: 从新到旧排列的条目
+        """
+        items = self.get(where)
+        items.sort(key=lambda item: item_timestamp(item["metadata"]), reverse=True)
+        return items[:limit]
+
+    def list_user_ids(self, after: str = "", limit: int = None) -> List[str]:
+        """
+        按用户ID顺序分页列出存有条目的用户（去重后升序排列）
+
+        默认实现读取全部条目的元数据，按用户分区的后端覆盖为只列举分区的实现
+
+        Args:
+            after: 从该用户ID之后开始
+            limit: 返回数量上限，None 表示不限
+
+        Returns:
+            List[str]: 用户ID列表
+        """
+        user_ids = {item["metadata"]["user_id"] for item in self.get() if item["metadata"].get("user_id")}
+        return page_user_ids(user_ids, after, limit)
+
+    @property
+    def lists_users_cheaply(self) -> bool:
+        """list_user_ids 是否不需要扫描条目（开销只与用户数相关）"""
+        return False
+
+    @abstractmethod
+    def delete(self, ids: List[str], where: Dict[str, Any] = None):
+        """按ID删除条目，where 可用于缩小查找范围"""
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """条目总数"""
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """后端统计信息"""
+        return {}
+
+    def close(self):
+        """释放资源"""
+        pass
+
+
+class ChromaVectorStore(VectorStore):
+    """ChromaDB 后端"""
+
+    def __init__(self, collection_name: str, persist_directory: str = None, client=None):
+        self.collection_name = collection_name
+        # 分区存储的多个集合共用一个客户端
+        self.client = client or self.create_client(persist_directory)
+
+        # 获取或创建集合
+        try:
+            self.collection = self.client.get_collection(collection_name)
+            logger.info(f"加载现有知识库集合: {collection_name}")
+        except Exception:
+            self.collection = self.client.create_collection(
+                name=collection_name,
+                metadata={"description": "Chatbot knowledge base"}
+            )
+            logger.info(f"创建新知识库集合: {collection_name}")
+
+    @staticmethod
+    def create_client(persist_directory: str = None):
+        """创建 ChromaDB 持久化客户端"""
+        import chromadb
+        from chromadb.config import Settings
+
+        return chromadb.PersistentClient(
+            path=persist_directory or settings.chroma_persist_directory,
+            settings=Settings(anonymized_telemetry=False)
+        )
+
+    @staticmethod
+    def _where(where: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """ChromaDB 的多个过滤条件需要用 $and 组合"""
+        if not where:
+            return None
+        if len(where) == 1:
+            return dict(where)
+        return {"$and": [{key: value} for key, value in where.items()]}
+
+    def add(self, ids, embeddings, documents, metadatas):
+        # 使用 upsert 使重复写入（如迁移重跑）保持幂等
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, embedding, n_results, where=None, include_embeddings=False):
+        # 空集合上查询会报错（新用户的分区在首次写入前为空）
+        if self.collection.count() == 0:
+            return []
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+        results = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=n_results,
+            where=self._where(where),
+            include=include
+        )
+
+        items = []
+        if results["documents"] and results["documents"][0]:
+            for i, doc in enumerate(results["documents"][0]):
+                item = {
+                    "id": results["ids"][0][i],
+                    "content": doc,
+                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
+                    "distance": results["distances"][0][i] if results["distances"] else 1.0
+                }
+                if include_embeddings:
+                    item["embedding"] = np.asarray(results["embeddings"][0][i], dtype=np.float32)
+                items.append(item)
+        return items
+
+    def get(self, where=None, limit=None, include_embeddings=False):
+        include = ["documents", "metadatas"]
+        if include_embeddings:
+            include.append("embeddings")
+        results = self.collection.get(
+            where=self._where(where),
+            limit=limit,
+            include=include
+        )
+        items = []
+        for i, item_id in enumerate(results["ids"]):
+            item = {
+                "id": item_id,
+                "content": results["documents"][i],
+                "metadata": results["metadatas"][i] if results["metadatas"] else {}
+            }
+            if include_embeddings:
+                item["embedding"] = np.asarray(results["embeddings"][i], dtype=np.float32)
+            items.append(item)
+        return items
+
+    # 最近条目查询的时间窗口（秒），逐级放大直到取满
+    RECENT_WINDOWS = (3600, 86400, 7 * 86400, 30 * 86400)
+
+    def get_recent(self, where=None, limit=10):
+        # 在 timestamp_ts 上做范围过滤，由元数据索引完成，不需要向量查询；
+        # 最近窗口内条目不足时放大窗口，最后一级不限时间（包含没有 timestamp_ts 的旧数据）
+        now = time.time()
+        items = []
+        for window in self.RECENT_WINDOWS + (None,):
+            conditions = dict(where or {})
+            if window is not None:
+                conditions["timestamp_ts"] = {"$gte": now - window}
+            items = self.get(conditions)
+            if len(items) >= limit:
+                break
+        items.sort(key=lambda item: item_timestamp(item["metadata"]), reverse=True)
+        return items[:limit]
+
+    def list_user_ids(self, after="", limit=None, batch_size: int = 1000):
+        # 集合中没有按用户的索引，只能分页读取全部元数据（不加载文档和向量）
+        user_ids = set()
+        offset = 0
+        while True:
+            page = self.collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+            if not page["ids"]:
+                break
+            user_ids.update(m["user_id"] for m in page["metadatas"] if m and m.get("user_id"))
+            offset += len(page["ids"])
+        return page_user_ids(user_ids, after, limit)
+
+    def delete(self, ids, where=None):
+        self.collection.delete(ids=ids)
+
+    def count(self):
+        return self.collection.count()
+
+    def iter_items(self, batch_size: int = 500) -> Iterator[Dict[str, List[Any]]]:
+        """
+        分页遍历集合中的全部条目（含向量），用于数据迁移
+
+        Args:
+            batch_size: 每页条目数
+
+        Returns:
+            Iterator[Dict[str, List[Any]]]: 每页的 ids、embeddings、documents、metadatas
+        """
+        offset = 0
+        while True:
+            page = self.collection.get(
+                limit=batch_size,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            if not page["ids"]:
+                break
+            yield page
+            offset += len(page["ids"])
+
+    def get_stats(self):
+        return {"backend": "chroma", "collection_name": self.collection_name}
+
+
+class _MmapPartition:
+    """单个用户的向量分区：追加写入的向量矩阵文件 + 元数据日志
+
+    目录结构：
+        vectors.bin  按行追加的向量（float32/float16）
+        meta.jsonl   每行一条元数据记录（写入或删除标记）
+        header.json  向量维度、数据类型和文件代数
+        count.json   存活条目数（随写入、删除和压缩更新，统计总数时无需加载分区）
+        .lock        跨进程读写锁
+
+    删除只追加删除标记；已删除的行占比超过 compact_ratio 时压缩分区：只保留存活的条目写入下一代文件
+    （vectors.{代数}.bin / meta.{代数}.jsonl），再原子地替换 header.json 切换到新文件，中途失败不影响旧文件。
+    """
+
+    COUNT_FILE = "count.json"
+
+    def __init__(self, path: str, dtype: np.dtype, compact_ratio: float = 0.0):
+        self.path = path
+        self.dtype = dtype
+        self.dim: Optional[int] = None
+        self.generation = 0
+        self.compact_ratio = compact_ratio
+
+        self._lock = threading.RLock()
+        self._header_path = os.path.join(path, "header.json")
+        self._count_path = os.path.join(path, self.COUNT_FILE)
+        self._lock_path = os.path.join(path, ".lock")
+        self._header_version: Optional[tuple] = None
+
+        self._reset_state()
+        self._load_header()
+
+    def _reset_state(self):
+        """清空已加载到内存的状态（切换到新一代文件时重新读取）"""
+        self._matrix: Optional[np.memmap] = None
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._alive = np.empty(0, dtype=bool)
+        self._timestamps = np.empty(0, dtype=np.float64)
+        self._row_of: Dict[str, int] = {}
+        self._pending_deletes: set = set()
+        self._meta_offset = 0
+
+    def _file_paths(self, generation: int):
+        """指定代数的向量文件和元数据文件路径（第 0 代沿用未压缩过的文件名）"""
+        if generation == 0:
+            return os.path.join(self.path, "vectors.bin"), os.path.join(self.path, "meta.jsonl")
+        return (
+            os.path.join(self.path, f"vectors.{generation}.bin"),
+            os.path.join(self.path, f"meta.{generation}.jsonl")
+        )
+
+    @property
+    def _vectors_path(self) -> str:
+        return self._file_paths(self.generation)[0]
+
+    @property
+    def _meta_path(self) -> str:
+        return self._file_paths(self.generation)[1]
+
+    def _load_header(self):
+        """读取 header.json（未变化时跳过），文件代数变化时丢弃内存中的旧状态"""
+        try:
+            stat = os.stat(self._header_path)
+        except FileNotFoundError:
+            return
+        # header 通过 os.replace 整体替换，inode 随之变化
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version == self._header_version:
+            return
+        with open(self._header_path, encoding="utf-8") as f:
+            header = json.load(f)
+        self._header_version = version
+        self.dim = header["dim"]
+        self.dtype = np.dtype(header["dtype"])
+        generation = header.get("generation", 0)
+        if generation != self.generation:
+            self.generation = generation
+            self._reset_state()
+
+    def _write_header(self):
+        """原子地写入 header.json"""
+        tmp_path = self._header_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name, "generation": self.generation}, f)
+        os.replace(tmp_path, self._header_path)
+        stat = os.stat(self._header_path)
+        self._header_version = (stat.st_ino, stat.st_mtime_ns)
+
+    def _write_count(self):
+        """在持有写锁、状态已刷新的情况下原子地写入存活条目数"""
+        tmp_path = self._count_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"count": int(self._alive.sum())}, f)
+        os.replace(tmp_path, self._count_path)
+
+    @classmethod
+    def stored_count(cls, path: str) -> Optional[int]:
+        """读取分区目录中记录的存活条目数，不加载分区；没有记录（如旧版本写入的分区）时返回 None"""
+        try:
+            with open(os.path.join(path, cls.COUNT_FILE), encoding="utf-8") as f:
+                return int(json.load(f)["count"])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+            return None
+
+    def _file_lock(self, operation: int):
+        """跨进程文件锁（多个 uvicorn worker 可共享同一目录）：写入和压缩加排他锁，读取加共享锁"""
+        os.makedirs(self.path, exist_ok=True)
+        lock_file = open(self._lock_path, "a")
+        fcntl.flock(lock_file, operation)
+        return lock_file
+
+    def _write_lock(self):
+        return self._file_lock(fcntl.LOCK_EX)
+
+    def refresh(self, locked: bool = False):
+        """
+        读取其他进程追加的新数据
+
+        Args:
+            locked: 调用方是否已持有写锁（否则读取期间加共享锁，避免读到压缩中途的文件）
+        """
+        with self._lock:
+            if not os.path.exists(self._header_path):
+                return
+            lock_file = None if locked else self._file_lock(fcntl.LOCK_SH)
+            try:
+                self._load_header()
+                if self.dim is None or not os.path.exists(self._meta_path):
+                    return
+                self._read_new_records()
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+
+    def _read_new_records(self):
+        with open(self._meta_path, "rb") as f:
+            f.seek(self._meta_offset)
+            chunk = f.read()
+        # 只处理完整的行，未写完的行留到下次读取
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return
+        self._meta_offset += end
+
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("deleted"):
+                self._pending_deletes.add(record["id"])
+                continue
+            self._row_of[record["id"]] = len(self._ids)
+            self._ids.append(record["id"])
+            self._documents.append(record["content"])
+            self._metadatas.append(record["metadata"])
+
+        rows = len(self._ids)
+        if rows == 0:
+            self._matrix = None
+            return
+        self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+        old_rows = len(self._sq_norms)
+        if rows > old_rows:
+            fresh = np.asarray(self._matrix[old_rows:], dtype=np.float32)
+            self._sq_norms = np.concatenate([self._sq_norms, np.einsum("ij,ij->i", fresh, fresh)])
+            self._alive = np.concatenate([self._alive, np.ones(rows - old_rows, dtype=bool)])
+            self._timestamps = np.concatenate([
+                self._timestamps,
+                np.array([item_timestamp(m) for m in self._metadatas[old_rows:]], dtype=np.float64)
+            ])
+
+        for item_id in self._pending_deletes:
+            row = self._row_of.get(item_id)
+            if row is not None:
+                self._alive[row] = False
+        self._pending_deletes = {i for i in self._pending_deletes if i not in self._row_of}
+
+    def append(self, ids, embeddings: np.ndarray, documents, metadatas) -> int:
+        """追加写入：先写向量再写元数据，读取方以元数据行数为准；返回实际写入的条目数"""
+        with self._lock:
+            lock_file = self._write_lock()
+            try:
+                # 其他进程可能已追加过数据或压缩过分区，先读入以保持行号一致
+                self.refresh(locked=True)
+                if self.dim is None:
+                    self.dim = int(embeddings.shape[1])
+                    self._write_header()
+                elif embeddings.shape[1] != self.dim:
+                    raise ValueError(f"向量维度 {embeddings.shape[1]} 与分区维度 {self.dim} 不一致")
+
+                # 已存在的ID不重复写入（如迁移重跑）
+                keep = [i for i, item_id in enumerate(ids) if item_id not in self._row_of]
+                if not keep:
+                    return 0
+                ids = [ids[i] for i in keep]
+                embeddings = embeddings[keep]
+                documents = [documents[i] for i in keep]
+                metadatas = [metadatas[i] for i in keep]
+                with open(self._vectors_path, "ab") as f:
+                    f.seek(0, os.SEEK_END)
+                    expected = len(self._ids) * self.dim * self.dtype.itemsize
+                    if f.tell() != expected:
+                        # 上次写入中断留下的残余数据，截断后再追加
+                        f.truncate(expected)
+                    f.write(np.ascontiguousarray(embeddings, dtype=self.dtype).tobytes())
+                with open(self._meta_path, "a", encoding="utf-8") as f:
+                    for item_id, document, metadata in zip(ids, documents, metadatas):
+                        f.write(json.dumps(
+                            {"id": item_id, "content": document, "metadata": metadata},
+                            ensure_ascii=False
+                        ) + "\n")
+                self.refresh(locked=True)
+                self._write_count()
+            finally:
+                lock_file.close()
+            return len(keep)
+
+    def mark_deleted(self, ids: List[str]) -> int:
+        """追加删除标记，返回本分区中被删除的条目数；已删除的行占比超过阈值时压缩分区"""
+        with self._lock:
+            lock_file = self._write_lock()
+            try:
+                # 持锁后再刷新：其他进程可能刚压缩过分区，删除标记必须写入当前一代的元数据文件
+                self.refresh(locked=True)
+                targets = [i for i in ids if i in self._row_of and self._alive[self._row_of[i]]]
+                if not targets:
+                    return 0
+                with open(self._meta_path, "a", encoding="utf-8") as f:
+                    for item_id in targets:
+                        f.write(json.dumps({"id": item_id, "deleted": True}) + "\n")
+                self.refresh(locked=True)
+                if self.compact_ratio > 0 and self.dead_ratio() >= self.compact_ratio:
+                    self._compact_locked()
+                self._write_count()
+            finally:
+                lock_file.close()
+            return len(targets)
+
+    def dead_ratio(self) -> float:
+        """已删除的行占全部行的比例"""
+        with self._lock:
+            if not len(self._ids):
+                return 0.0
+            return 1.0 - float(self._alive.sum()) / len(self._ids)
+
+    def compact(self) -> int:
+        """
+        压缩分区：只保留存活的条目重写文件，释放已删除条目占用的磁盘和内存
+
+        Returns:
+            int: 回收的行数
+        """
+        with self._lock:
+            lock_file = self._write_lock()
+            try:
+                self.refresh(locked=True)
+                reclaimed = self._compact_locked()
+                self._write_count()
+                return reclaimed
+            finally:
+                lock_file.close()
+
+    def _compact_locked(self) -> int:
+        """在持有写锁、状态已刷新的情况下压缩分区"""
+        dead = len(self._ids) - int(self._alive.sum())
+        if dead == 0:
+            return 0
+
+        rows = np.flatnonzero(self._alive)
+        old_paths = self._file_paths(self.generation)
+        vectors_path, meta_path = self._file_paths(self.generation + 1)
+        # 先完整写出新一代文件，再切换 header；切换前失败时旧文件保持不变
+        with open(vectors_path, "wb") as f:
+            if len(rows):
+                f.write(np.ascontiguousarray(self._matrix[rows], dtype=self.dtype).tobytes())
+        with open(meta_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(
+                    {"id": self._ids[row], "content": self._documents[row], "metadata": self._metadatas[row]},
+                    ensure_ascii=False
+                ) + "\n")
+
+        self.generation += 1
+        self._write_header()
+        self._reset_state()
+        for path in old_paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._read_new_records()
+        logger.info(f"向量分区 {os.path.basename(self.path)} 已压缩，回收 {dead} 行，剩余 {len(rows)} 行")
+        return dead
+
+    def owner(self) -> Optional[str]:
+        """分区所属用户：读取第一条写入记录的 user_id（同一分区内的条目属于同一用户），不加载分区"""
+        try:
+            with open(self._meta_path, "rb") as f:
+                line = f.readline()
+        except FileNotFoundError:
+            return None
+        if not line.endswith(b"\n"):
+            return None
+        return json.loads(line).get("metadata", {}).get("user_id")
+
+    def _mask(self, where: Dict[str, Any] = None) -> np.ndarray:
+        mask = self._alive.copy()
+        if where:
+            for row in np.flatnonzero(mask):
+                metadata = self._metadatas[row]
+                if any(metadata.get(key) != value for key, value in where.items()):
+                    mask[row] = False
+        return mask
+
+    def _item(self, row: int) -> Dict[str, Any]:
+        return {"id": self._ids[row], "content": self._documents[row], "metadata": self._metadatas[row]}
+
+    def query(
+        self,
+        embedding: np.ndarray,
+        n_results: int,
+        where=None,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.refresh()
+            if self._matrix is None or not len(self._ids):
+                return []
+            mask = self._mask(where)
+            candidates = np.flatnonzero(mask)
+            if not len(candidates):
+                return []
+
+            # 平方L2距离 = |q|² + |v|² - 2·q·v，一次矩阵乘完成
+            matrix = self._matrix if len(candidates) == len(self._ids) else self._matrix[candidates]
+            dots = np.asarray(matrix, dtype=np.float32) @ embedding
+            distances = float(embedding @ embedding) + self._sq_norms[candidates] - 2 * dots
+
+            k = min(n_results, len(candidates))
+            top = np.argpartition(distances, k - 1)[:k]
+            top = top[np.argsort(distances[top])]
+            items = []
+            for i in top:
+                item = {**self._item(int(candidates[i])), "distance": float(distances[i])}
+                if include_embeddings:
+                    item["embedding"] = np.asarray(self._matrix[candidates[i]], dtype=np.float32)
+                items.append(item)
+            return items
+
+    def get(self, where=None, limit=None, include_embeddings=False) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.refresh()
+            rows = np.flatnonzero(self._mask(where)) if len(self._ids) else []
+            if limit is not None:
+                rows = rows[:limit]
+            items = []
+            for row in rows:
+                item = self._item(int(row))
+                if include_embeddings:
+                    item["embedding"] = np.asarray(self._matrix[row], dtype=np.float32)
+                items.append(item)
+            return items
+
+    def get_recent(self, where=None, limit=10) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.refresh()
+            if not len(self._ids):
+                return []
+            rows = np.flatnonzero(self._mask(where))
+            # 时间戳数组常驻内存，按时间倒序取前 limit 条
+            order = np.argsort(-self._timestamps[rows], kind="stable")[:limit]
+            return [self._item(int(rows[i])) for i in order]
+
+    def count(self) -> int:
+        with self._lock:
+            self.refresh()
+            return int(self._alive.sum())
+
+
+class MmapVectorStore(VectorStore):
+    """内存映射文件后端
+
+    每个用户的向量单独保存为一个追加写入的矩阵文件，检索时对该用户的矩阵做一次向量化点积，
+    检索开销只与该用户的历史规模相关。写入使用文件锁，可在多个 worker 进程间共享。
+    最多保持 max_open_partitions 个分区常驻内存；各分区在自己的目录中记录条目数，
+    写入只更新所在分区，统计总数时逐个读取分区的计数，无需打开分区。删除的条目在分区中的占比达到 compact_ratio 时压缩该分区。
+    """
+
+    SHARED_PARTITION = "_shared"
+
+    def __init__(
+        self,
+        directory: str = None,
+        dtype: str = None,
+        max_open_partitions: int = None,
+        compact_ratio: float = None
+    ):
+        self.directory = directory or settings.mmap_store_directory
+        self.dtype = np.dtype(dtype or settings.mmap_store_dtype)
+        self.max_open_partitions = max(1, max_open_partitions or settings.mmap_store_max_open_partitions)
+        self.compact_ratio = compact_ratio if compact_ratio is not None else settings.mmap_store_compact_ratio
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._partitions: "OrderedDict[str, _MmapPartition]" = OrderedDict()
+        self._partitions_lock = threading.Lock()
+        # 分区目录名 -> 所属用户ID（分区的所属用户不会改变）
+        self._owners: Dict[str, str] = {}
+        self._compactions = 0
+        logger.info(f"内存映射向量存储已就绪: {self.directory} ({self.dtype.name})")
+
+    @staticmethod
+    def partition_key(user_id: Optional[str]) -> str:
+        """用户ID转换为安全的目录名（可读前缀 + 哈希，避免冲突）"""
+        if not user_id:
+            return MmapVectorStore.SHARED_PARTITION
+        readable = re.sub(r"[^A-Za-z0-9_-]", "_", user_id)[:48]
+        digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:8]
+        return f"{readable}-{digest}"
+
+    def _partition(self, key: str, cache: bool = True) -> _MmapPartition:
+        """
+        获取分区：已打开的直接返回；否则打开分区，cache 为真时放入常驻分区（超出上限时关闭最久未使用的分区）
+        """
+        with self._partitions_lock:
+            partition = self._partitions.get(key)
+            if partition is not None:
+                self._partitions.move_to_end(key)
+                return partition
+            partition = _MmapPartition(os.path.join(self.directory, key), self.dtype, self.compact_ratio)
+            if cache:
+                self._partitions[key] = partition
+                while len(self._partitions) > self.max_open_partitions:
+                    # 正在使用被淘汰分区的线程仍持有引用，使用结束后释放
+                    self._partitions.popitem(last=False)
+            return partition
+
+    def _partition_keys(self) -> List[str]:
+        return [
+            name for name in sorted(os.listdir(self.directory))
+            if os.path.isdir(os.path.join(self.directory, name))
+        ]
+
+    def _all_partitions(self) -> Iterator[_MmapPartition]:
+        """逐个访问所有分区（未常驻的分区只临时打开，不占用常驻名额）"""
+        for key in self._partition_keys():
+            yield self._partition(key, cache=False)
+
+    def _target_partitions(self, where: Dict[str, Any] = None):
+        """
+        根据过滤条件确定要访问的分区
+
+        Returns:
+            Tuple[Iterable[_MmapPartition], Dict[str, Any]]: 分区（未指定 user_id 时为逐个临时打开的迭代器）和剩余的过滤条件
+            （指定了 user_id 时只访问该用户的分区，分区内无需再按 user_id 过滤）
+        """
+        if where and "user_id" in where:
+            rest = {key: value for key, value in where.items() if key != "user_id"}
+            return [self._partition(self.partition_key(where["user_id"]))], rest
+        return self._all_partitions(), where
+
+    def add(self, ids, embeddings, documents, metadatas):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(self.partition_key(metadata.get("user_id")), []).append(i)
+
+        for key, rows in groups.items():
+            self._partition(key).append(
+                [ids[i] for i in rows],
+                vectors[rows],
+                [documents[i] for i in rows],
+                [metadatas[i] for i in rows]
+            )
+
+    def query(self, embedding, n_results, where=None, include_embeddings=False):
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        partitions, where = self._target_partitions(where)
+        results = []
+        for partition in partitions:
+            results.extend(partition.query(query_vector, n_results, where, include_embeddings))
+        results.sort(key=lambda item: item["distance"])
+        return results[:n_results]
+
+    def get(self, where=None, limit=None, include_embeddings=False):
+        partitions, where = self._target_partitions(where)
+        results = []
+        for partition in partitions:
+            remaining = None if limit is None else limit - len(results)
+            if remaining is not None and remaining <= 0:
+                break
+            results.extend(partition.get(where, remaining, include_embeddings))
+        return results
+
+    def get_recent(self, where=None, limit=10):
+        partitions, where = self._target_partitions(where)
+        results = []
+        for partition in partitions:
+            results.extend(partition.get_recent(where, limit))
+        results.sort(key=lambda item: item_timestamp(item["metadata"]), reverse=True)
+        return results[:limit]
+
+    def list_user_ids(self, after="", limit=None):
+        # 只列举分区目录，所属用户读取一次后缓存
+        for key in self._partition_keys():
+            if key == self.SHARED_PARTITION or key in self._owners:
+                continue
+            owner = _MmapPartition(os.path.join(self.directory, key), self.dtype).owner()
+            if owner:
+                self._owners[key] = owner
+        return page_user_ids(self._owners.values(), after, limit)
+
+    @property
+    def lists_users_cheaply(self):
+        return True
+
+    def delete(self, ids, where=None):
+        # 未指定 user_id 时需要逐个分区查找（只临时打开分区）
+        partitions, _ = self._target_partitions(where)
+        remaining = set(ids)
+        for partition in partitions:
+            if not remaining:
+                break
+            partition.refresh()
+            # 压缩后被删除的ID不再出现在分区中，先记下本分区包含的ID
+            found = {i for i in remaining if i in partition._row_of}
+            if not found:
+                continue
+            generation = partition.generation
+            partition.mark_deleted(list(found))
+            if partition.generation != generation:
+                self._compactions += 1
+            remaining -= found
+
+    def count(self):
+        total = 0
+        for key in self._partition_keys():
+            count = _MmapPartition.stored_count(os.path.join(self.directory, key))
+            if count is None:
+                # 旧版本写入的分区没有计数文件，打开分区统计
+                count = self._partition(key, cache=False).count()
+            total += count
+        return total
+
+    def get_stats(self):
+        return {
+            "backend": "mmap",
+            "directory": self.directory,
+            "dtype": self.dtype.name,
+            "partitions_loaded": len(self._partitions),
+            "max_open_partitions": self.max_open_partitions,
+            "compact_ratio": self.compact_ratio,
+            "compactions": self._compactions
+        }
+
+
+def create_vector_store(collection_name: str, backend: str = None, partitioning: str = None) -> VectorStore:
+    """
+    根据配置创建向量存储
+
+    Args:
+        collection_name: 集合名称（ChromaDB 集合名 / 内存映射存储的子目录名）
+        backend: 存储后端（chroma / mmap），默认读取配置
+        partitioning: ChromaDB 后端的分区策略（none / user / hash），默认读取配置
+
+    Returns:
+        VectorStore: 向量存储实例
+    """
+    backend = (backend or settings.vector_store_backend).lower()
+    partitioning = (partitioning or settings.vector_store_partitioning).lower()
+
+    if backend == "mmap":
+        # 内存映射后端本身即按用户分区
+        return MmapVectorStore(os.path.join(settings.mmap_store_directory, collection_name))
+    if backend != "chroma":
+        logger.warning(f"未知的向量存储后端: {backend}，使用 chroma")
+
+    if partitioning == "none":
+        return ChromaVectorStore(collection_name)
+
+    from rag.partition import PartitionedVectorStore, PartitionRouter
+
+    client = ChromaVectorStore.create_client()
+    router = PartitionRouter(collection_name, partitioning, settings.vector_store_shards)
+    logger.info(f"知识库按 {partitioning} 策略分区: {router.prefix}*")
+    return PartitionedVectorStore(
+        router=router,
+        store_factory=lambda name: ChromaVectorStore(name, client=client),
+        list_partitions=lambda: [c.name for c in client.list_collections()]
+    )
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+情感历史重新评分脚本
+用当前的情感分析器对用户的全部历史消息批量重新评分，输出情感分布；
+指定 --write-back 时把新的情感标注写回消息
+"""
+import argparse
+import asyncio
+
+from emotion.analytics import emotion_updates, rescore_messages
+from emotion.analyzer import EmotionAnalyzer
+from memory.manager import MemoryManager
+
+
+async def rescore_emotions(user_ids, write_back: bool):
+    """
+    对指定用户（未指定时为全部用户）重新评分
+
+    Args:
+        user_ids: 用户ID列表
+        write_back: 是否写回新的情感标注
+    """
+    memory_manager = MemoryManager()
+    analyzer = EmotionAnalyzer()
+    try:
+        if not user_ids:
+            user_ids, cursor = [], ""
+            while True:
+                page = await memory_manager.list_user_ids(cursor, 1000)
+                user_ids.extend(page)
+                if len(page) < 1000:
+                    break
+                cursor = page[-1]
+
+        print(f"🔄 开始重新评分 {len(user_ids)} 个用户的历史消息...")
+        for user_id in user_ids:
+            messages = await memory_manager.get_user_messages(user_id)
+            rescored = rescore_messages(analyzer, messages)
+            summary = rescored["summary"]
+            distribution = "，".join(
+                f"{emotion} {stats['ratio']:.0%}" for emotion, stats in summary["distribution"].items()
+            )
+            print(f"  {user_id}: {summary['total']} 条，变化 {summary['changed']} 条（{distribution or '无消息'}）")
+
+            if write_back:
+                updated = await memory_manager.update_message_emotions(
+                    emotion_updates(messages, rescored["results"])
+                )
+                print(f"    已写回 {updated} 条")
+        print("✅ 重新评分完成")
+    except Exception as e:
+        print(f"❌ 重新评分失败: {e}")
+    finally:
+        memory_manager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对历史消息重新做情感分析")
+    parser.add_argument("user_ids", nargs="*", help="用户ID，不指定时处理全部用户")
+    parser.add_argument("--write-back", action="store_true", help="把新的情感标注写回消息")
+    args = parser.parse_args()
+
+    asyncio.run(rescore_emotions(args.user_ids, args.write_back))
@@ -0,0 +1,55 @@
+"""
+情感分析测试数据：示例句子、拼接长消息，以及旧实现（逐关键词 re.findall）的打分，作为结果一致性的基准
+"""
+import re
+from typing import List
+
+import numpy as np
+
+from emotion.analyzer import EmotionAnalyzer, EmotionType
+
+SAMPLE_SENTENCES = [
+    "今天真的好开心，和朋友一起去看了电影",
+    "工作上的事情让我很难过，有点失望",
+    "他又迟到了，真让人生气",
+    "明天就要考试了，我好紧张，有点担心",
+    "没想到你会来，真是太意外了",
+    "我很喜欢你做的蛋糕，谢谢你",
+    "天气一般，没什么特别的",
+    "不要这样，这样不好",
+]
+
+
+def build_messages(count: int, length: int) -> List[str]:
+    """用示例句子拼接出指定长度的消息"""
+    rng = np.random.default_rng(42)
+    messages = []
+    for _ in range(count):
+        parts, size = [], 0
+        while size < length:
+            sentence = SAMPLE_SENTENCES[rng.integers(len(SAMPLE_SENTENCES))]
+            parts.append(sentence)
+            size += len(sentence) + 1
+        messages.append("。".join(parts)[:length])
+    return messages
+
+
+def legacy_scores(analyzer: EmotionAnalyzer, text: str):
+    """旧实现：每个关键词单独执行一次 re.findall，再用 in 扫描正负面指示词"""
+    text = text.lower()
+    emotion_scores = {}
+    for emotion_type, keywords in analyzer.emotion_keywords.items():
+        score = sum(len(re.findall(keyword, text)) for keyword in keywords)
+        if score > 0:
+            emotion_scores[emotion_type] = score
+    if emotion_scores:
+        emotion_type = max(emotion_scores, key=emotion_scores.get)
+        return emotion_type, min(0.9, emotion_scores[emotion_type] * 0.2 + 0.3)
+
+    positive = sum(1 for indicator in analyzer.positive_indicators if indicator in text)
+    negative = sum(1 for indicator in analyzer.negative_indicators if indicator in text)
+    if positive > negative:
+        return EmotionType.POSITIVE, min(0.8, positive * 0.3)
+    if negative > positive:
+        return EmotionType.NEGATIVE, min(0.8, negative * 0.3)
+    return EmotionType.NEUTRAL, 0.5
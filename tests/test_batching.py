@@ -0,0 +1,90 @@
+"""
+微批编码测试：MicroBatcher 合并并发任务、停止时取消未完成的任务，EmbeddingService 的缓存统计
+"""
+import asyncio
+
+import numpy as np
+
+from core.batching import MicroBatcher
+from core.executor import BoundedExecutor
+from rag.embedding_cache import EmbeddingCache
+from rag.embedding_service import EmbeddingService
+
+
+def encode_lengths(texts):
+    return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_concurrent_submissions_share_a_batch():
+    batches = []
+
+    async def process(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher("test", process, max_batch_size=3, max_wait=0.05)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(5))), batcher.get_stats()
+        finally:
+            await batcher.stop()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2], [3, 4]]
+    assert (stats["batches"], stats["max_observed_batch"]) == (2, 3)
+
+
+def test_batch_failure_reaches_every_caller():
+    async def process(items):
+        raise RuntimeError("encoder down")
+
+    async def scenario():
+        batcher = MicroBatcher("test", process, max_wait=0.01)
+        try:
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_stop_cancels_in_flight_and_queued_items():
+    started = None
+
+    async def process(items):
+        started.set()
+        await asyncio.sleep(10)
+        return items
+
+    async def scenario():
+        nonlocal started
+        started = asyncio.Event()
+        batcher = MicroBatcher("test", process, max_batch_size=1, max_wait=0)
+        in_flight = asyncio.create_task(batcher.submit(1))
+        queued = asyncio.create_task(batcher.submit(2))
+        await started.wait()
+        await batcher.stop()
+        return await asyncio.gather(in_flight, queued, return_exceptions=True), batcher.running
+
+    results, running = asyncio.run(scenario())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert not running
+
+
+def test_embedding_service_counts_each_lookup_once():
+    async def scenario():
+        cache = EmbeddingCache("model", max_bytes=1024)
+        executor = BoundedExecutor("test", max_workers=1)
+        service = EmbeddingService(encode_lengths, executor, cache, max_wait=0.001)
+        try:
+            await service.embed(["a"])
+            await service.embed(["a"])
+        finally:
+            await service.stop()
+            executor.shutdown()
+        return cache.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
@@ -0,0 +1,122 @@
+"""
+LRUCache 和 EmbeddingCache 测试
+"""
+import time
+
+import numpy as np
+
+from core.cache import LRUCache
+from rag.embedding_cache import EmbeddingCache
+
+
+def test_get_and_miss():
+    cache = LRUCache("test")
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache("test", max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_expiry():
+    cache = LRUCache("test", ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_byte_budget():
+    cache = LRUCache("test", max_bytes=10, sizeof=len)
+    cache.set("a", "x" * 4)
+    cache.set("b", "x" * 4)
+    cache.set("c", "x" * 4)
+    assert cache.get("a") is None
+    assert cache.get_stats()["bytes"] == 8
+
+
+def test_overwrite_updates_bytes():
+    cache = LRUCache("test", max_bytes=100, sizeof=len)
+    cache.set("a", "x" * 10)
+    cache.set("a", "x" * 3)
+    assert cache.get_stats()["bytes"] == 3
+
+
+def test_oversized_entry_is_kept_alone():
+    cache = LRUCache("test", max_bytes=4, sizeof=len)
+    cache.set("a", "x" * 10)
+    assert cache.get("a") == "x" * 10
+
+
+def test_zero_byte_budget_keeps_nothing():
+    cache = LRUCache("test", max_bytes=0, sizeof=len)
+    cache.set("a", "x")
+    assert cache.get("a") is None
+    assert cache.get_stats()["max_bytes"] == 0
+
+
+def test_byte_budget_requires_sizeof():
+    cache = LRUCache("test", max_bytes=10)
+    assert cache.max_bytes is None
+
+
+def test_invalidate_and_clear():
+    cache = LRUCache("test", max_bytes=100, sizeof=len)
+    cache.set("a", "xx")
+    cache.set("b", "yy")
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get_stats()["bytes"] == 0
+    assert cache.invalidations == 2
+
+
+class CountingEncoder:
+    """记录每次调用的输入，向量为文本长度"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_embedding_cache_encodes_only_misses_once():
+    cache = EmbeddingCache("model", max_bytes=1024)
+    encoder = CountingEncoder()
+    cache.encode(["a", "bb"], encoder)
+    vectors = cache.encode(["bb", "ccc", "ccc"], encoder)
+    assert encoder.calls == [["a", "bb"], ["ccc"]]
+    assert vectors[:, 0].tolist() == [2.0, 3.0, 3.0]
+
+
+def test_embedding_cache_namespace_separates_models():
+    cache = EmbeddingCache("model-a", max_bytes=1024)
+    encoder = CountingEncoder()
+    cache.encode(["a"], encoder)
+    cache.namespace = "model-b"
+    cache.encode(["a"], encoder)
+    assert encoder.calls == [["a"], ["a"]]
+
+
+def test_embedding_cache_disabled_with_zero_budget():
+    cache = EmbeddingCache("model", max_bytes=0)
+    encoder = CountingEncoder()
+    cache.encode(["a"], encoder)
+    cache.encode(["a"], encoder)
+    assert len(encoder.calls) == 2
+    assert cache.get_stats()["enabled"] is False
@@ -0,0 +1,155 @@
+"""
+记忆整合测试：向量聚类、抽取式摘要，持续活跃的会话中只整合较早的对话，
+摘要再次参与整合，摘要保存失败时保留原始条目
+"""
+import asyncio
+import time
+
+import numpy as np
+
+from core.consolidation import ConsolidationWorker
+from rag.consolidation import cluster_embeddings, summarize_cluster
+from rag.knowledge_base import KnowledgeBase
+from rag.vector_store import MmapVectorStore
+
+HOUR = 3600
+
+
+def test_cluster_embeddings_separates_directions():
+    embeddings = np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.1, 0.9]])
+    labels = cluster_embeddings(embeddings, 2)
+    assert labels[0] == labels[1]
+    assert labels[2] == labels[3]
+    assert labels[0] != labels[2]
+
+
+def test_summarize_cluster_prefers_user_messages():
+    items = [
+        {"content": "我的猫叫团子", "metadata": {"role": "user", "emotion": "joy", "emotion_confidence": 0.8, "timestamp_ts": 1.0}},
+        {"content": "团子真可爱", "metadata": {"role": "assistant", "timestamp_ts": 2.0}},
+    ]
+    summary = summarize_cluster(items, np.array([[1.0, 0.0], [1.0, 0.1]]))
+    assert summary["summary_text"] == "2条对话的摘要：我的猫叫团子"
+    assert summary["emotional_tone"] == "joy"
+    assert summary["timestamp_ts"] == 2.0
+    assert summary["source_count"] == 2
+    assert "团子" in summary["key_topics"]
+
+
+class FakeMemoryManager:
+    """返回固定的待整合会话，记录生成的摘要和整合截止时间；save_summaries 为假时摘要保存失败"""
+
+    def __init__(self, sessions, save_summaries=True):
+        self.sessions = sessions
+        self.save_summaries = save_summaries
+        self.summaries = []
+        self.marked = []
+
+    async def get_sessions_for_consolidation(self, older_than, limit=50):
+        return self.sessions[:limit]
+
+    async def create_memory_summary(self, **summary):
+        if not self.save_summaries:
+            return False
+        self.summaries.append(summary)
+        return True
+
+    async def mark_session_consolidated(self, user_id, session_id, until):
+        self.marked.append((user_id, session_id, until))
+        return True
+
+
+def add_old_turns(knowledge_base, now, start=0, count=8):
+    """写入 count 条两天前的对话（两个话题交替）"""
+    old = [
+        np.array([1.0, 0.0, 0.05 * i]) if i % 2 else np.array([0.0, 1.0, 0.05 * i])
+        for i in range(start, start + count)
+    ]
+    knowledge_base.add_knowledge_batch(
+        contents=[f"旧对话{i}" for i in range(start, start + count)],
+        metadatas=[{"role": "user", "timestamp_ts": now - 48 * HOUR}] * count,
+        user_id="u1",
+        session_id="s1",
+        embeddings=[v.tolist() for v in old]
+    )
+
+
+def build_session(tmp_path, now):
+    knowledge_base = KnowledgeBase()
+    knowledge_base._vector_store = MmapVectorStore(str(tmp_path), dtype="float32")
+    # 同一会话：8 条两天前的对话（两个话题）和 2 条刚发生的对话
+    add_old_turns(knowledge_base, now)
+    knowledge_base.add_knowledge_batch(
+        contents=["新对话0", "新对话1"],
+        metadatas=[{"role": "user", "timestamp_ts": now}] * 2,
+        user_id="u1",
+        session_id="s1",
+        embeddings=[[0.0, 0.0, 1.0]] * 2
+    )
+    return knowledge_base
+
+
+def test_active_session_consolidates_only_old_turns(tmp_path):
+    now = time.time()
+    knowledge_base = build_session(tmp_path, now)
+    memory_manager = FakeMemoryManager([{"user_id": "u1", "session_id": "s1"}])
+    worker = ConsolidationWorker(memory_manager, knowledge_base, min_age_hours=24, min_items=8, ratio=4)
+    try:
+        result = asyncio.run(worker.run_once())
+    finally:
+        knowledge_base.close()
+
+    assert result == {"sessions": 1, "summaries": 2}
+    remaining = knowledge_base.vector_store.get(where={"user_id": "u1"})
+    assert sorted(item["content"] for item in remaining if item["metadata"]["content_type"] != "summary") == [
+        "新对话0", "新对话1"
+    ]
+    assert len(memory_manager.summaries) == 2
+    # 整合截止时间作为会话的整合水位，之后的新对话在下次整合
+    (_, _, until), = memory_manager.marked
+    assert abs(until.timestamp() - (now - 24 * HOUR)) < 60
+
+
+def test_summaries_are_consolidated_again(tmp_path):
+    now = time.time()
+    knowledge_base = build_session(tmp_path, now)
+    memory_manager = FakeMemoryManager([{"user_id": "u1", "session_id": "s1"}])
+    worker = ConsolidationWorker(memory_manager, knowledge_base, min_age_hours=24, min_items=8, ratio=4)
+    try:
+        asyncio.run(worker.run_once())
+        add_old_turns(knowledge_base, now, start=8)
+        asyncio.run(worker.run_once())
+    finally:
+        knowledge_base.close()
+
+    old = [
+        item for item in knowledge_base.vector_store.get(where={"user_id": "u1"})
+        if not item["content"].startswith("新对话")
+    ]
+    summaries = [item for item in old if item["metadata"]["content_type"] == "summary"]
+    # 第一轮的两条摘要与新的对话合并，而不是在旁边继续累积
+    assert len(old) <= 3
+    assert sum(item["metadata"].get("source_count", 1) for item in old) == 16
+    # 再次整合的摘要只引用原始语句，不嵌套旧摘要的文本
+    assert summaries and all(item["content"].count("摘要：") == 1 for item in summaries)
+
+
+def test_failed_summary_write_keeps_source_items(tmp_path):
+    now = time.time()
+    knowledge_base = build_session(tmp_path, now)
+    memory_manager = FakeMemoryManager([{"user_id": "u1", "session_id": "s1"}], save_summaries=False)
+    worker = ConsolidationWorker(memory_manager, knowledge_base, min_age_hours=24, min_items=8, ratio=4)
+    try:
+        result = asyncio.run(worker.run_once())
+    finally:
+        knowledge_base.close()
+
+    assert result == {"sessions": 1, "summaries": 0}
+    remaining = knowledge_base.vector_store.get(where={"user_id": "u1"})
+    assert len(remaining) == 10
+    assert all(item["metadata"]["content_type"] != "summary" for item in remaining)
+    # 会话不标记为已整合，下一轮重试
+    assert memory_manager.marked == []
+    stats = worker.get_stats()
+    assert stats["consolidated_items"] == 0
+    assert stats["failures"] == 1
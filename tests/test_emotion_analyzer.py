@@ -0,0 +1,54 @@
+"""
+EmotionAnalyzer 测试：逐条分析、批量分析与旧实现（逐关键词 re.findall）结果一致
+"""
+import pytest
+
+from tests.emotion_samples import SAMPLE_SENTENCES, build_messages, legacy_scores
+from emotion.analyzer import EmotionAnalyzer, EmotionType
+
+TEXTS = SAMPLE_SENTENCES + build_messages(20, 300) + [
+    "",
+    "好的，谢谢",
+    "不行，没有",
+    "可以不",
+    "爱爱爱，恨",
+]
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return EmotionAnalyzer()
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_single_matches_baseline(analyzer, text):
+    emotion_type, confidence = legacy_scores(analyzer, text)
+    result = analyzer.analyze_emotion(text)
+    assert result.emotion == emotion_type
+    assert result.confidence == pytest.approx(confidence)
+
+
+def test_batch_matches_single(analyzer):
+    singles = [analyzer.analyze_emotion(text) for text in TEXTS]
+    batch = analyzer.analyze_emotions(TEXTS)
+    assert [result.emotion for result in batch] == [result.emotion for result in singles]
+    assert [result.confidence for result in batch] == pytest.approx([result.confidence for result in singles])
+
+
+def test_batch_empty(analyzer):
+    assert analyzer.analyze_emotions([]) == []
+
+
+def test_result_carries_emoji_and_description(analyzer):
+    result = analyzer.analyze_emotion("今天真开心")
+    assert result.emotion == EmotionType.JOY
+    assert result.emoji == analyzer.emotion_emojis[EmotionType.JOY]
+    assert result.description == analyzer.emotion_descriptions[EmotionType.JOY]
+
+
+def test_recompile_after_keyword_change():
+    analyzer = EmotionAnalyzer()
+    analyzer.emotion_keywords[EmotionType.JOY].append("耶")
+    analyzer.compile_keywords()
+    assert analyzer.analyze_emotion("耶").emotion == EmotionType.JOY
+    assert analyzer.analyze_emotions(["耶"])[0].emotion == EmotionType.JOY
@@ -0,0 +1,67 @@
+"""
+BoundedExecutor 测试：结果返回、名额限制，以及调用方取消后名额在任务真正结束时才释放
+"""
+import asyncio
+import threading
+
+import pytest
+
+from core.executor import BoundedExecutor
+
+
+def test_run_returns_result_and_records_failures():
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1)
+        try:
+            assert await executor.run(pow, 2, 10) == 1024
+            with pytest.raises(ZeroDivisionError):
+                await executor.run(divmod, 1, 0)
+            return executor.get_stats()
+        finally:
+            executor.shutdown()
+
+    stats = asyncio.run(scenario())
+    assert (stats["completed"], stats["failed"], stats["in_flight"]) == (1, 1, 0)
+
+
+def test_slots_bound_concurrent_tasks():
+    release = threading.Event()
+
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1, max_queue_size=1)
+        try:
+            tasks = [asyncio.create_task(executor.run(release.wait)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            stats = executor.get_stats()
+            release.set()
+            await asyncio.gather(*tasks)
+            return stats
+        finally:
+            executor.shutdown()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["queue_depth"], stats["waiting_for_slot"]) == (2, 1, 1)
+
+
+def test_cancelled_caller_keeps_slot_until_worker_finishes():
+    release = threading.Event()
+
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1, max_queue_size=0)
+        try:
+            task = asyncio.create_task(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # 工作线程仍在执行，名额未释放
+            while_running = executor.get_stats()["in_flight"]
+            release.set()
+            assert await executor.run(pow, 3, 2) == 9
+            return while_running, executor.get_stats()
+        finally:
+            executor.shutdown()
+
+    while_running, stats = asyncio.run(scenario())
+    assert while_running == 1
+    assert (stats["in_flight"], stats["completed"]) == (0, 2)
@@ -0,0 +1,59 @@
+"""
+批量导入测试：文本切分与按文件类型读取记录
+"""
+import json
+
+from rag.ingestion import chunk_text, iter_records
+
+
+def test_short_text_is_single_chunk():
+    assert chunk_text("  你好。  ", 10) == ["你好。"]
+
+
+def test_empty_text():
+    assert chunk_text("   ", 10) == []
+
+
+def test_chunks_respect_size_and_sentence_boundaries():
+    text = "第一句话。第二句话。第三句话。"
+    chunks = chunk_text(text, 10)
+    assert chunks == ["第一句话。第二句话。", "第三句话。"]
+    assert all(len(chunk) <= 10 for chunk in chunks)
+
+
+def test_long_sentence_is_hard_split():
+    text = "啊" * 25
+    chunks = chunk_text(text, 10)
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+def test_overlap_keeps_context():
+    text = "一二三四五。六七八九十。甲乙丙丁戊。"
+    chunks = chunk_text(text, 12, overlap=3)
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.startswith(previous[-3:])
+    assert all(len(chunk) <= 12 for chunk in chunks)
+
+
+def test_markdown_paragraphs_carry_section(tmp_path):
+    path = tmp_path / "kb.md"
+    path.write_text("前言\n\n# 设定\n第一段\n续行\n\n第二段\n", encoding="utf-8")
+    assert list(iter_records(str(path))) == [
+        ("前言", {}),
+        ("第一段\n续行", {"section": "设定"}),
+        ("第二段", {"section": "设定"}),
+    ]
+
+
+def test_jsonl_skips_invalid_lines_and_keeps_scalar_metadata(tmp_path):
+    path = tmp_path / "kb.jsonl"
+    lines = [
+        json.dumps({"content": "甲", "metadata": {"tag": "x", "nested": {"a": 1}}}, ensure_ascii=False),
+        "not json",
+        json.dumps({"text": "乙"}, ensure_ascii=False),
+        json.dumps({"other": 1}),
+    ]
+    path.write_text("\n".join(lines), encoding="utf-8")
+    assert list(iter_records(str(path))) == [("甲", {"tag": "x"}), ("乙", {})]
@@ -0,0 +1,63 @@
+"""
+KeywordMatcher 测试：计数结果与逐关键词 re.findall 一致
+"""
+import re
+
+import pytest
+
+from core.keyword_matcher import KeywordMatcher
+from emotion.analyzer import EmotionAnalyzer
+
+TEXTS = [
+    "",
+    "今天真的好开心，和朋友一起去看了电影",
+    "不要这样，这样不好，不行不行",
+    "不敢相信！太意外了，我好惊讶，真的不敢相信",
+    "爱心爱心，我很喜欢也很喜爱，心动了",
+    "好好好好好",
+    "Hello HELLO hello，HI",
+    "aaaa",
+]
+
+
+def baseline_counts(keywords, text):
+    text = text.lower()
+    return [len(re.findall(re.escape(keyword), text)) for keyword in keywords]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_emotion_keywords_match_findall(text):
+    analyzer = EmotionAnalyzer()
+    matcher = KeywordMatcher({
+        **analyzer.emotion_keywords,
+        "positive": analyzer.positive_indicators,
+        "negative": analyzer.negative_indicators
+    })
+    assert matcher.count_keywords(text) == baseline_counts(matcher.keywords, text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_overlapping_keywords_match_findall(text):
+    # 互相包含、首尾相接的关键词分到不同层，各自的计数互不影响
+    matcher = KeywordMatcher({"a": ["aa", "a", "aaa"], "b": ["hello", "hell", "lo", "hi"], "c": ["不", "不好", "好"]})
+    assert matcher.count_keywords(text) == baseline_counts(matcher.keywords, text)
+
+
+def test_overlapping_keywords_use_separate_passes():
+    matcher = KeywordMatcher({"a": ["不", "不好", "开心"]})
+    assert matcher.passes == 2
+
+
+def test_count_groups_sums_shared_keywords():
+    matcher = KeywordMatcher({"joy": ["好", "开心"], "positive": ["好"]})
+    assert matcher.count_groups("好开心，好") == {"joy": 3, "positive": 2}
+
+
+def test_find_groups_lists_keywords_in_registration_order():
+    matcher = KeywordMatcher({"joy": ["开心", "好"], "anger": ["生气"]})
+    assert matcher.find_groups("好开心") == {"joy": ["开心", "好"]}
+
+
+def test_case_sensitive():
+    matcher = KeywordMatcher({"greeting": ["Hi"]}, case_sensitive=True)
+    assert matcher.count_keywords("Hi hi HI") == [1]
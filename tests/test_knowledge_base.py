@@ -0,0 +1,21 @@
+"""
+KnowledgeBase 测试：共享知识按排名并入用户记忆
+"""
+from rag.knowledge_base import KnowledgeBase
+
+
+def memory(item_id, similarity=None, **fields):
+    return {"id": item_id, "content": item_id, "metadata": {}, "similarity": similarity, **fields}
+
+
+def test_merge_shared_keeps_user_order():
+    # 用户记忆已按 MMR/融合排名排序，只由词法检索命中的条目没有相似度
+    memories = [memory("lexical", term_coverage=1.0), memory("u-low", 0.4), memory("u-high", 0.9)]
+    shared = [memory("s1", 0.95), memory("s2", 0.8)]
+    merged = KnowledgeBase._merge_shared(memories, shared, 4)
+    assert [item["id"] for item in merged] == ["lexical", "s1", "u-low", "s2"]
+
+
+def test_merge_shared_drops_irrelevant_shared_items():
+    memories = [memory("u", 0.5)]
+    assert KnowledgeBase._merge_shared(memories, [memory("s", 0.1)], 3) == memories
@@ -0,0 +1,76 @@
+"""
+词法索引测试：中文二元组分词、按用户的 BM25 检索、增量更新，以及倒数排名融合
+"""
+import pytest
+
+from rag.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def loaded_index(items):
+    index = LexicalIndex()
+    index.ensure_loaded("u1", lambda uid: [item for item in items if item["metadata"]["user_id"] == uid])
+    return index
+
+
+ITEMS = [
+    {"id": "a", "content": "我养了一只叫团子的猫", "metadata": {"user_id": "u1"}},
+    {"id": "b", "content": "今天天气很好", "metadata": {"user_id": "u1"}},
+    {"id": "c", "content": "团子喜欢吃鱼", "metadata": {"user_id": "u2"}},
+]
+
+
+def test_tokenize_bigrams_and_words():
+    assert tokenize("团子 Hello猫") == ["团子", "猫", "hello"]
+
+
+def test_search_is_per_user():
+    index = loaded_index(ITEMS)
+    results = index.search("团子", "u1", 5)
+    assert [item["id"] for item in results] == ["a"]
+    assert results[0]["term_coverage"] == 1.0
+    assert index.search("团子", "u2", 5) == []
+
+
+def test_incremental_add_and_remove():
+    index = loaded_index(ITEMS)
+    index.add(["d"], ["团子今天生病了"], [{"user_id": "u1"}])
+    assert {item["id"] for item in index.search("团子", "u1", 5)} == {"a", "d"}
+    index.remove(["a"])
+    assert [item["id"] for item in index.search("团子", "u1", 5)] == ["d"]
+
+
+def test_least_recently_used_user_is_evicted():
+    index = LexicalIndex(max_users=1)
+    index.ensure_loaded("u1", lambda uid: ITEMS[:2])
+    index.ensure_loaded("u2", lambda uid: ITEMS[2:])
+    assert index.search("团子", "u1", 5) == []
+    assert index.get_stats()["evictions"] == 1
+
+
+def test_scores_sum_over_lists():
+    fused = reciprocal_rank_fusion(
+        [[{"id": "a"}, {"id": "b"}], [{"id": "b"}, {"id": "c"}]],
+        n_results=3,
+        k=60
+    )
+    assert [item["id"] for item in fused] == ["b", "a", "c"]
+    assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[1]["score"] == pytest.approx(1 / 61)
+
+
+def test_fields_are_merged_first_list_wins():
+    fused = reciprocal_rank_fusion(
+        [[{"id": "a", "similarity": 0.9}], [{"id": "a", "similarity": 0.1, "term_coverage": 1.0}]],
+        n_results=1
+    )
+    assert fused[0]["similarity"] == 0.9
+    assert fused[0]["term_coverage"] == 1.0
+
+
+def test_truncates_to_n_results():
+    fused = reciprocal_rank_fusion([[{"id": str(i)} for i in range(10)]], n_results=3)
+    assert [item["id"] for item in fused] == ["0", "1", "2"]
+
+
+def test_empty_lists():
+    assert reciprocal_rank_fusion([[], []], n_results=5) == []
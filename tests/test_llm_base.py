@@ -0,0 +1,51 @@
+"""
+思维链解析测试：逐字符流式解析与非流式解析结果一致
+"""
+import pytest
+
+from llm.base import ThinkingStreamParser, parse_thinking
+
+CASES = [
+    "<thinking>\n步骤1\n步骤2\n</thinking>\n\n回答",
+    "  <thinking>思考</thinking>回答",
+    "前言<thinking>思考</thinking>回答",
+    "普通回答",
+    "<thinking>未闭合\n步骤",
+    "前言\n<thinking>步骤1\n步骤2",
+    "回答末尾<think",
+    "a <b> <thinking>思考</thinking> c",
+    "",
+]
+
+
+@pytest.mark.parametrize("content", CASES)
+def test_stream_matches_non_stream(content):
+    parser = ThinkingStreamParser()
+    for char in content:
+        parser.feed(char)
+    parser.finish()
+    assert (parser.content.strip(), parser.thinking_process or None) == parse_thinking(content)
+
+
+def test_thinking_anywhere():
+    assert parse_thinking("<thinking>\n步骤1\n</thinking>\n回答") == ("回答", ["步骤1"])
+    assert parse_thinking("前言<thinking>思考</thinking>回答") == ("前言回答", ["思考"])
+
+
+def test_unclosed_thinking_is_kept_as_content():
+    assert parse_thinking("<thinking>\n步骤1\n步骤2") == ("<thinking>\n步骤1\n步骤2", None)
+    assert parse_thinking("前言<thinking>步骤1") == ("前言<thinking>步骤1", None)
+
+    parser = ThinkingStreamParser()
+    chunks = parser.feed("<thinking>\n步骤1\n步")
+    chunks += parser.feed("骤2")
+    chunks += parser.finish()
+    assert [chunk.type for chunk in chunks] == ["thinking", "content"]
+    assert chunks[-1].content == "<thinking>\n步骤1\n步骤2"
+    assert parser.thinking_process == []
+
+
+def test_disabled():
+    assert parse_thinking("<thinking>思考</thinking>回答", enable_thinking=False) == (
+        "<thinking>思考</thinking>回答", None
+    )
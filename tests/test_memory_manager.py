@@ -0,0 +1,206 @@
+"""
+MemoryManager 测试：并发的首次请求只创建一条会话，重试写入消息不重复计数，
+尚未迁移的旧会话合并内嵌消息和新消息
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from memory.manager import MemoryManager
+from memory.models import ConversationMessage, PersonaState
+
+
+class RacingConversations:
+    """模拟 conversations 集合：upsert 的请求都查不到会话后才插入，后插入的一方触发唯一索引冲突"""
+
+    def __init__(self, racers):
+        self.documents = {}
+        self.inserts = 0
+        self._racers = racers
+        self._all_missed = asyncio.Event()
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=None):
+        key = (query["user_id"], query["session_id"])
+        document = self.documents.get(key)
+        if document is None and upsert:
+            self._racers -= 1
+            if self._racers <= 0:
+                self._all_missed.set()
+            await self._all_missed.wait()
+            if key in self.documents:
+                raise DuplicateKeyError("E11000 duplicate key error")
+            document = {**query, **update["$setOnInsert"]}
+            self.documents[key] = document
+            self.inserts += 1
+        if document is None:
+            return None
+        document.update(update["$set"])
+        return {field: document[field] for field in projection if field in document}
+
+
+def _persona(mood):
+    return PersonaState(personality_type="gentle", traits={"warmth": 0.8}, mood=mood)
+
+
+def test_concurrent_first_requests_create_one_session():
+    async def scenario():
+        manager = MemoryManager()
+        manager.conversations = RacingConversations(racers=2)
+
+        first, second = await asyncio.gather(
+            manager.upsert_session_with_persona("u1", "s1", _persona("happy")),
+            manager.upsert_session_with_persona("u1", "s1", _persona("sad")),
+        )
+
+        assert manager.conversations.inserts == 1
+        assert first is not None and second is not None
+        assert first.id == second.id
+        assert first.persona_state.mood == second.persona_state.mood
+
+    asyncio.run(scenario())
+
+
+def test_existing_session_keeps_its_persona():
+    async def scenario():
+        manager = MemoryManager()
+        manager.conversations = RacingConversations(racers=1)
+
+        created = await manager.upsert_session_with_persona("u1", "s1", _persona("happy"))
+        loaded = await manager.upsert_session_with_persona("u1", "s1", _persona("sad"))
+
+        assert manager.conversations.inserts == 1
+        assert loaded.id == created.id
+        assert loaded.persona_state.mood == "happy"
+        assert loaded.messages == []
+
+    asyncio.run(scenario())
+
+
+def evaluate(expression, document):
+    """计算测试用到的聚合表达式（$max、$add、$size、$ifNull 和字段引用）"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, dict):
+        (operator, args), = expression.items()
+        if operator == "$size":
+            return len(evaluate(args, document))
+        values = [evaluate(arg, document) for arg in args]
+        if operator == "$ifNull":
+            return values[0] if values[0] is not None else values[1]
+        return {"$max": max, "$add": sum}[operator](values)
+    return expression
+
+
+class FakeConversations:
+    """单个会话文档；fail_updates 为前 N 次更新抛出异常"""
+
+    def __init__(self, document, fail_updates=0):
+        self.document = document
+        self.fail_updates = fail_updates
+
+    def _matches(self, query):
+        return all(self.document.get(key) == value for key, value in query.items() if not key.startswith("messages"))
+
+    async def update_one(self, query, pipeline):
+        if self.fail_updates > 0:
+            self.fail_updates -= 1
+            raise ConnectionError("mongo down")
+        if not self._matches(query):
+            return type("Result", (), {"matched_count": 0})()
+        for stage in pipeline:
+            updates = {key: evaluate(value, self.document) for key, value in stage["$set"].items()}
+            self.document.update(updates)
+        return type("Result", (), {"matched_count": 1})()
+
+    async def find_one(self, query, projection):
+        if not self._matches(query) or not self.document.get("messages"):
+            return None
+        return {"messages": self.document["messages"][projection["messages"]["$slice"]:]}
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self.documents.sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self.documents = self.documents[:limit]
+        return self
+
+    async def to_list(self, length=None):
+        return [{key: value for key, value in document.items() if key not in ("_id", "user_id", "session_id")}
+                for document in self.documents]
+
+
+class FakeMessages:
+    """按 _id 保存消息；fail_writes 为前 N 次批量写入抛出异常"""
+
+    def __init__(self, fail_writes=0):
+        self.documents = {}
+        self.fail_writes = fail_writes
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail_writes > 0:
+            self.fail_writes -= 1
+            raise ConnectionError("mongo down")
+        for operation in operations:
+            message_id = operation._filter["_id"]
+            if message_id not in self.documents:
+                self.documents[message_id] = {"_id": message_id, **operation._doc["$setOnInsert"]}
+
+    async def count_documents(self, query):
+        return len(self.find(query).documents)
+
+    def find(self, query, projection=None):
+        return FakeCursor([
+            document for document in self.documents.values()
+            if all(document.get(key) == value for key, value in query.items())
+        ])
+
+
+def turn(minutes):
+    timestamp = datetime(2026, 1, 1) + timedelta(minutes=minutes)
+    return [
+        ConversationMessage(role="user", content=f"问题{minutes}", timestamp=timestamp),
+        ConversationMessage(role="assistant", content=f"回答{minutes}", timestamp=timestamp + timedelta(seconds=1)),
+    ]
+
+
+def test_retried_add_messages_counts_each_message_once():
+    async def scenario():
+        manager = MemoryManager()
+        manager.conversations = FakeConversations({"user_id": "u1", "session_id": "s1"}, fail_updates=1)
+        manager.messages = FakeMessages(fail_writes=1)
+        messages = turn(0)
+
+        # 第一次消息写入失败，第二次消息已写入但计数更新失败，第三次成功
+        assert not await manager.add_messages("u1", "s1", messages)
+        assert not await manager.add_messages("u1", "s1", messages)
+        assert await manager.add_messages("u1", "s1", messages)
+        assert await manager.add_messages("u1", "s1", turn(1))
+
+        assert len(manager.messages.documents) == 4
+        assert manager.conversations.document["message_count"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_recent_messages_merge_legacy_embedded_messages():
+    async def scenario():
+        manager = MemoryManager()
+        legacy = [message.dict() for message in turn(0) + turn(1)]
+        manager.conversations = FakeConversations({"user_id": "u1", "session_id": "s1", "messages": legacy})
+        manager.messages = FakeMessages()
+
+        assert await manager.add_messages("u1", "s1", turn(2))
+        recent = await manager.get_recent_messages("u1", "s1", limit=3)
+
+        assert [message.content for message in recent] == ["回答1", "问题2", "回答2"]
+        assert manager.conversations.document["message_count"] == 6
+
+    asyncio.run(scenario())
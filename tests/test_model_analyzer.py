@@ -0,0 +1,156 @@
+"""
+ModelEmotionAnalyzer 测试：超出延迟预算、推理出错或进程池损坏时回退到关键词分析，标签映射解析
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from emotion import model_analyzer
+from emotion.analyzer import EmotionAnalyzer, EmotionType
+from emotion.model_analyzer import ModelEmotionAnalyzer, parse_label_mapping
+
+TEXTS = ["今天好开心", "我好难过", "真让人生气"]
+
+
+class FakeModel:
+    """代替工作进程中的 _classify：所有文本判为 sadness，可按文本出错或等待放行"""
+
+    def __init__(self, error=None, failing_text=None, gate=None):
+        self.error = error
+        self.failing_text = failing_text
+        self.gate = gate
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None and (self.failing_text is None or self.failing_text in texts):
+            raise self.error
+        return [("Sadness", 0.91234) for _ in texts]
+
+
+@pytest.fixture
+def keyword_analyzer():
+    return EmotionAnalyzer()
+
+
+def build_analyzer(keyword_analyzer, monkeypatch, model, **kwargs):
+    monkeypatch.setattr(model_analyzer, "_classify", model)
+    analyzer = ModelEmotionAnalyzer(
+        keyword_analyzer,
+        model_name="fake-model",
+        processes=1,
+        max_wait=0,
+        cache_size=100,
+        label_mapping="sadness:sadness",
+        **kwargs
+    )
+    # 线程池代替进程池，使替换后的 _classify 生效
+    analyzer._pool = ThreadPoolExecutor(max_workers=1)
+    return analyzer
+
+
+def test_model_result_uses_label_mapping_and_cache(keyword_analyzer, monkeypatch):
+    async def scenario():
+        model = FakeModel()
+        analyzer = build_analyzer(keyword_analyzer, monkeypatch, model)
+
+        first = await analyzer.aanalyze_emotion(TEXTS[0])
+        second = await analyzer.aanalyze_emotion(TEXTS[0])
+        await analyzer.stop()
+
+        assert first.emotion == EmotionType.SADNESS
+        assert first.confidence == 0.9123
+        assert second == first
+        assert model.calls == 1
+        assert analyzer.get_stats()["model_results"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_timeout_falls_back_and_caches_late_result(keyword_analyzer, monkeypatch):
+    async def scenario():
+        gate = threading.Event()
+        analyzer = build_analyzer(keyword_analyzer, monkeypatch, FakeModel(gate=gate), latency_budget_ms=20)
+
+        result = await analyzer.aanalyze_emotion(TEXTS[0])
+        assert result == keyword_analyzer.analyze_emotion(TEXTS[0])
+        assert analyzer.get_stats()["timeouts"] == 1
+
+        # 超时的计算在后台完成后写入缓存，之后的请求直接命中模型结果
+        gate.set()
+        for _ in range(100):
+            if analyzer._cache.get(analyzer._key(TEXTS[0])) is not None:
+                break
+            await asyncio.sleep(0.01)
+        late = await analyzer.aanalyze_emotion(TEXTS[0])
+        await analyzer.stop()
+
+        assert late.emotion == EmotionType.SADNESS
+
+    asyncio.run(scenario())
+
+
+def test_error_falls_back_to_keyword_result(keyword_analyzer, monkeypatch):
+    async def scenario():
+        analyzer = build_analyzer(keyword_analyzer, monkeypatch, FakeModel(error=RuntimeError("inference failed")))
+
+        result = await analyzer.aanalyze_emotion(TEXTS[1])
+        await analyzer.stop()
+
+        assert result == keyword_analyzer.analyze_emotion(TEXTS[1])
+        stats = analyzer.get_stats()
+        assert stats["errors"] == 1
+        assert stats["available"] is True
+
+    asyncio.run(scenario())
+
+
+def test_broken_pool_disables_model(keyword_analyzer, monkeypatch):
+    async def scenario():
+        model = FakeModel(error=BrokenProcessPool("worker exited"))
+        analyzer = build_analyzer(keyword_analyzer, monkeypatch, model)
+
+        first = await analyzer.aanalyze_emotion(TEXTS[0])
+        second = await analyzer.aanalyze_emotion(TEXTS[1])
+        batch = await analyzer.aanalyze_emotions(TEXTS)
+        await analyzer.stop()
+
+        assert first == keyword_analyzer.analyze_emotion(TEXTS[0])
+        assert second == keyword_analyzer.analyze_emotion(TEXTS[1])
+        assert batch == keyword_analyzer.analyze_emotions(TEXTS)
+        assert model.calls == 1
+        stats = analyzer.get_stats()
+        assert stats["available"] is False
+        assert stats["errors"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_batch_error_falls_back_for_whole_batch(keyword_analyzer, monkeypatch):
+    async def scenario():
+        model = FakeModel(error=RuntimeError("inference failed"), failing_text=TEXTS[2])
+        analyzer = build_analyzer(keyword_analyzer, monkeypatch, model, max_batch_size=1)
+
+        results = await analyzer.aanalyze_emotions(TEXTS)
+        await analyzer.stop()
+
+        # 只有一条文本出错，整批仍然全部使用关键词分析
+        assert results == keyword_analyzer.analyze_emotions(TEXTS)
+        assert model.calls == len(TEXTS)
+        stats = analyzer.get_stats()
+        assert stats["errors"] == 1
+        assert stats["model_results"] == 0
+        assert stats["available"] is True
+
+    asyncio.run(scenario())
+
+
+def test_parse_label_mapping_skips_invalid_pairs():
+    mapping = parse_label_mapping(" Joy:joy, optimism:POSITIVE,,anticipation:unknown")
+
+    assert mapping == {"joy": EmotionType.JOY, "optimism": EmotionType.POSITIVE}
@@ -0,0 +1,111 @@
+"""
+分区向量存储测试：路由结果确定且符合命名规则，带 user_id 的操作只访问一个分区，不带时遍历所有分区
+"""
+import pytest
+
+from rag.partition import PartitionedVectorStore, PartitionRouter
+from rag.vector_store import MmapVectorStore
+
+
+def test_user_strategy_routes_each_user_to_its_own_partition():
+    router = PartitionRouter("knowledge", strategy="user")
+
+    assert router.route("alice") == router.route("alice")
+    assert router.route("alice") != router.route("bob")
+    assert router.route("alice").startswith("knowledge__u")
+    assert router.route(None) == router.route("") == "knowledge__shared"
+
+
+def test_hash_strategy_routes_users_to_fixed_shards():
+    router = PartitionRouter("knowledge", strategy="hash", num_shards=4)
+    names = {router.route(f"user{i}") for i in range(50)}
+
+    assert names <= {f"knowledge__s{shard:03d}" for shard in range(4)}
+    assert router.route("alice") == PartitionRouter("knowledge", strategy="hash", num_shards=4).route("alice")
+
+
+def test_is_partition_checks_the_prefix():
+    router = PartitionRouter("knowledge")
+
+    assert router.is_partition(router.route("alice"))
+    assert not router.is_partition("knowledge_base")
+    assert not router.is_partition("other__shared")
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        PartitionRouter("knowledge", strategy="range")
+
+
+def build_store(tmp_path, strategy="user"):
+    router = PartitionRouter("knowledge", strategy=strategy, num_shards=2)
+    stores = {}
+
+    def store_factory(name):
+        stores[name] = MmapVectorStore(str(tmp_path / name), dtype="float32")
+        return stores[name]
+
+    # 同一数据库中不属于本路由的集合不应被访问
+    store = PartitionedVectorStore(router, store_factory, lambda: list(stores) + ["unrelated"])
+    return store, stores
+
+
+def add_items(store):
+    store.add(
+        ["a1", "a2", "b1", "s1"],
+        [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0], [1.0, 0.0]],
+        ["alice 1", "alice 2", "bob 1", "shared 1"],
+        [
+            {"user_id": "alice", "timestamp_ts": 1.0},
+            {"user_id": "alice", "timestamp_ts": 3.0},
+            {"user_id": "bob", "timestamp_ts": 2.0},
+            {"type": "knowledge", "timestamp_ts": 4.0},
+        ]
+    )
+
+
+def test_add_routes_items_by_user(tmp_path):
+    store, stores = build_store(tmp_path)
+    add_items(store)
+
+    router = store.router
+    assert set(stores) == {router.route("alice"), router.route("bob"), router.route(None)}
+    assert stores[router.route("alice")].count() == 2
+    assert stores[router.route("bob")].count() == 1
+    assert store.count() == 4
+    assert store.list_user_ids() == ["alice", "bob"]
+    assert store.list_user_ids(after="alice") == ["bob"]
+    assert store.list_user_ids(limit=1) == ["alice"]
+    assert store.lists_users_cheaply
+
+
+def test_user_query_reads_only_its_partition(tmp_path):
+    store, stores = build_store(tmp_path)
+    add_items(store)
+
+    results = store.query([1.0, 0.0], 10, where={"user_id": "alice"})
+
+    assert [item["id"] for item in results] == ["a1", "a2"]
+    assert [item["id"] for item in store.get(where={"user_id": "bob"})] == ["b1"]
+
+
+def test_unfiltered_reads_span_all_partitions(tmp_path):
+    store, _ = build_store(tmp_path, strategy="hash")
+    add_items(store)
+
+    assert {item["id"] for item in store.get()} == {"a1", "a2", "b1", "s1"}
+    assert len(store.get(limit=3)) == 3
+    assert [item["id"] for item in store.get_recent(limit=2)] == ["s1", "a2"]
+    assert store.list_user_ids() == ["alice", "bob"]
+    assert store.list_user_ids(after="alice", limit=1) == ["bob"]
+
+
+def test_delete_removes_items_from_their_partitions(tmp_path):
+    store, _ = build_store(tmp_path)
+    add_items(store)
+
+    store.delete(["a1"], where={"user_id": "alice"})
+    store.delete(["b1", "s1"])
+
+    assert [item["id"] for item in store.get()] == ["a2"]
+    assert store.count() == 1
@@ -0,0 +1,38 @@
+"""
+mmr_select 测试
+"""
+import numpy as np
+
+from rag.rerank import mmr_select
+
+
+def test_pure_relevance_orders_by_similarity():
+    query = np.array([1.0, 0.0])
+    candidates = np.array([[0.0, 1.0], [1.0, 0.0], [1.0, 1.0]])
+    assert mmr_select(query, candidates, 3, lambda_mult=1.0, dedup_threshold=1.1) == [1, 2, 0]
+
+
+def test_diversity_prefers_different_candidate():
+    query = np.array([1.0, 0.0])
+    candidates = np.array([[1.0, 0.0], [0.99, 0.14], [0.6, 0.8]])
+    assert mmr_select(query, candidates, 2, lambda_mult=0.3, dedup_threshold=1.1) == [0, 2]
+
+
+def test_near_duplicates_are_dropped():
+    query = np.array([1.0, 0.0])
+    candidates = np.array([[1.0, 0.0], [2.0, 0.001], [0.0, 1.0]])
+    assert mmr_select(query, candidates, 3, lambda_mult=1.0, dedup_threshold=0.95) == [0, 2]
+
+
+def test_empty_and_zero_results():
+    query = np.array([1.0, 0.0])
+    assert mmr_select(query, np.empty((0, 2)), 3) == []
+    assert mmr_select(query, np.array([[1.0, 0.0]]), 0) == []
+
+
+def test_returns_at_most_n_results():
+    rng = np.random.default_rng(0)
+    candidates = rng.normal(size=(20, 8))
+    selected = mmr_select(rng.normal(size=8), candidates, 5, dedup_threshold=1.1)
+    assert len(selected) == 5
+    assert len(set(selected)) == 5
@@ -0,0 +1,135 @@
+"""
+保留策略测试：select_evictions 的淘汰顺序，以及清理任务从向量存储或会话分页获取用户列表
+"""
+import asyncio
+
+import numpy as np
+
+from core.retention import RetentionSweeper
+from rag.knowledge_base import SHARED_USER_ID, KnowledgeBase
+from rag.retention import RetentionPolicy, RetrievalTracker, select_evictions
+from rag.vector_store import MmapVectorStore
+
+NOW = 1_700_000_000.0
+DAY = 86400
+
+
+def item(item_id, age_days, importance=0.0):
+    return {"id": item_id, "metadata": {"timestamp_ts": NOW - age_days * DAY, "importance_score": importance}}
+
+
+def test_inactive_policy_keeps_everything():
+    policy = RetentionPolicy(ttl_days=0, max_items_per_user=0, eviction="importance")
+    assert select_evictions([item("a", 1000)], policy, now=NOW) == []
+
+
+def test_ttl_evicts_expired_items():
+    policy = RetentionPolicy(ttl_days=30, max_items_per_user=0, eviction="importance")
+    items = [item("old", 31), item("new", 1), {"id": "legacy", "metadata": {}}]
+    assert select_evictions(items, policy, now=NOW) == ["old"]
+
+
+def test_cap_evicts_lowest_importance_then_oldest():
+    policy = RetentionPolicy(ttl_days=0, max_items_per_user=2, eviction="importance")
+    items = [item("a", 1, 0.5), item("b", 3, 0.0), item("c", 2, 0.0), item("d", 5, 0.9)]
+    assert select_evictions(items, policy, now=NOW) == ["b", "c"]
+
+
+def test_expired_items_come_first():
+    policy = RetentionPolicy(ttl_days=10, max_items_per_user=1, eviction="importance")
+    items = [item("expired", 20), item("a", 1, 0.1), item("b", 2, 0.5)]
+    assert select_evictions(items, policy, now=NOW) == ["expired", "a"]
+
+
+def test_preset_knowledge_is_never_evicted():
+    policy = RetentionPolicy(ttl_days=10, max_items_per_user=1, eviction="importance")
+    preset = [
+        {"id": f"ingest-{i}", "metadata": {"timestamp_ts": NOW - 20 * DAY, "content_type": "preset"}}
+        for i in range(3)
+    ]
+    items = preset + [item("expired", 20), item("a", 2, 0.1), item("b", 1, 0.5)]
+    # 预设知识既不按时间淘汰，也不占用每用户上限
+    assert select_evictions(items, policy, now=NOW) == ["expired", "a"]
+
+
+def test_lru_uses_last_retrieval_time():
+    policy = RetentionPolicy(ttl_days=0, max_items_per_user=1, eviction="lru")
+    tracker = RetrievalTracker()
+    items = [item("old_but_used", 10), item("new_unused", 1)]
+    tracker.touch(["old_but_used"])
+    assert select_evictions(items, policy, tracker, now=NOW) == ["new_unused"]
+    # 评估淘汰不计入检索记录的命中统计
+    stats = tracker.get_stats()
+    assert stats["hits"] == stats["misses"] == 0
+
+
+def test_mmap_store_lists_users_from_partitions(tmp_path):
+    store = MmapVectorStore(str(tmp_path), dtype="float32")
+    store.add(
+        ["1", "2", "3", "4"],
+        np.eye(4, dtype=np.float32),
+        ["a", "b", "c", "d"],
+        [{"user_id": "u2"}, {"user_id": "u1"}, {"user_id": "u2"}, {}]
+    )
+    assert store.list_user_ids() == ["u1", "u2"]
+    assert store.list_user_ids(after="u1") == ["u2"]
+    assert store.list_user_ids(limit=1) == ["u1"]
+    assert store.lists_users_cheaply
+
+
+def test_sweeper_visits_users_found_in_the_store(tmp_path):
+    knowledge_base = KnowledgeBase()
+    knowledge_base._vector_store = MmapVectorStore(str(tmp_path), dtype="float32")
+    old = {"timestamp_ts": 1.0}
+    knowledge_base.vector_store.add(
+        ["a1", "b1", "c1", "s1"],
+        np.eye(4, dtype=np.float32),
+        ["a", "b", "c", "s"],
+        [{"user_id": "a", **old}, {"user_id": "b", **old}, {"user_id": "c"}, {"user_id": SHARED_USER_ID, **old}]
+    )
+    sweeper = RetentionSweeper(
+        knowledge_base, RetentionPolicy(ttl_days=1, max_items_per_user=0, eviction="importance"), users_per_run=2
+    )
+    try:
+        assert asyncio.run(sweeper.run_once()) == {"users": 2, "deleted": 2}
+        assert asyncio.run(sweeper.run_once()) == {"users": 1, "deleted": 0}
+    finally:
+        knowledge_base.close()
+    # 共享知识不按用户保留策略淘汰
+    assert {item["id"] for item in knowledge_base.vector_store.get()} == {"c1", "s1"}
+    assert sweeper.get_stats()["passes"] == 1
+
+
+class ScanOnlyKnowledgeBase:
+    """列出用户需要扫描全部条目的知识库（如单个 ChromaDB 集合），记录被清理的用户"""
+
+    lists_users_cheaply = False
+
+    def __init__(self):
+        self.visited = []
+
+    async def alist_user_ids(self, after="", limit=100):
+        raise AssertionError("不应扫描向量存储列出用户")
+
+    async def aapply_retention(self, user_id, policy, batch_size, max_deletes):
+        self.visited.append(user_id)
+        return 0
+
+
+def test_sweeper_pages_session_users_when_store_cannot_list_cheaply():
+    session_users = ["a", "b", "c"]
+
+    async def list_session_users(after, limit):
+        return [user_id for user_id in session_users if user_id > after][:limit]
+
+    knowledge_base = ScanOnlyKnowledgeBase()
+    sweeper = RetentionSweeper(
+        knowledge_base,
+        RetentionPolicy(ttl_days=1, max_items_per_user=0, eviction="importance"),
+        users_per_run=2,
+        session_user_ids=list_session_users
+    )
+    asyncio.run(sweeper.run_once())
+    asyncio.run(sweeper.run_once())
+    assert knowledge_base.visited == ["a", "b", "c"]
+    assert sweeper.get_stats()["passes"] == 1
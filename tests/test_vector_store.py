@@ -0,0 +1,160 @@
+"""
+内存映射向量存储测试：分区写入、检索、删除后重新打开结果不变，存储按用户分区并维护计数
+"""
+import numpy as np
+import pytest
+
+from rag.vector_store import MmapVectorStore, _MmapPartition
+
+
+@pytest.fixture
+def vectors():
+    return np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], dtype=np.float32)
+
+
+def write(path, vectors, dtype=np.float32):
+    partition = _MmapPartition(str(path), np.dtype(dtype))
+    written = partition.append(
+        ["a", "b", "c"],
+        vectors,
+        ["文档A", "文档B", "文档C"],
+        [{"kind": "x", "timestamp_ts": 1.0}, {"kind": "y", "timestamp_ts": 3.0}, {"kind": "x", "timestamp_ts": 2.0}]
+    )
+    assert written == 3
+    return partition
+
+
+def test_round_trip(tmp_path, vectors):
+    write(tmp_path, vectors)
+    reopened = _MmapPartition(str(tmp_path), np.dtype(np.float32))
+    items = reopened.get(include_embeddings=True)
+    assert [item["id"] for item in items] == ["a", "b", "c"]
+    assert [item["content"] for item in items] == ["文档A", "文档B", "文档C"]
+    np.testing.assert_array_equal(np.stack([item["embedding"] for item in items]), vectors)
+    assert reopened.count() == 3
+
+
+def test_query_orders_by_distance(tmp_path, vectors):
+    partition = write(tmp_path, vectors)
+    results = partition.query(np.array([0.1, 0.9, 0.0], dtype=np.float32), 2)
+    assert [item["id"] for item in results] == ["b", "a"]
+    assert results[0]["distance"] == pytest.approx(0.02)
+
+
+def test_where_filter_and_recent(tmp_path, vectors):
+    partition = write(tmp_path, vectors)
+    assert [item["id"] for item in partition.get(where={"kind": "x"})] == ["a", "c"]
+    assert [item["id"] for item in partition.get_recent(limit=2)] == ["b", "c"]
+
+
+def test_duplicate_ids_are_not_rewritten(tmp_path, vectors):
+    partition = write(tmp_path, vectors)
+    assert partition.append(["a"], vectors[:1], ["重复"], [{}]) == 0
+    assert partition.count() == 3
+
+
+def test_deletes_survive_reopen(tmp_path, vectors):
+    partition = write(tmp_path, vectors)
+    assert partition.mark_deleted(["b", "missing"]) == 1
+    assert partition.mark_deleted(["b"]) == 0
+    reopened = _MmapPartition(str(tmp_path), np.dtype(np.float32))
+    assert [item["id"] for item in reopened.get()] == ["a", "c"]
+    assert reopened.count() == 2
+
+
+def test_dimension_mismatch_is_rejected(tmp_path, vectors):
+    partition = write(tmp_path, vectors)
+    with pytest.raises(ValueError):
+        partition.append(["d"], np.ones((1, 4), dtype=np.float32), ["D"], [{}])
+
+
+def test_float16_round_trip(tmp_path, vectors):
+    write(tmp_path, vectors, np.float16)
+    reopened = _MmapPartition(str(tmp_path), np.dtype(np.float32))
+    assert reopened.dtype == np.float16
+    items = reopened.get(include_embeddings=True)
+    np.testing.assert_allclose(np.stack([item["embedding"] for item in items]), vectors)
+
+
+def add_users(store, vectors):
+    store.add(
+        ["u1-a", "u2-a", "u1-b"],
+        vectors,
+        ["用户1A", "用户2A", "用户1B"],
+        [{"user_id": "u1"}, {"user_id": "u2"}, {"user_id": "u1"}]
+    )
+
+
+def test_store_routes_by_user(tmp_path, vectors):
+    store = MmapVectorStore(str(tmp_path), dtype="float32")
+    add_users(store, vectors)
+    results = store.query(vectors[1], 3, where={"user_id": "u1"})
+    assert [item["id"] for item in results] == ["u1-a", "u1-b"]
+    assert {item["id"] for item in store.get()} == {"u1-a", "u2-a", "u1-b"}
+
+
+def test_store_count_is_kept_without_loading_partitions(tmp_path, vectors):
+    store = MmapVectorStore(str(tmp_path), dtype="float32")
+    add_users(store, vectors)
+    store.delete(["u1-a"], where={"user_id": "u1"})
+    reopened = MmapVectorStore(str(tmp_path), dtype="float32")
+    assert reopened.count() == 2
+    assert reopened.get_stats()["partitions_loaded"] == 0
+    # 计数保存在各分区自己的目录中，不存在全局计数文件
+    assert not [p for p in tmp_path.iterdir() if p.is_file()]
+    assert sorted(
+        _MmapPartition.stored_count(str(p)) for p in tmp_path.iterdir() if p.is_dir()
+    ) == [1, 1]
+
+
+def test_store_counts_partitions_without_count_file(tmp_path, vectors):
+    store = MmapVectorStore(str(tmp_path), dtype="float32")
+    add_users(store, vectors)
+    for count_file in tmp_path.glob("*/count.json"):
+        count_file.unlink()
+    assert MmapVectorStore(str(tmp_path), dtype="float32").count() == 3
+
+
+def test_store_bounds_open_partitions(tmp_path, vectors):
+    store = MmapVectorStore(str(tmp_path), dtype="float32", max_open_partitions=1)
+    add_users(store, vectors)
+    assert store.get_stats()["partitions_loaded"] == 1
+    assert len(store.get(where={"user_id": "u2"})) == 1
+
+
+def test_compaction_reclaims_deleted_rows(tmp_path, vectors):
+    partition = write(tmp_path, vectors)
+    partition.mark_deleted(["a"])
+    assert partition.compact() == 1
+    assert partition.generation == 1
+    assert sorted(p.name for p in tmp_path.iterdir() if p.suffix in (".bin", ".jsonl")) == [
+        "meta.1.jsonl", "vectors.1.bin"
+    ]
+    assert partition._ids == ["b", "c"]
+    assert [item["id"] for item in partition.query(vectors[2], 1)] == ["c"]
+    reopened = _MmapPartition(str(tmp_path), np.dtype(np.float32))
+    items = reopened.get(include_embeddings=True)
+    assert [item["id"] for item in items] == ["b", "c"]
+    np.testing.assert_array_equal(np.stack([item["embedding"] for item in items]), vectors[1:])
+
+
+def test_compaction_is_picked_up_by_other_readers(tmp_path, vectors):
+    writer = write(tmp_path, vectors)
+    reader = _MmapPartition(str(tmp_path), np.dtype(np.float32))
+    assert reader.count() == 3
+    writer.mark_deleted(["b"])
+    writer.compact()
+    writer.append(["d"], np.ones((1, 3), dtype=np.float32), ["文档D"], [{}])
+    assert [item["id"] for item in reader.get()] == ["a", "c", "d"]
+
+
+def test_delete_compacts_past_threshold(tmp_path, vectors):
+    store = MmapVectorStore(str(tmp_path), dtype="float32", compact_ratio=0.5)
+    add_users(store, vectors)
+    store.delete(["u1-a"], where={"user_id": "u1"})
+    assert store.get_stats()["compactions"] == 1
+    assert store.count() == 2
+    assert [item["id"] for item in store.get(where={"user_id": "u1"})] == ["u1-b"]
+    store.delete(["u1-b"])
+    assert store.count() == 1
+    assert store.get_stats()["compactions"] == 2
@@ -0,0 +1,104 @@
+"""
+WorldviewManager 测试：关键词匹配器按关键词版本缓存，关键词更新后重新编译，预先扫描的结果与单独扫描一致
+"""
+import asyncio
+
+from core.worldview_manager import WorldviewManager
+from memory.manager import MemoryManager
+from memory.models import WorldviewKeywords
+
+MESSAGE = "我们要诚实守信，也要追求知识，不能欺骗撒谎"
+
+
+def records(user_id, values=("追求知识", "热爱生活")):
+    return [
+        WorldviewKeywords(user_id=user_id, category="values", keywords=list(values), weight=1.0, description="价值观念"),
+        WorldviewKeywords(user_id=user_id, category="social_rules", keywords=["诚实守信"], weight=0.9, description="社会规则"),
+        WorldviewKeywords(user_id=user_id, category="taboos", keywords=["欺骗撒谎"], weight=1.0, description="禁忌事项"),
+    ]
+
+
+def triggered(result):
+    return {entry["category"]: entry["matched_keywords"] for entry in result["triggered_categories"]}
+
+
+def test_matcher_is_shared_by_identical_keywords():
+    manager = WorldviewManager()
+
+    first = manager.get_keyword_matcher(records("alice"))
+    again = manager.get_keyword_matcher(records("alice"))
+    other_user = manager.get_keyword_matcher(records("bob"))
+
+    assert again is first
+    assert other_user is first
+    assert manager.get_keyword_matcher(records("alice"), ["开心"]) is not first
+
+
+def test_changed_keywords_compile_a_new_matcher():
+    manager = WorldviewManager()
+    before = records("alice")
+    after = records("alice", values=("热爱生活", "保护弱者"))
+
+    old_matcher = manager.get_keyword_matcher(before)
+    new_matcher = manager.get_keyword_matcher(after)
+
+    assert new_matcher is not old_matcher
+    assert triggered(manager.analyze_worldview_influence(MESSAGE, before))["values"] == ["追求知识"]
+    assert "values" not in triggered(manager.analyze_worldview_influence(MESSAGE, after))
+    assert "values" in triggered(manager.analyze_worldview_influence("要保护弱者", after))
+
+
+def test_shared_scan_matches_separate_scan():
+    manager = WorldviewManager()
+    worldview_keywords = records("alice")
+    matcher = manager.get_keyword_matcher(worldview_keywords, ["开心", "诚实"])
+
+    shared = manager.analyze_worldview_influence(MESSAGE, worldview_keywords, matcher.find_groups(MESSAGE))
+    separate = manager.analyze_worldview_influence(MESSAGE, worldview_keywords)
+
+    assert shared == separate
+    assert triggered(shared) == {"values": ["追求知识"], "social_rules": ["诚实守信"], "taboos": ["欺骗撒谎"]}
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return list(self.documents)
+
+
+class FakeWorldviewCollection:
+    """按 (user_id, category) 保存世界观关键词文档，记录查询次数"""
+
+    def __init__(self, worldview_keywords):
+        self.documents = {(record.user_id, record.category): record.dict(by_alias=True) for record in worldview_keywords}
+        self.finds = 0
+
+    def find(self, query):
+        self.finds += 1
+        return FakeCursor([doc for (user_id, _), doc in self.documents.items() if user_id == query["user_id"]])
+
+    async def update_one(self, query, update, upsert=False):
+        self.documents[(query["user_id"], query["category"])].update(update["$set"])
+
+
+def test_keyword_update_reaches_matcher_through_cache_invalidation():
+    async def scenario():
+        memory_manager = MemoryManager()
+        memory_manager.worldview_keywords = FakeWorldviewCollection(records("alice"))
+        manager = WorldviewManager()
+
+        cached = await memory_manager.get_worldview_keywords("alice")
+        assert await memory_manager.get_worldview_keywords("alice") == cached
+        assert memory_manager.worldview_keywords.finds == 1
+        old_matcher = manager.get_keyword_matcher(cached)
+
+        assert await memory_manager.update_worldview_keywords("alice", "values", ["保护弱者"])
+        updated = await memory_manager.get_worldview_keywords("alice")
+
+        assert memory_manager.worldview_keywords.finds == 2
+        assert manager.get_keyword_matcher(updated) is not old_matcher
+        assert triggered(manager.analyze_worldview_influence("要保护弱者", updated)) == {"values": ["保护弱者"]}
+
+    asyncio.run(scenario())
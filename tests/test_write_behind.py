@@ -0,0 +1,139 @@
+"""
+WriteBehindQueue 测试：只重试失败的步骤、重试不阻塞其后的任务、重试的旧人格状态不覆盖新状态
+"""
+import asyncio
+
+from core.write_behind import PersistenceJob, WriteBehindQueue
+from memory.models import ConversationMessage, PersonaState
+
+
+class FakeMemoryManager:
+    """按会话记录写入，message_failures / persona_failures 中的会话在前 N 次写入时失败"""
+
+    def __init__(self, message_failures=None, persona_failures=None):
+        self.message_failures = dict(message_failures or {})
+        self.persona_failures = dict(persona_failures or {})
+        self.messages = []
+        self.personas = {}
+
+    async def add_messages(self, user_id, session_id, messages):
+        if self.message_failures.get(session_id, 0) > 0:
+            self.message_failures[session_id] -= 1
+            return False
+        self.messages.extend((session_id, message.content) for message in messages)
+        return True
+
+    async def update_persona_state(self, user_id, session_id, persona_state):
+        if self.persona_failures.get(session_id, 0) > 0:
+            self.persona_failures[session_id] -= 1
+            raise ConnectionError("mongo down")
+        self.personas[session_id] = persona_state.mood
+        return True
+
+
+class FakeKnowledgeBase:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.turns = []
+
+    async def aadd_conversation_turn(self, user_message, assistant_response, user_id, session_id, emotion_info=None):
+        if self.failures > 0:
+            self.failures -= 1
+            return None, None
+        self.turns.append((session_id, user_message))
+        return "u", "a"
+
+
+def job(session_id, text, mood=None):
+    persona = PersonaState(personality_type="gentle", traits={}, mood=mood) if mood else None
+    return PersistenceJob(
+        user_id="user",
+        session_id=session_id,
+        user_message=ConversationMessage(role="user", content=text),
+        assistant_message=ConversationMessage(role="assistant", content=f"re:{text}"),
+        persona_state=persona
+    )
+
+
+def make_queue(memory_manager, knowledge_base, retry_backoff=0.01, max_retries=3):
+    return WriteBehindQueue(
+        memory_manager, knowledge_base, max_size=10, batch_size=4,
+        flush_interval=0.01, max_retries=max_retries, retry_backoff=retry_backoff
+    )
+
+
+def test_only_failed_steps_are_retried():
+    memory_manager, knowledge_base = FakeMemoryManager(), FakeKnowledgeBase(failures=1)
+
+    async def scenario():
+        queue = make_queue(memory_manager, knowledge_base)
+        await queue.start()
+        await queue.submit(job("s1", "hi"))
+        await queue.stop()
+        return queue.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert memory_manager.messages == [("s1", "hi"), ("s1", "re:hi")]
+    assert knowledge_base.turns == [("s1", "hi")]
+    assert (stats["persisted"], stats["retried"], stats["dropped"]) == (1, 1, 0)
+
+
+def test_retry_does_not_stall_later_jobs():
+    memory_manager = FakeMemoryManager(message_failures={"bad": 1})
+
+    async def scenario():
+        queue = make_queue(memory_manager, FakeKnowledgeBase(), retry_backoff=0.5)
+        await queue.start()
+        await queue.submit(job("bad", "first"))
+        await asyncio.sleep(0.05)
+        await queue.submit(job("good", "second"))
+        await asyncio.sleep(0.1)
+        # 失败任务在退避中，之后提交的任务已经写入
+        written_before_retry = list(memory_manager.messages)
+        pending = queue.get_stats()["retry_pending"]
+        await queue.stop()
+        return written_before_retry, pending
+
+    written_before_retry, pending = asyncio.run(scenario())
+    assert written_before_retry == [("good", "second"), ("good", "re:second")]
+    assert pending == 1
+    assert ("bad", "first") in memory_manager.messages
+
+
+def test_retried_persona_does_not_overwrite_newer_state():
+    memory_manager = FakeMemoryManager(persona_failures={"s1": 1})
+
+    async def scenario():
+        queue = make_queue(memory_manager, FakeKnowledgeBase(), retry_backoff=0.1)
+        await queue.start()
+        await queue.submit(job("s1", "one", mood="sad"))
+        await asyncio.sleep(0.05)
+        await queue.submit(job("s1", "two", mood="happy"))
+        await queue.stop()
+        return queue.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert memory_manager.personas == {"s1": "happy"}
+    assert (stats["persisted"], stats["dropped"]) == (2, 0)
+
+
+def test_job_is_dropped_after_max_retries():
+    memory_manager = FakeMemoryManager(message_failures={"s1": 10})
+
+    async def scenario():
+        queue = make_queue(memory_manager, FakeKnowledgeBase(), max_retries=2)
+        await queue.start()
+        await queue.submit(job("s1", "hi"))
+        await queue.stop()
+        return queue.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["persisted"], stats["retried"], stats["dropped"], stats["retry_pending"]) == (0, 2, 1, 0)
+
+
+def test_inline_write_when_not_started():
+    memory_manager, knowledge_base = FakeMemoryManager(), FakeKnowledgeBase(failures=1)
+    queue = make_queue(memory_manager, knowledge_base)
+    asyncio.run(queue.submit(job("s1", "hi", mood="calm")))
+    assert knowledge_base.turns == [("s1", "hi")]
+    assert memory_manager.personas == {"s1": "calm"}